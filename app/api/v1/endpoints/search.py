@@ -1,10 +1,23 @@
-from typing import List, Optional, Tuple
-from fastapi import APIRouter
+import csv
+import io
+import json
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sqlmodel import Session, select, desc
+from app.core.config import settings
 from app.core.database import engine
-from app.models.models import Aspirante, Aspirante_Sede, Url_HojaDeVida
-from app.services.pinecone_service import search_best_matches
+from app.core.profiling import perfilable
+from app.models.models import Aspirante, Aspirante_Sede
+from app.services.pinecone_service import search_best_matches, CuotaExcedida, ServicioNoDisponible
+from app.services.admission import control_busqueda, plazo_seguidores, ServicioSaturado
+from app.services.singleflight import vuelos_busqueda, EsperaAgotada
+from app.services.candidate_cards import filas_resultado, serializar_resultados, serializar_fila
+from app.services.suggestions import indice_sugerencias
+from app.services.facets import indice_facetas
+from app.services.popularity import contador_apariciones
+from app.services.dedup import mapa_duplicados, no_es_duplicado
 
 router = APIRouter()
 
@@ -14,6 +27,7 @@ class SearchRequest(BaseModel):
     municipio: Optional[str] = None
     page: int = 1                 # Paginación: Página actual
     page_size: int = 25           # Paginación: Cantidad por página (Default 25)
+    facetas: bool = False         # Si es True, la respuesta incluye conteos por municipio/nivel/experiencia
 
 class SearchResult(BaseModel):
     id_aspirante: str
@@ -28,82 +42,116 @@ class SearchResult(BaseModel):
     resumen: str
     bonificaciones: List[str]
 
-# --- Funciones Auxiliares (Re-ranking y Sedes) ---
-# (Se mantienen igual que antes, las incluyo para contexto)
-def obtener_sedes_activas(sede_obj) -> List[str]:
-    if not sede_obj: return []
-    columnas = [
-        "Manizales", "Chinchiná", "Villamaría", "Neira", "Palestina", 
-        "Risaralda", "Riosucio", "Anserma", "La_Dorada", "Supia", 
-        "Palestina_Arauca", "Arauca", "Viterbo", "Salamina", "Belalcazar", 
-        "Filadelfia", "Aguadas", "San_José", "Pacora", "Victoria", 
-        "Manzanares", "Norcasia", "Samaná"
-    ]
-    return [c for c in columnas if getattr(sede_obj, c, False)]
-
-
-def calcular_reranking(match_score, info_db) -> Tuple[float, List[str]]:
-    nuevo_score = match_score
-    bonus_log = []
-    
-    if info_db:
-        # 1. Reglas de Bonificación
-        posgrado = (info_db.titulo_posgrado or "").lower()
-        if 'doctor' in posgrado or 'phd' in posgrado:
-            nuevo_score += 0.2
-            bonus_log.append("Doctorado (+0.2)")
-        elif 'maestr' in posgrado or 'magister' in posgrado:
-            nuevo_score += 0.1
-            bonus_log.append("Maestría (+0.1)")
-            
-        experiencia = (info_db.tiene_experiencia or "").lower()
-        if experiencia in ['si', 'sí', 's', 'true', '1']:
-            nuevo_score += 0.05
-            bonus_log.append("Tiene Experiencia (+0.05)")
+class SearchResponseConFacetas(BaseModel):
+    resultados: List[SearchResult]
+    total: int                               # Candidatos contados (no solo la página); con query, a lo más SEARCH_FACETAS_TOP_K
+    truncado: bool                           # True si el conjunto semántico llegó al tope: puede haber más candidatos
+    facetas: Dict[str, Dict[str, int]]       # municipio / nivel_formacion / experiencia -> conteos
 
-    # 2. ESTANDARIZACIÓN (Tope máximo 100%)
-    score_final_normalizado = min(1.0, nuevo_score)
+class Sugerencia(BaseModel):
+    texto: str
+    frecuencia: int
+    tipo: str  # "titulo" | "habilidad"
 
-    return round(score_final_normalizado, 4), bonus_log
+def clave_busqueda(request: SearchRequest) -> Tuple:
+    """Clave normalizada (query, filtros, página) para coalescer búsquedas idénticas."""
+    query = " ".join((request.query or "").split()).casefold()
+    municipio = request.municipio if request.municipio and request.municipio != "Todos" else None
+    return (query, municipio, request.page, request.page_size, request.facetas)
 
 # --- Endpoint Principal ---
-@router.post("/", response_model=List[SearchResult])
+# La respuesta se arma con fragmentos JSON pre-serializados: el modelo solo documenta el esquema
+@router.post("/", response_class=Response,
+             responses={200: {"model": Union[List[SearchResult], SearchResponseConFacetas], "content": {"application/json": {}}}})
+@perfilable
 def search_candidates(request: SearchRequest):
     print(f"📡 Búsqueda: '{request.query}' | Pag: {request.page} | Muni: {request.municipio}")
-    
-    processed_results = []
+
+    # Si otra petición idéntica ya está en curso, esperamos su resultado en vez de repetir el trabajo,
+    # con un plazo acotado (cola de admisión + servicios externos): un líder colgado no retiene a los seguidores
+    try:
+        contenido, ids_semanticos = vuelos_busqueda.ejecutar(
+            clave_busqueda(request), lambda: _ejecutar_busqueda(request), timeout=plazo_seguidores()
+        )
+    except EsperaAgotada:
+        raise _error_saturado(control_busqueda.rechazo_por_timeout())
+
+    # Cada petición cuenta (también las coalescidas): prioridad de reprocesamiento, más buscados primero
+    contador_apariciones.registrar(ids_semanticos)
+    return Response(content=contenido, media_type="application/json")
+
+# --- Autocompletado (solo memoria: sin Gemini ni Pinecone) ---
+@router.get("/suggest", response_model=List[Sugerencia])
+def suggest(q: str = Query(..., min_length=1, max_length=60), limite: int = Query(10, ge=1, le=50)):
+    """Completa títulos y habilidades por prefijo ("ingen", "licenciad", "magis"), sin tildes y por frecuencia."""
+    return indice_sugerencias.sugerir(q, limite)
+
+def _filtros_pinecone(request: SearchRequest) -> dict:
+    filtros = {}
+    if request.municipio and request.municipio != "Todos":
+        filtros["municipios"] = {"$in": [request.municipio]}
+    return filtros
+
+def _error_saturado(e: ServicioSaturado) -> HTTPException:
+    return HTTPException(status_code=e.status_code, detail=e.motivo, headers={"Retry-After": str(e.retry_after)})
+
+def _consultar_pinecone(query: str, filtros: dict, top_k: int, include_metadata: bool = True):
+    """
+    Embedding + consulta a Pinecone bajo control de admisión. La saturación y las fallas de Gemini/Pinecone
+    se traducen a 429/503 con Retry-After: una caída nunca se confunde con "sin candidatos".
+    """
+    try:
+        with control_busqueda.admitir():
+            return search_best_matches(query, filters=filtros if filtros else None, top_k=top_k,
+                                       include_metadata=include_metadata)
+    except ServicioSaturado as e:
+        raise _error_saturado(e)
+    except CuotaExcedida:
+        control_busqueda.registrar_error_upstream()
+        raise HTTPException(status_code=503, detail="Cuota de servicios de IA excedida",
+                            headers={"Retry-After": str(control_busqueda.retry_after)})
+    except ServicioNoDisponible:
+        control_busqueda.registrar_error_upstream()
+        raise HTTPException(status_code=503, detail="Búsqueda semántica no disponible (Gemini/Pinecone)",
+                            headers={"Retry-After": str(control_busqueda.retry_after)})
+
+def _ejecutar_busqueda(request: SearchRequest) -> Tuple[str, List[int]]:
+    """Ejecuta la búsqueda completa. Retorna (JSON ya serializado, ids de la página si fue semántica)."""
     aspirantes_ids = []
     scores_map = {} # Diccionario para guardar scores si vienen de Pinecone
+    facetas = None
+    truncado = False
 
     # CASO A: Búsqueda Semántica (Hay Texto)
     if request.query and request.query.strip():
         # 1. Filtros Pinecone
-        filtros = {}
-        if request.municipio and request.municipio != "Todos":
-            filtros["municipios"] = {"$in": [request.municipio]}
+        filtros = _filtros_pinecone(request)
         
         # 2. Consultar Pinecone (Pedimos más para tener margen)
         # Nota: Pinecone no tiene paginación 'offset' nativa eficiente, 
         # pero para volúmenes bajos (1500) traemos top_k grande y cortamos en Python.
         limit_pinecone = request.page * request.page_size
-        raw_results = search_best_matches(request.query, filters=filtros if filtros else None, top_k=limit_pinecone)
-        
-        if not raw_results or not hasattr(raw_results, 'matches'):
-            return []
+        if request.facetas:
+            # Las facetas se cuentan sobre todo el conjunto candidato: una sola consulta más amplia, solo IDs y scores
+            limit_pinecone = max(limit_pinecone, settings.SEARCH_FACETAS_TOP_K)
+        raw_results = _consultar_pinecone(request.query, filtros, limit_pinecone, include_metadata=not request.facetas)
+        matches = raw_results.matches if raw_results and hasattr(raw_results, 'matches') else []
+        # Una persona postulada varias veces aparece una sola vez (como su canónico, si cumple el filtro de municipio)
+        candidatos = mapa_duplicados.colapsar(matches, request.municipio)
+        if request.facetas:
+            facetas = indice_facetas.contar(aid for aid, _ in candidatos)
+            truncado = len(matches) >= limit_pinecone  # Pinecone llenó el top_k: el conjunto real puede ser mayor
 
         # Cortamos manualmente para la paginación (Slicing)
         start_idx = (request.page - 1) * request.page_size
-        matches_paginados = raw_results.matches[start_idx : start_idx + request.page_size]
-
-        for match in matches_paginados:
-            aid = int(match.id)
+        for aid, score in candidatos[start_idx : start_idx + request.page_size]:
             aspirantes_ids.append(aid)
-            scores_map[aid] = match.score
+            scores_map[aid] = score
 
     # CASO B: Navegación General (Query Vacío) -> Usamos SQL Directo
     else:
         with Session(engine) as session:
-            statement = select(Aspirante)
+            statement = select(Aspirante).where(no_es_duplicado(Aspirante.id_aspirante))
             
             # Filtro de Municipio en SQL
             if request.municipio and request.municipio != "Todos":
@@ -118,62 +166,102 @@ def search_candidates(request: SearchRequest):
                 aspirantes_ids.append(asp.id_aspirante)
                 scores_map[asp.id_aspirante] = 0.0 # Score neutro
 
+        if request.facetas:
+            # Sin query el conjunto es toda la tabla (con el filtro de municipio): conteo sobre los arreglos en memoria
+            facetas = indice_facetas.contar(municipio=request.municipio)
+
     # --- Hidratación y Respuesta Unificada ---
-    if not aspirantes_ids:
-        return []
+    # Las tarjetas ya vienen renderizadas y serializadas (read model Tarjeta_Candidato):
+    # solo calculamos scores y empalmamos los fragmentos JSON, sin ORM ni pydantic por fila.
+    filas = filas_resultado(aspirantes_ids, scores_map) if aspirantes_ids else []
+    ids_semanticos = aspirantes_ids if request.query and request.query.strip() else []
 
-    with Session(engine) as session:
-        # Traemos todos los aspirantes requeridos en una sola query optimizada
-        candidates_db = session.exec(select(Aspirante).where(Aspirante.id_aspirante.in_(aspirantes_ids))).all()
-        
-        # Mapeamos para mantener el orden original de los IDs (importante para Pinecone)
-        candidates_map = {c.id_aspirante: c for c in candidates_db}
+    # Si venimos de SQL (Case B), tal vez queramos ordenarlos por Doctorado/Maestría por defecto
+    if not request.query:
+        filas.sort(key=lambda f: f[0], reverse=True)
 
-        for aid in aspirantes_ids:
-            aspirante_db = candidates_map.get(aid)
-            if not aspirante_db: continue
+    resultados = serializar_resultados(filas)
+    if facetas is None:
+        return resultados, ids_semanticos
+    total = facetas.pop("total")
+    return (f'{{"resultados":{resultados},"total":{total},"truncado":{json.dumps(truncado)},'
+            f'"facetas":{json.dumps(facetas, ensure_ascii=False)}}}', ids_semanticos)
 
-            info = aspirante_db.informacion
-            sede = aspirante_db.sede
+# --- Exportación completa (CSV / JSONL) ---
+EXPORT_MAX_RESULTADOS = 10000  # top_k máximo que admite Pinecone
+EXPORT_LOTE = 500              # Candidatos hidratados por lote: la memoria queda acotada
+COLUMNAS_CSV = [
+    "posicion", "id_aspirante", "nombre", "email", "celular", "score_semantico", "score_final",
+    "municipios", "titulo_profesional", "titulo_posgrado", "bonificaciones", "resumen"
+]
 
-            # A. Obtener el texto analizado por la IA (Donde está la experiencia real)
-            hoja_vida_obj = session.exec(select(Url_HojaDeVida).where(Url_HojaDeVida.id_aspirante == aspirante_db.id_aspirante)).first()
-            texto_ia = hoja_vida_obj.resumen_estructurado if hoja_vida_obj and hoja_vida_obj.resumen_estructurado else "Sin análisis detallado disponible."
-            
-            
-            # Construcción del Resumen Rico
-            resumen_rico = (
-                f"🎓 Título: {info.titulo_profesional if info else 'N/A'}\n"
-                f"📚 Posgrado: {info.titulo_posgrado if info else 'N/A'}\n"
-                f"🕒 Disponibilidad: {info.disponibilidad if info else 'No especificada'}\n"
-                f"📋 Detalle Experiencia: {getattr(info, 'detalle_experiencia', 'Sin registro manual')}\n"
-                f"📧 Email: {aspirante_db.email}\n"
-                f"{texto_ia}" # <--- AQUÍ INYECTAMOS LA EXPERIENCIA Y PERFIL
-            )
-
-            # Cálculo de Scores
-            base_score = scores_map.get(aid, 0.0)
-            final_score, bonuses = calcular_reranking(base_score, info)
-            
-            # Si es búsqueda vacía (Case B), forzamos score visual a 0 o 100% ficticio, 
-            # pero mejor lo dejamos en 0 y que el frontend decida no mostrar badge si es 0.
-            
-            processed_results.append(SearchResult(
-                id_aspirante=str(aspirante_db.id_aspirante),
-                nombre=aspirante_db.nombre_completo,
-                email=aspirante_db.email,
-                celular=aspirante_db.celular,
-                score_semantico=round(base_score, 4),
-                score_final=final_score,
-                municipios=obtener_sedes_activas(sede),
-                titulo_profesional=info.titulo_profesional if info else "",
-                titulo_posgrado=info.titulo_posgrado if info else "",
-                resumen=resumen_rico,
-                bonificaciones=bonuses
-            ))
+def _lotes_semanticos(matches, municipio: Optional[str]) -> Iterator[Tuple[List[int], Dict[int, float]]]:
+    candidatos = mapa_duplicados.colapsar(matches, municipio)
+    for i in range(0, len(candidatos), EXPORT_LOTE):
+        lote = candidatos[i:i + EXPORT_LOTE]
+        yield [aid for aid, _ in lote], dict(lote)
 
-    # Si venimos de SQL (Case B), tal vez queramos ordenarlos por Doctorado/Maestría por defecto
-    if not request.query:
-         processed_results.sort(key=lambda x: x.score_final, reverse=True)
+def _lotes_sql(municipio: Optional[str]) -> Iterator[Tuple[List[int], Dict[int, float]]]:
+    """Recorre todos los aspirantes (filtrados por municipio) con paginación por llave, no por OFFSET."""
+    ultimo_id = 0
+    while True:
+        with Session(engine) as session:
+            statement = select(Aspirante.id_aspirante).where(Aspirante.id_aspirante > ultimo_id,
+                                                             no_es_duplicado(Aspirante.id_aspirante))
+            if municipio and municipio != "Todos":
+                statement = statement.join(Aspirante_Sede).where(getattr(Aspirante_Sede, municipio) == True)
+            ids = session.exec(statement.order_by(Aspirante.id_aspirante).limit(EXPORT_LOTE)).all()
+        if not ids:
+            return
+        ultimo_id = ids[-1]
+        yield list(ids), {aid: 0.0 for aid in ids}
+
+def _generar_export(lotes, formato: str) -> Iterator[str]:
+    if formato == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(COLUMNAS_CSV)
+        yield "\ufeff" + buffer.getvalue()  # BOM para que Excel respete las tildes
+
+    posicion = 0
+    for ids, scores in lotes:
+        filas = filas_resultado(ids, scores)
+        if formato == "jsonl":
+            yield "".join(serializar_fila(*fila) + "\n" for fila in filas)
+            continue
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for final, base, fragmento in filas:
+            posicion += 1
+            tarjeta = json.loads("{" + fragmento + "}")
+            writer.writerow([
+                posicion, tarjeta["id_aspirante"], tarjeta["nombre"], tarjeta["email"], tarjeta["celular"],
+                round(base, 4), final, "; ".join(tarjeta["municipios"]), tarjeta["titulo_profesional"],
+                tarjeta["titulo_posgrado"], "; ".join(tarjeta["bonificaciones"]), tarjeta["resumen"],
+            ])
+        yield buffer.getvalue()
+
+@router.post("/export")
+def export_candidates(request: SearchRequest, formato: str = Query("csv", pattern="^(csv|jsonl)$")):
+    """
+    Exporta el ranking completo (sin paginación) con los mismos filtros de la búsqueda.
+    La respuesta se transmite por lotes: el primer byte sale antes de hidratar todos los candidatos.
+    """
+    print(f"📤 Export {formato}: '{request.query}' | Muni: {request.municipio}")
+
+    if request.query and request.query.strip():
+        # Una sola consulta vectorial (solo IDs y scores); la hidratación va por lotes
+        raw_results = _consultar_pinecone(request.query, _filtros_pinecone(request), EXPORT_MAX_RESULTADOS,
+                                          include_metadata=False)
+        matches = raw_results.matches if raw_results and hasattr(raw_results, 'matches') else []
+        lotes = _lotes_semanticos(matches, request.municipio)
+    else:
+        lotes = _lotes_sql(request.municipio)
 
-    return processed_results
\ No newline at end of file
+    media_type = "text/csv; charset=utf-8" if formato == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _generar_export(lotes, formato),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="candidatos.{formato}"'},
+    )
\ No newline at end of file
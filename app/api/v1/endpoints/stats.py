@@ -1,11 +1,17 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
 from sqlmodel import Session, select, func
 from app.core.database import engine
+from app.core.config import settings
+from app.core.profiling import perfilable, ruta_perfil_existente
 from app.models.models import Aspirante, Aspirante_Informacion, Aspirante_Sede, Url_HojaDeVida
+from app.services.admission import control_busqueda
+from app.services.singleflight import vuelos_busqueda
 
 router = APIRouter()
 
 @router.get("/")
+@perfilable
 def get_dashboard_stats():
     """
     Retorna métricas avanzadas para el Dashboard de RRHH.
@@ -82,4 +88,23 @@ def get_dashboard_stats():
             "chart_niveles": chart_niveles,
             "chart_disponibilidad": chart_disponibilidad,
             "chart_municipios": chart_municipios
-        }
\ No newline at end of file
+        }
+
+@router.get("/admision")
+def get_admission_stats():
+    """
+    Profundidad de cola, peticiones en vuelo y rechazos del control de admisión de /search,
+    más las búsquedas idénticas que se resolvieron coalesciendo (single-flight).
+    """
+    return {**control_busqueda.metricas(), "coalescencia": vuelos_busqueda.metricas()}
+
+@router.get("/perfiles/{perfil_id}")
+def get_profile(perfil_id: str):
+    """
+    Descarga un perfil generado con el header X-Profile (id en el header X-Profile-Id de la respuesta).
+    .folded -> flamegraph.pl / speedscope; .pstats -> snakeviz / pstats.
+    """
+    ruta = ruta_perfil_existente(perfil_id) if settings.PROFILING_HABILITADO else None
+    if not ruta:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado")
+    return FileResponse(ruta, media_type="text/plain" if ruta.endswith(".folded") else "application/octet-stream")
\ No newline at end of file
@@ -12,6 +12,43 @@ class Settings(BaseSettings):
     PINECONE_API_KEY: str = ""
     PINECONE_ENV: str = "" 
 
+    # Modelos de IA: cambiarlos deja desactualizados los resúmenes/vectores (ver scripts/reprocess.py)
+    GEMINI_MODELO: str = "models/gemini-2.0-flash"
+    EMBEDDING_MODELO: str = "models/text-embedding-004"
+
+    # Modo de vectores: "completo" (768), "truncado" o "pca" (ver scripts/fit_projection.py)
+    EMBEDDING_MODO: str = "completo"
+    EMBEDDING_DIMENSION: int = 256
+    EMBEDDING_PROYECCION_PATH: str = "data/proyeccion_pca.npz"
+
+    # Control de admisión de /search (llamadas a Gemini + Pinecone en vuelo)
+    SEARCH_MAX_CONCURRENCIA: int = 8   # Búsquedas semánticas simultáneas contra los servicios externos
+    SEARCH_MAX_COLA: int = 8           # Peticiones que pueden esperar turno; el resto recibe 429
+    SEARCH_TIMEOUT_COLA: float = 2.0   # Segundos máximos en cola antes de responder 503
+    SEARCH_RETRY_AFTER: int = 2        # Valor del header Retry-After en los rechazos
+    SEARCH_PRESUPUESTO_UPSTREAM: float = 8.0  # Segundos que puede tardar embedding + Pinecone de una búsqueda
+    SEARCH_TIMEOUT_SEGUIDORES: float = 10.0   # Espera de búsquedas idénticas coalescidas; nunca menos que COLA + UPSTREAM
+    # Los endpoints síncronos corren en el threadpool de anyio (40 hilos por defecto): /search ocupa hasta
+    # CONCURRENCIA + COLA hilos y el resto de la API necesita los suyos, así que al arrancar se amplía el pool
+    THREADPOOL_HILOS_RESTO_API: int = 32
+
+    # Facetas de /search: candidatos semánticos sobre los que se cuentan y vigencia de los arreglos precalculados
+    SEARCH_FACETAS_TOP_K: int = 1000
+    FACETAS_REFRESCO_SEGUNDOS: float = 60.0
+
+    # Deduplicación en búsqueda: vigencia del mapa duplicado -> canónico en memoria
+    DEDUP_REFRESCO_SEGUNDOS: float = 60.0
+
+    # Autocompletado (/search/suggest): cada cuántos segundos se buscan cambios hechos por otros procesos
+    SUGGEST_REFRESCO_SEGUNDOS: float = 30.0
+
+    # Perfilado bajo demanda (apagado = cero overhead: ni middleware ni decoradores activos)
+    PROFILING_HABILITADO: bool = False
+    PROFILING_MODO: str = "muestreo"        # "muestreo" (.folded para flamegraph) | "cprofile" (.pstats)
+    PROFILING_TASA_MUESTREO: float = 0.0    # Fracción de peticiones perfiladas sin header X-Profile
+    PROFILING_INTERVALO: float = 0.001      # Segundos entre muestras del modo muestreo
+    PROFILING_DIRECTORIO: str = "profiles"
+
     class Config:
         env_file = ".env"
         # Esto permite que si hay variables extra en el .env que no usamos aquí, no lance error
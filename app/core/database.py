@@ -1,4 +1,4 @@
-from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel import create_engine, Session
 from app.core.config import settings
 
 # check_same_thread=False es necesario solo para SQLite en FastAPI
@@ -11,5 +11,6 @@ def get_session():
         yield session
 
 def init_db():
-    # Crea las tablas si no existen
-    SQLModel.metadata.create_all(engine)
\ No newline at end of file
+    # Crea las tablas si no existen y aplica las migraciones versionadas pendientes (bajo un mismo lock)
+    from app.core.migrations import migrar
+    migrar(engine)
\ No newline at end of file
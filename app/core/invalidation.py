@@ -0,0 +1,56 @@
+from itertools import chain
+from typing import Callable, Dict, NamedTuple, Optional, Set, Tuple
+from sqlalchemy import event
+from sqlmodel import Session
+
+
+class Suscriptor(NamedTuple):
+    modelos: Tuple[type, ...]
+    durante_flush: Optional[Callable[[Session, Set[int]], None]]  # En la misma transacción del cambio
+    tras_commit: Optional[Callable[[Set[int]], None]]             # Cuando otras conexiones ya ven el cambio
+
+
+_suscriptores: Dict[str, Suscriptor] = {}
+
+
+def suscribir(nombre: str, modelos: Tuple[type, ...],
+              tras_commit: Optional[Callable[[Set[int]], None]] = None,
+              durante_flush: Optional[Callable[[Session, Set[int]], None]] = None):
+    """
+    Registra una caché derivada de las tablas fuente (tarjetas, autocompletado, facetas).
+    Recibe los id_aspirante de los objetos de `modelos` creados, editados o borrados por el ORM.
+    """
+    _suscriptores[nombre] = Suscriptor(modelos, durante_flush, tras_commit)
+
+
+# Un solo trío de listeners para todos los suscriptores: un recorrido por flush, y las entregas
+# tras el commit (antes de eso otras conexiones todavía no ven los cambios; un rollback las descarta).
+@event.listens_for(Session, "after_flush")
+def _registrar_cambios(session, flush_context):
+    if not _suscriptores:
+        return
+    cambiados = [obj for obj in chain(session.new, session.dirty, session.deleted)
+                 if getattr(obj, "id_aspirante", None) is not None]
+    if not cambiados:
+        return
+
+    pendientes = session.info.setdefault("invalidaciones", {})
+    for nombre, suscriptor in _suscriptores.items():
+        ids = {obj.id_aspirante for obj in cambiados if isinstance(obj, suscriptor.modelos)}
+        if not ids:
+            continue
+        if suscriptor.durante_flush:
+            suscriptor.durante_flush(session, ids)
+        if suscriptor.tras_commit:
+            pendientes.setdefault(nombre, set()).update(ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _entregar_cambios(session):
+    for nombre, ids in session.info.pop("invalidaciones", {}).items():
+        _suscriptores[nombre].tras_commit(ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_cambios(session):
+    session.info.pop("invalidaciones", None)
@@ -0,0 +1,165 @@
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Iterator, List, NamedTuple, Union
+from sqlalchemy import MetaData, Table, Column, Integer, String, DateTime, inspect, select, insert, text
+from sqlalchemy.engine import Connection, Engine
+from sqlmodel import SQLModel
+
+# Registro de versiones aplicadas (fuera de SQLModel.metadata: lo maneja solo este módulo)
+_metadata = MetaData()
+schema_version = Table(
+    "schema_version", _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("descripcion", String, nullable=False),
+    Column("aplicada", DateTime(timezone=True), nullable=False),
+)
+
+
+class Migracion(NamedTuple):
+    version: int
+    descripcion: str
+    pasos: Union[List[str], Callable[[Connection], None]]
+
+
+# --- 0001: reemplaza el antiguo scripts/db_fix.py (ALTER TABLE a mano); usar scripts/migrate.py ---
+def _agregar_resumen_estructurado(conn: Connection):
+    columnas = {c["name"] for c in inspect(conn).get_columns("url_hojadevida")}
+    if "resumen_estructurado" not in columnas:
+        conn.execute(text("ALTER TABLE url_hojadevida ADD COLUMN resumen_estructurado TEXT"))
+
+
+# --- 0002: índices guiados por las consultas reales ---
+# Escrituras: cada índice se mantiene en cada INSERT/UPDATE (importador, process_pdfs).
+# Ninguna consulta filtra por textos libres ni por booleanos de sede uno a uno.
+_INDICES_OBSOLETOS = [
+    "ix_aspirante_tipo_documento", "ix_aspirante_nombre_completo", "ix_aspirante_celular",
+    "ix_aspirante_informacion_titulo_profesional", "ix_aspirante_informacion_disponibilidad",
+    "ix_aspirante_informacion_titulo_posgrado", "ix_aspirante_informacion_tiene_experiencia",
+    "ix_aspirante_informacion_detalle_experiencia",
+    "ix_url_hojadevida_url_hoja_de_vida",
+    "ix_aspirante_facultad_nombre_facultad",
+] + [f"ix_aspirante_sede_{m}" for m in (
+    # Snapshot de las columnas booleanas de Aspirante_Sede al momento de esta migración
+    "Manizales", "Chinchiná", "Villamaría", "Neira", "Palestina",
+    "Risaralda", "Riosucio", "Anserma", "La_Dorada", "Supia",
+    "Palestina_Arauca", "Arauca", "Viterbo", "Salamina", "Belalcazar",
+    "Filadelfia", "Aguadas", "San_José", "Pacora", "Victoria",
+    "Manzanares", "Norcasia", "Samaná",
+)]
+
+# Lectura: JOINs/IN por id_aspirante (search, tarjetas, stats), cola de pendientes y reclamo de trabajos
+_INDICES_NUEVOS = [
+    'CREATE INDEX IF NOT EXISTS "ix_aspirante_informacion_id_aspirante" ON aspirante_informacion (id_aspirante)',
+    'CREATE INDEX IF NOT EXISTS "ix_aspirante_sede_id_aspirante" ON aspirante_sede (id_aspirante)',
+    'CREATE INDEX IF NOT EXISTS "ix_aspirante_facultad_id_aspirante" ON aspirante_facultad (id_aspirante)',
+    'CREATE INDEX IF NOT EXISTS "ix_url_hojadevida_id_aspirante" ON url_hojadevida (id_aspirante)',
+    'CREATE INDEX IF NOT EXISTS "ix_url_hojadevida_pendientes" ON url_hojadevida (id_url) WHERE resumen_estructurado IS NULL',
+    'CREATE INDEX IF NOT EXISTS "ix_procesamiento_hojadevida_estado_intentos" ON procesamiento_hojadevida (estado, intentos)',
+]
+
+# --- 0003: procesamiento versionado (prompt/modelo) y prioridad de la cola ---
+_COLUMNAS_NUEVAS = {
+    "url_hojadevida": {"resumen_version": "VARCHAR", "contenido_hash": "VARCHAR", "resumen_actualizado": "DATETIME"},
+    "procesamiento_hojadevida": {"prioridad": "INTEGER NOT NULL DEFAULT 0"},
+}
+
+
+def _agregar_columnas_versionado(conn: Connection):
+    # Las tablas Vector_Aspirante y Popularidad_Aspirante las crea create_all
+    for tabla, columnas in _COLUMNAS_NUEVAS.items():
+        existentes = {c["name"] for c in inspect(conn).get_columns(tabla)}
+        for nombre, tipo in columnas.items():
+            if nombre not in existentes:
+                conn.execute(text(f"ALTER TABLE {tabla} ADD COLUMN {nombre} {tipo}"))
+
+
+# --- 0004: marca de escritura en aspirante_informacion (frescura del autocompletado) ---
+def _agregar_actualizado_informacion(conn: Connection):
+    columnas = {c["name"] for c in inspect(conn).get_columns("aspirante_informacion")}
+    if "actualizado" not in columnas:
+        conn.execute(text("ALTER TABLE aspirante_informacion ADD COLUMN actualizado DATETIME"))
+    conn.execute(text('CREATE INDEX IF NOT EXISTS "ix_aspirante_informacion_actualizado" ON aspirante_informacion (actualizado)'))
+
+
+# --- 0005: match del importador por email sin distinguir mayúsculas ni espacios ---
+# Los correos ya guardados vienen con mayúsculas y espacios; el importador compara lower(trim(email))
+_INDICE_EMAIL_NORMALIZADO = 'CREATE INDEX IF NOT EXISTS "ix_aspirante_email_normalizado" ON aspirante (lower(trim(email)))'
+
+
+# --- 0006: caché de Drive con revisión analizada (md5) y resultados negativos (404) ---
+def _agregar_columnas_archivo_drive(conn: Connection):
+    columnas = {c["name"] for c in inspect(conn).get_columns("archivo_drive")}
+    for nombre, tipo in {"md5_analizado": "VARCHAR", "no_encontrado_hasta": "DATETIME"}.items():
+        if nombre not in columnas:
+            conn.execute(text(f"ALTER TABLE archivo_drive ADD COLUMN {nombre} {tipo}"))
+
+
+MIGRACIONES: List[Migracion] = [
+    Migracion(1, "Columna resumen_estructurado en url_hojadevida", _agregar_resumen_estructurado),
+    Migracion(2, "Rediseño de índices: FKs indexadas, índice parcial de pendientes, sin índices de texto",
+              [f'DROP INDEX IF EXISTS "{nombre}"' for nombre in _INDICES_OBSOLETOS] + _INDICES_NUEVOS + ["ANALYZE"]),
+    Migracion(3, "Versión de prompt/modelo y hash de contenido en resúmenes; prioridad en la cola",
+              _agregar_columnas_versionado),
+    Migracion(4, "Columna actualizado (indexada) en aspirante_informacion", _agregar_actualizado_informacion),
+    Migracion(5, "Índice de expresión lower(trim(email)) en aspirante", [_INDICE_EMAIL_NORMALIZADO, "ANALYZE"]),
+    Migracion(6, "md5 analizado y 404 con reintento en archivo_drive", _agregar_columnas_archivo_drive),
+]
+
+
+def version_actual(conn: Connection) -> int:
+    schema_version.create(conn, checkfirst=True)
+    versiones = conn.execute(select(schema_version.c.version)).scalars().all()
+    return max(versiones, default=0)
+
+
+@contextmanager
+def _bloqueo_migraciones(engine: Engine) -> Iterator[Connection]:
+    """
+    Transacción con el lock de escritura tomado ANTES de leer la versión: la app y cada worker de
+    process_pdfs llaman init_db al arrancar, y sobre una base nueva dos procesos no deben aplicar
+    la misma migración. El segundo espera el lock y ya encuentra la versión registrada.
+    """
+    with engine.connect() as conn:
+        if conn.dialect.name != "sqlite":
+            with conn.begin():
+                if conn.dialect.name == "postgresql":
+                    conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('schema_version'))"))
+                yield conn
+            return
+
+        # pysqlite abre la transacción de forma diferida; BEGIN IMMEDIATE toma el lock de una vez
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.exec_driver_sql("ROLLBACK")
+            raise
+        conn.exec_driver_sql("COMMIT")
+
+
+def migrar(engine: Engine) -> List[Migracion]:
+    """
+    Crea las tablas que falten y aplica en orden las migraciones pendientes, todo bajo un mismo lock
+    (si una falla no queda ninguna a medias). Las tablas se crean aquí y no solo en create_all del
+    llamador: las migraciones tocan tablas (procesamiento_hojadevida) que una base vieja no tiene.
+    """
+    import app.models.models  # noqa: F401  (registra las tablas en SQLModel.metadata)
+
+    aplicadas = []
+    with _bloqueo_migraciones(engine) as conn:
+        SQLModel.metadata.create_all(conn)
+        actual = version_actual(conn)
+        for migracion in sorted(MIGRACIONES, key=lambda m: m.version):
+            if migracion.version <= actual:
+                continue
+            if callable(migracion.pasos):
+                migracion.pasos(conn)
+            else:
+                for sentencia in migracion.pasos:
+                    conn.execute(text(sentencia))
+            conn.execute(insert(schema_version).values(
+                version=migracion.version, descripcion=migracion.descripcion, aplicada=datetime.now(timezone.utc)
+            ))
+            aplicadas.append(migracion)
+    return aplicadas
@@ -0,0 +1,127 @@
+import cProfile
+import functools
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from typing import Callable, Optional
+from app.core.config import settings
+
+HEADER_PERFIL = "X-Profile"        # Petición: "1" para perfilar esta petición
+HEADER_PERFIL_ID = "X-Profile-Id"  # Respuesta: id del perfil escrito en PROFILING_DIRECTORIO
+
+_ID_VALIDO = re.compile(r"^[a-zA-Z0-9_-]+\.(folded|pstats)$")
+
+# El middleware marca la petición; el decorador (que corre en el hilo del endpoint) la perfila
+_peticion_perfilada: ContextVar[Optional[dict]] = ContextVar("peticion_perfilada", default=None)
+
+
+class _Muestreador:
+    """Profiler por muestreo: cada `intervalo` segundos toma el stack del hilo objetivo (formato folded)."""
+
+    def __init__(self, thread_id: int, intervalo: float):
+        self.thread_id = thread_id
+        self.intervalo = intervalo
+        self.stacks = Counter()
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._correr, daemon=True)
+
+    def _correr(self):
+        while not self._detener.wait(self.intervalo):
+            frame = sys._current_frames().get(self.thread_id)
+            pila = []
+            while frame is not None:
+                codigo = frame.f_code
+                pila.append(f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if pila:
+                self.stacks[";".join(reversed(pila))] += 1
+
+    def __enter__(self):
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._detener.set()
+        self._hilo.join()
+
+    def folded(self) -> str:
+        # Formato de flamegraph.pl / speedscope: "frame;frame;frame conteo"
+        return "\n".join(f"{pila} {n}" for pila, n in self.stacks.most_common()) + "\n"
+
+
+def _ruta_perfil(nombre: str, extension: str) -> str:
+    os.makedirs(settings.PROFILING_DIRECTORIO, exist_ok=True)
+    perfil_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{nombre}-{uuid.uuid4().hex[:8]}.{extension}"
+    return os.path.join(settings.PROFILING_DIRECTORIO, perfil_id)
+
+
+def perfilable(func: Callable) -> Callable:
+    """
+    Decorador para endpoints síncronos. Con PROFILING_HABILITADO=False retorna la función
+    original (cero overhead); si está habilitado, solo perfila las peticiones marcadas por el middleware.
+    """
+    if not settings.PROFILING_HABILITADO:
+        return func
+
+    @functools.wraps(func)
+    def envoltura(*args, **kwargs):
+        marca = _peticion_perfilada.get()
+        if marca is None:
+            return func(*args, **kwargs)
+
+        if settings.PROFILING_MODO == "cprofile":
+            perfil = cProfile.Profile()
+            try:
+                return perfil.runcall(func, *args, **kwargs)
+            finally:
+                ruta = _ruta_perfil(func.__name__, "pstats")
+                perfil.dump_stats(ruta)
+                marca["perfil_id"] = os.path.basename(ruta)
+
+        muestreador = _Muestreador(threading.get_ident(), settings.PROFILING_INTERVALO)
+        try:
+            with muestreador:
+                return func(*args, **kwargs)
+        finally:
+            ruta = _ruta_perfil(func.__name__, "folded")
+            with open(ruta, "w", encoding="utf-8") as f:
+                f.write(muestreador.folded())
+            marca["perfil_id"] = os.path.basename(ruta)
+
+    return envoltura
+
+
+def debe_perfilar(valor_header: Optional[str]) -> bool:
+    if valor_header == "1":
+        return True
+    return settings.PROFILING_TASA_MUESTREO > 0 and random.random() < settings.PROFILING_TASA_MUESTREO
+
+
+async def middleware_perfilado(request, call_next):
+    """Marca la petición (header X-Profile o muestreo aleatorio) y devuelve el id del perfil generado."""
+    if not debe_perfilar(request.headers.get(HEADER_PERFIL)):
+        return await call_next(request)
+
+    marca = {}
+    token = _peticion_perfilada.set(marca)
+    try:
+        response = await call_next(request)
+    finally:
+        _peticion_perfilada.reset(token)
+    if marca.get("perfil_id"):
+        response.headers[HEADER_PERFIL_ID] = marca["perfil_id"]
+    return response
+
+
+def ruta_perfil_existente(perfil_id: str) -> Optional[str]:
+    """Ruta del perfil si el id es válido y existe (evita path traversal)."""
+    if not _ID_VALIDO.match(perfil_id):
+        return None
+    ruta = os.path.join(settings.PROFILING_DIRECTORIO, perfil_id)
+    return ruta if os.path.isfile(ruta) else None
@@ -1,8 +1,13 @@
+import anyio.to_thread
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.api.v1.api import api_router
 from app.core.database import init_db
+from app.core.profiling import middleware_perfilado
+from app.services.suggestions import indice_sugerencias
+from app.services.popularity import contador_apariciones
+from app.services.candidate_cards import reconstruir_tarjetas
 
 # Inicializar la app
 app = FastAPI(title=settings.PROJECT_NAME)
@@ -20,10 +25,27 @@ app.add_middleware(
     allow_headers=["*"],  # Permitir todos los headers (Authorization, Content-Type...)
 )
 
+# Perfilado bajo demanda: solo se registra si está habilitado en la configuración
+if settings.PROFILING_HABILITADO:
+    app.middleware("http")(middleware_perfilado)
+
 # Evento de inicio (opcional, para crear tablas si no existe la DB)
 @app.on_event("startup")
 def on_startup():
     init_db()
+    indice_sugerencias.reconstruir()  # Autocompletado listo desde la primera petición
+    reconstruir_tarjetas()  # Solo las que falten: /search nunca escribe en el camino de lectura
+
+@app.on_event("startup")
+async def ampliar_threadpool():
+    # Las búsquedas en vuelo y en cola no deben dejar sin hilos al resto de endpoints síncronos
+    limitador = anyio.to_thread.current_default_thread_limiter()
+    necesarios = settings.SEARCH_MAX_CONCURRENCIA + settings.SEARCH_MAX_COLA + settings.THREADPOOL_HILOS_RESTO_API
+    limitador.total_tokens = max(limitador.total_tokens, necesarios)
+
+@app.on_event("shutdown")
+def on_shutdown():
+    contador_apariciones.volcar()  # Apariciones en búsquedas aún en memoria
 
 # Incluir rutas
 app.include_router(api_router, prefix=settings.API_V1_STR)
@@ -1,14 +1,19 @@
+from datetime import datetime
 from typing import Optional, List
 from sqlmodel import Field, SQLModel, Relationship
-from sqlalchemy import Column, Text  # <--- IMPORTANTE: Importar esto
+from sqlalchemy import Column, Text, Index, text  # <--- IMPORTANTE: Importar esto
+
+# Política de índices (ver app/core/migrations.py): solo se indexa lo que filtran/unen
+# search, stats, la cola y el importador. Las llaves foráneas id_aspirante siempre llevan índice;
+# los textos largos y los booleanos de Sede no (encarecen cada escritura y nadie los consulta).
 
 class Aspirante(SQLModel, table=True):
     id_aspirante: Optional[int] = Field(default=None, primary_key=True)
-    tipo_documento: str = Field(index=True)
-    num_documento: Optional[int] = Field(default=None, index=True)
-    nombre_completo: str = Field(index=True)
-    email: str = Field(index=True)
-    celular: str = Field(index=True)
+    tipo_documento: str
+    num_documento: Optional[int] = Field(default=None, index=True)  # Dedup / importador
+    nombre_completo: str
+    email: str = Field(index=True)  # Dedup / importador
+    celular: str
 
     # Relaciones para facilitar consultas (JOINs)
     informacion: Optional["Aspirante_Informacion"] = Relationship(back_populates="aspirante")
@@ -18,61 +23,138 @@ class Aspirante(SQLModel, table=True):
 
 class Aspirante_Informacion(SQLModel, table=True):
     id_info: Optional[int] = Field(default=None, primary_key=True)
-    id_aspirante: Optional[int] = Field(default=None, foreign_key='aspirante.id_aspirante')
-    titulo_profesional: str = Field(index=True)
-    disponibilidad: str = Field(index=True)
-    titulo_posgrado: str = Field(index=True)
-    tiene_experiencia: str = Field(index=True)
-    detalle_experiencia: str = Field(index=True)
+    id_aspirante: Optional[int] = Field(default=None, foreign_key='aspirante.id_aspirante', index=True)
+    titulo_profesional: str
+    disponibilidad: str
+    titulo_posgrado: str
+    tiene_experiencia: str
+    detalle_experiencia: str
+    # Última escritura del importador: el autocompletado detecta títulos editados por otros procesos
+    actualizado: Optional[datetime] = Field(default=None, index=True)
 
     aspirante: Optional[Aspirante] = Relationship(back_populates="informacion")
 
 # Actualización clave en Url_HojaDeVida
 class Url_HojaDeVida(SQLModel, table=True):
+    __table_args__ = (
+        # Índice parcial: solo las hojas de vida pendientes de resumen (cola y KPI de procesamiento)
+        Index("ix_url_hojadevida_pendientes", "id_url",
+              sqlite_where=text("resumen_estructurado IS NULL"),
+              postgresql_where=text("resumen_estructurado IS NULL")),
+    )
+
     id_url: Optional[int] = Field(default=None, primary_key=True)
-    id_aspirante: Optional[int] = Field(default=None, foreign_key='aspirante.id_aspirante')
-    url_hoja_de_vida: str = Field(index=True)
+    id_aspirante: Optional[int] = Field(default=None, foreign_key='aspirante.id_aspirante', index=True)
+    url_hoja_de_vida: str
     
     # Campo nuevo para guardar el texto procesado por Gemini
     resumen_estructurado: Optional[str] = Field(default=None, sa_column=Column(Text))
+    # Procedencia del resumen: versión prompt/modelo (ver app/services/versioning.py) y hash del documento analizado
+    resumen_version: Optional[str] = Field(default=None)
+    contenido_hash: Optional[str] = Field(default=None)
+    resumen_actualizado: Optional[datetime] = Field(default=None)
 
     aspirante: Optional["Aspirante"] = Relationship(back_populates="hoja_vida")
 
 class Aspirante_Facultad(SQLModel, table=True):
     id_facultad: Optional[int] = Field(default=None, primary_key=True)
-    id_aspirante: Optional[int] = Field(default=None, foreign_key='aspirante.id_aspirante')
-    nombre_facultad: str = Field(index=True)
+    id_aspirante: Optional[int] = Field(default=None, foreign_key='aspirante.id_aspirante', index=True)
+    nombre_facultad: str
 
     aspirante: Optional[Aspirante] = Relationship(back_populates="facultad")
 
 class Aspirante_Sede(SQLModel, table=True):
     id_sede: Optional[int] = Field(default=None, primary_key=True)
-    id_aspirante: Optional[int] = Field(default=None, foreign_key='aspirante.id_aspirante')
-    Manizales: bool = Field(default=False, index=True)
-    Chinchiná: bool = Field(default=False, index=True)
-    Villamaría: bool = Field(default=False, index=True)
-    Neira: bool = Field(default=False, index=True)
-    Palestina: bool = Field(default=False, index=True)
-    Risaralda: bool = Field(default=False, index=True)
-    Riosucio: bool = Field(default=False, index=True)
-    Anserma: bool = Field(default=False, index=True)
-    La_Dorada: bool = Field(default=False, index=True)
-    Supia: bool = Field(default=False, index=True)
-    Palestina_Arauca: bool = Field(default=False, index=True)
-    Arauca: bool = Field(default=False, index=True)
-    Viterbo: bool = Field(default=False, index=True)
-    Salamina: bool = Field(default=False, index=True)
-    Belalcazar: bool = Field(default=False, index=True)
-    Filadelfia: bool = Field(default=False, index=True)
-    Aguadas: bool = Field(default=False, index=True)
-    San_José: bool = Field(default=False, index=True)
-    Pacora: bool = Field(default=False, index=True)
-    Victoria: bool = Field(default=False, index=True)
-    Manzanares: bool = Field(default=False, index=True)
-    Norcasia: bool = Field(default=False, index=True)
-    Samaná: bool = Field(default=False, index=True)
+    id_aspirante: Optional[int] = Field(default=None, foreign_key='aspirante.id_aspirante', index=True)
+    Manizales: bool = Field(default=False)
+    Chinchiná: bool = Field(default=False)
+    Villamaría: bool = Field(default=False)
+    Neira: bool = Field(default=False)
+    Palestina: bool = Field(default=False)
+    Risaralda: bool = Field(default=False)
+    Riosucio: bool = Field(default=False)
+    Anserma: bool = Field(default=False)
+    La_Dorada: bool = Field(default=False)
+    Supia: bool = Field(default=False)
+    Palestina_Arauca: bool = Field(default=False)
+    Arauca: bool = Field(default=False)
+    Viterbo: bool = Field(default=False)
+    Salamina: bool = Field(default=False)
+    Belalcazar: bool = Field(default=False)
+    Filadelfia: bool = Field(default=False)
+    Aguadas: bool = Field(default=False)
+    San_José: bool = Field(default=False)
+    Pacora: bool = Field(default=False)
+    Victoria: bool = Field(default=False)
+    Manzanares: bool = Field(default=False)
+    Norcasia: bool = Field(default=False)
+    Samaná: bool = Field(default=False)
 
     aspirante: Optional[Aspirante] = Relationship(back_populates="sede")
 
 
 
+
+
+# Cola persistente de procesamiento de hojas de vida (un trabajo por Url_HojaDeVida)
+class Procesamiento_HojaDeVida(SQLModel, table=True):
+    __table_args__ = (
+        # reclamar_trabajos filtra por estado y ordena por intentos
+        Index("ix_procesamiento_hojadevida_estado_intentos", "estado", "intentos"),
+    )
+
+    id_trabajo: Optional[int] = Field(default=None, primary_key=True)
+    id_url: int = Field(foreign_key='url_hojadevida.id_url', unique=True, index=True)
+    estado: str = Field(default="pendiente")  # pendiente | en_proceso | completado | error | fallido | no_soportado | duplicado
+    intentos: int = Field(default=0)
+    prioridad: int = Field(default=0)  # Mayor primero: 0 = CV sin resumen; reprocesamientos en negativo (-1 = el más buscado)
+    ultimo_error: Optional[str] = Field(default=None, sa_column=Column(Text))
+    tipo_contenido: Optional[str] = Field(default=None)  # mimeType reportado por Drive
+    worker_id: Optional[str] = Field(default=None)
+    lease_hasta: Optional[datetime] = Field(default=None)
+    actualizado: Optional[datetime] = Field(default=None)
+
+
+# Caché local de metadatos de Google Drive (se llena por lotes antes de descargar)
+class Archivo_Drive(SQLModel, table=True):
+    file_id: str = Field(primary_key=True)
+    nombre: Optional[str] = Field(default=None)
+    mime_type: Optional[str] = Field(default=None)
+    tamano: Optional[int] = Field(default=None)
+    md5_checksum: Optional[str] = Field(default=None)
+    md5_analizado: Optional[str] = Field(default=None)         # md5 de la revisión que produjo el resumen vigente
+    no_encontrado_hasta: Optional[datetime] = Field(default=None)  # Drive respondió 404: no se consulta hasta esta fecha
+    actualizado: Optional[datetime] = Field(default=None)
+
+
+# Read model: tarjeta de resultado ya renderizada y serializada por aspirante
+class Tarjeta_Candidato(SQLModel, table=True):
+    id_aspirante: int = Field(primary_key=True, foreign_key='aspirante.id_aspirante')
+    bonificacion: float = Field(default=0.0)  # Bono de re-ranking (posgrado/experiencia)
+    fragmento_json: str = Field(sa_column=Column(Text, nullable=False))  # Campos de SearchResult sin scores ni llaves
+    actualizado: Optional[datetime] = Field(default=None)
+
+
+# Estado del vector de cada aspirante en Pinecone: permite re-embeber solo lo que cambió
+class Vector_Aspirante(SQLModel, table=True):
+    id_aspirante: int = Field(primary_key=True, foreign_key='aspirante.id_aspirante')
+    version: str                   # Modelo de embedding + espacio (completo/truncado/pca)
+    texto_hash: str                # Hash del texto embebido
+    metadata_hash: str             # Hash de la metadata de filtros (cambia sin re-embeber)
+    actualizado: Optional[datetime] = Field(default=None)
+
+
+# Veces que cada aspirante apareció en resultados de búsqueda (prioridad de reprocesamiento)
+class Popularidad_Aspirante(SQLModel, table=True):
+    id_aspirante: int = Field(primary_key=True, foreign_key='aspirante.id_aspirante')
+    apariciones: int = Field(default=0)
+    actualizado: Optional[datetime] = Field(default=None)
+
+
+# Aspirantes colapsados en otro (misma persona postulada varias veces): no se procesan, indexan ni muestran
+class Duplicado_Aspirante(SQLModel, table=True):
+    id_aspirante: int = Field(primary_key=True, foreign_key='aspirante.id_aspirante')
+    id_canonico: int = Field(foreign_key='aspirante.id_aspirante', index=True)
+    motivo: str                                 # documento, email, archivo y/o resumen (separados por coma)
+    similitud: Optional[float] = Field(default=None)  # Jaccard estimado (MinHash) si el motivo incluye resumen
+    detectado: Optional[datetime] = Field(default=None)
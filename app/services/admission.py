@@ -0,0 +1,119 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict
+from app.core.config import settings
+
+
+class ServicioSaturado(Exception):
+    """No hay capacidad para atender la petición ahora; el cliente debe reintentar más tarde."""
+
+    def __init__(self, motivo: str, status_code: int, retry_after: int):
+        super().__init__(motivo)
+        self.motivo = motivo
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class ControlAdmision:
+    """
+    Limita cuántas llamadas a servicios externos (Gemini + Pinecone) están en vuelo.
+    Las peticiones que exceden el límite esperan en una cola acotada con un plazo máximo;
+    si la cola está llena (429) o vence el plazo (503) se rechazan de inmediato con Retry-After,
+    en lugar de acumularse y disparar errores de cuota.
+    """
+
+    def __init__(self, nombre: str, max_concurrencia: int, max_cola: int, timeout_cola: float, retry_after: int):
+        self.nombre = nombre
+        self.max_concurrencia = max_concurrencia
+        self.max_cola = max_cola
+        self.timeout_cola = timeout_cola
+        self.retry_after = retry_after
+
+        self._cond = threading.Condition()
+        self._en_vuelo = 0
+        self._en_cola = 0
+        self._max_cola_observada = 0
+        self._admitidas = 0
+        self._rechazadas_cola_llena = 0
+        self._rechazadas_timeout = 0
+        self._errores_upstream = 0
+        self._espera_total = 0.0
+
+    @contextmanager
+    def admitir(self):
+        inicio = time.monotonic()
+        with self._cond:
+            if self._en_vuelo >= self.max_concurrencia:
+                if self._en_cola >= self.max_cola:
+                    self._rechazadas_cola_llena += 1
+                    raise ServicioSaturado("Cola de búsquedas llena", 429, self.retry_after)
+
+                self._en_cola += 1
+                self._max_cola_observada = max(self._max_cola_observada, self._en_cola)
+                limite = inicio + self.timeout_cola
+                try:
+                    while self._en_vuelo >= self.max_concurrencia:
+                        restante = limite - time.monotonic()
+                        if restante <= 0:
+                            self._rechazadas_timeout += 1
+                            raise ServicioSaturado("Tiempo de espera en cola agotado", 503, self.retry_after)
+                        self._cond.wait(restante)
+                finally:
+                    self._en_cola -= 1
+
+            self._en_vuelo += 1
+            self._admitidas += 1
+            self._espera_total += time.monotonic() - inicio
+
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._en_vuelo -= 1
+                self._cond.notify()
+
+    def rechazo_por_timeout(self) -> ServicioSaturado:
+        """Mismo 503 que un vencimiento en cola, para esperas que ocurren fuera de admitir() (ej: seguidores)."""
+        with self._cond:
+            self._rechazadas_timeout += 1
+        return ServicioSaturado("Tiempo de espera en cola agotado", 503, self.retry_after)
+
+    def registrar_error_upstream(self):
+        with self._cond:
+            self._errores_upstream += 1
+
+    def metricas(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "nombre": self.nombre,
+                "max_concurrencia": self.max_concurrencia,
+                "max_cola": self.max_cola,
+                "en_vuelo": self._en_vuelo,
+                "en_cola": self._en_cola,
+                "max_cola_observada": self._max_cola_observada,
+                "admitidas": self._admitidas,
+                "rechazadas_cola_llena": self._rechazadas_cola_llena,
+                "rechazadas_timeout": self._rechazadas_timeout,
+                "errores_upstream": self._errores_upstream,
+                "espera_promedio_ms": round(1000 * self._espera_total / self._admitidas, 2) if self._admitidas else 0.0,
+            }
+
+
+def plazo_seguidores() -> float:
+    """
+    Cuánto espera una búsqueda coalescida a su líder: lo que el líder puede pasar en la cola de
+    admisión más embedding y Pinecone. Con menos, los seguidores recibirían 503 por consultas
+    que el líder termina respondiendo bien.
+    """
+    return max(settings.SEARCH_TIMEOUT_SEGUIDORES, settings.SEARCH_TIMEOUT_COLA + settings.SEARCH_PRESUPUESTO_UPSTREAM)
+
+
+# Presupuesto compartido por todas las búsquedas semánticas del proceso
+control_busqueda = ControlAdmision(
+    "search",
+    max_concurrencia=settings.SEARCH_MAX_CONCURRENCIA,
+    max_cola=settings.SEARCH_MAX_COLA,
+    timeout_cola=settings.SEARCH_TIMEOUT_COLA,
+    retry_after=settings.SEARCH_RETRY_AFTER,
+)
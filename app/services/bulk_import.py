@@ -0,0 +1,295 @@
+import csv
+import io
+import re
+import unicodedata
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, Optional, Set
+from sqlalchemy import (
+    MetaData, Table, Column, Integer, String, Text, Boolean, bindparam, insert, select, update, delete, func, literal
+)
+from app.core.database import engine
+from app.models.models import (
+    Aspirante, Aspirante_Informacion, Aspirante_Sede, Aspirante_Facultad, Url_HojaDeVida,
+    Procesamiento_HojaDeVida, Tarjeta_Candidato
+)
+from app.services.recommendation import MUNICIPIOS
+from app.services.cv_processor import encolar_pendientes, PENDIENTE
+from app.services.candidate_cards import refrescar_tarjetas
+
+LOTE_STAGING = 5000  # Filas por executemany hacia la tabla de staging
+LOTE_TARJETAS = 500  # Tarjetas de búsqueda re-renderizadas por transacción al final
+
+# Campos canónicos -> encabezados aceptados en los exports de formularios (normalizados)
+COLUMNAS = {
+    "tipo_documento": ["tipo_documento", "tipo_de_documento", "tipo_doc"],
+    "num_documento": ["num_documento", "numero_de_documento", "numero_documento", "documento", "cedula"],
+    "nombre_completo": ["nombre_completo", "nombres_y_apellidos", "nombre"],
+    "email": ["email", "correo", "correo_electronico", "direccion_de_correo_electronico"],
+    "celular": ["celular", "telefono", "numero_de_celular"],
+    "titulo_profesional": ["titulo_profesional", "titulo_de_pregrado", "pregrado"],
+    "disponibilidad": ["disponibilidad", "disponibilidad_horaria"],
+    "titulo_posgrado": ["titulo_posgrado", "titulo_de_posgrado", "posgrado"],
+    "tiene_experiencia": ["tiene_experiencia", "experiencia_docente", "experiencia"],
+    "detalle_experiencia": ["detalle_experiencia", "detalle_de_experiencia", "describa_su_experiencia"],
+    "nombre_facultad": ["nombre_facultad", "facultad"],
+    "url_hoja_de_vida": ["url_hoja_de_vida", "hoja_de_vida", "url", "link_hoja_de_vida"],
+    "municipios": ["municipios", "sedes", "municipios_de_interes"],
+}
+
+_VALORES_VERDADEROS = {"si", "s", "x", "true", "1", "verdadero", "yes"}
+
+# Columnas de las tablas hijas 1:1 que alimenta el formulario
+_CAMPOS_ASPIRANTE = ["tipo_documento", "nombre_completo", "email", "celular"]
+_CAMPOS_INFO = ["titulo_profesional", "disponibilidad", "titulo_posgrado", "tiene_experiencia", "detalle_experiencia"]
+
+
+def normalizar_clave(texto: str) -> str:
+    """'Número de Documento' -> 'numero_de_documento' (sin tildes, minúsculas, guiones bajos)."""
+    sin_tildes = unicodedata.normalize("NFKD", texto or "").encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9]+", "_", sin_tildes.lower()).strip("_")
+
+
+_ALIAS = {alias: campo for campo, aliases in COLUMNAS.items() for alias in aliases}
+_MUNICIPIOS_POR_CLAVE = {normalizar_clave(m): m for m in MUNICIPIOS}
+
+
+def _texto(valor: Any) -> str:
+    if valor is None:
+        return ""
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)  # Excel entrega 16071354.0
+    return str(valor).strip()
+
+
+def _normalizar_documento(valor: Any) -> str:
+    return re.sub(r"[\s.,]", "", _texto(valor))
+
+
+def leer_filas(nombre_archivo: str, contenido: bytes) -> Iterator[Dict[str, Any]]:
+    """Itera las filas de un export CSV o XLSX como diccionarios {encabezado: valor}."""
+    if nombre_archivo.lower().endswith((".xlsx", ".xlsm")):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise RuntimeError("Para importar archivos XLSX instala openpyxl (pip install openpyxl)")
+        hoja = load_workbook(io.BytesIO(contenido), read_only=True, data_only=True).active
+        filas = hoja.iter_rows(values_only=True)
+        encabezados = [_texto(h) for h in next(filas, [])]
+        for fila in filas:
+            yield dict(zip(encabezados, fila))
+    else:
+        texto = contenido.decode("utf-8-sig")
+        dialecto = csv.Sniffer().sniff(texto[:4096], delimiters=",;\t")
+        yield from csv.DictReader(io.StringIO(texto), dialect=dialecto)
+
+
+def campos_presentes(encabezados: Iterable[str]) -> Set[str]:
+    """
+    Campos canónicos (y municipios) que el archivo trae como columna. Lo que no viene en el
+    archivo no se toca en los aspirantes existentes: un export parcial no borra datos.
+    """
+    presentes = set()
+    for encabezado in encabezados:
+        clave = normalizar_clave(encabezado or "")
+        campo = _ALIAS.get(clave)
+        if campo == "municipios":
+            presentes.update(MUNICIPIOS)  # La lista dice cuáles sí; los demás quedan en False
+        elif campo:
+            presentes.add(campo)
+        elif clave in _MUNICIPIOS_POR_CLAVE:
+            presentes.add(_MUNICIPIOS_POR_CLAVE[clave])
+    return presentes
+
+
+def mapear_fila(fila: Dict[str, Any], numero: int) -> Optional[Dict[str, Any]]:
+    """Lleva una fila del formulario al esquema de staging. Retorna None si no trae documento."""
+    registro = {campo: "" for campo in COLUMNAS if campo != "municipios"}
+    registro.update({m: False for m in MUNICIPIOS})
+    registro["fila"] = numero
+
+    for encabezado, valor in fila.items():
+        clave = normalizar_clave(encabezado)
+        campo = _ALIAS.get(clave)
+        if campo == "municipios":
+            # Lista separada por comas/punto y coma: "Manizales, La Dorada"
+            for nombre in re.split(r"[,;]", _texto(valor)):
+                municipio = _MUNICIPIOS_POR_CLAVE.get(normalizar_clave(nombre))
+                if municipio:
+                    registro[municipio] = True
+        elif campo:
+            registro[campo] = _texto(valor)
+        elif clave in _MUNICIPIOS_POR_CLAVE:
+            # Una columna por municipio marcada con Sí/X
+            registro[_MUNICIPIOS_POR_CLAVE[clave]] = normalizar_clave(_texto(valor)) in _VALORES_VERDADEROS
+
+    registro["num_documento"] = _normalizar_documento(registro["num_documento"])
+    registro["email"] = registro["email"].lower()
+    if not registro["num_documento"]:
+        return None
+    return registro
+
+
+def email_normalizado(columna):
+    """Expresión lower(trim(email)): debe coincidir con ix_aspirante_email_normalizado para usar el índice."""
+    return func.lower(func.trim(columna))
+
+
+def _tabla_staging(metadata: MetaData) -> Table:
+    return Table(
+        "stg_aspirante", metadata,
+        Column("fila", Integer, primary_key=True),
+        Column("id_aspirante", Integer),
+        *[Column(campo, Text if campo == "detalle_experiencia" else String) for campo in COLUMNAS if campo != "municipios"],
+        *[Column(m, Boolean) for m in MUNICIPIOS],
+        prefixes=["TEMPORARY"],
+    )
+
+
+def importar_aspirantes(filas: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Importa en bloque un export de formulario hacia Aspirante y sus tablas hijas.
+    1. Carga todo a una tabla temporal de staging con executemany por lotes.
+    2. Deduplica dentro del archivo (gana la última fila por documento y por email).
+    3. Empareja con aspirantes existentes por num_documento y luego por email (columnas indexadas).
+    4. Actualiza/inserta con sentencias set-based dentro de UNA transacción. En los existentes
+       solo se sobrescriben las columnas que el archivo trae (ver campos_presentes).
+    5. Las URLs nuevas o cambiadas quedan pendientes para process_pdfs.
+    """
+    metadata = MetaData()
+    stg = _tabla_staging(metadata)
+    A = Aspirante.__table__
+    INFO = Aspirante_Informacion.__table__
+    SEDE = Aspirante_Sede.__table__
+    FAC = Aspirante_Facultad.__table__
+    URL = Url_HojaDeVida.__table__
+    COLA = Procesamiento_HojaDeVida.__table__
+
+    resumen = {"leidas": 0, "sin_documento": 0, "duplicadas_en_archivo": 0,
+               "nuevos": 0, "actualizados": 0, "urls_para_procesar": 0}
+
+    presentes: Set[str] = set()
+    ahora = datetime.now(timezone.utc)
+
+    with engine.begin() as conn:
+        stg.create(conn)
+
+        # --- 1. Carga a staging ---
+        lote = []
+        for numero, fila in enumerate(filas, start=2):  # fila 1 = encabezados
+            if numero == 2:
+                presentes = campos_presentes(fila.keys())
+            resumen["leidas"] += 1
+            registro = mapear_fila(fila, numero)
+            if registro is None:
+                resumen["sin_documento"] += 1
+                continue
+            lote.append(registro)
+            if len(lote) >= LOTE_STAGING:
+                conn.execute(insert(stg), lote)
+                lote = []
+        if lote:
+            conn.execute(insert(stg), lote)
+
+        conn.exec_driver_sql("CREATE INDEX ix_stg_doc ON stg_aspirante (num_documento)")
+        conn.exec_driver_sql("CREATE INDEX ix_stg_email ON stg_aspirante (email)")
+
+        # --- 2. Dedup dentro del archivo ---
+        ultima_fila = select(func.max(stg.c.fila)).group_by(stg.c.num_documento)
+        resumen["duplicadas_en_archivo"] = conn.execute(delete(stg).where(stg.c.fila.not_in(ultima_fila))).rowcount or 0
+        # Documentos distintos con el mismo correo son la misma persona: gana la última fila
+        ultima_por_email = select(func.max(stg.c.fila)).where(stg.c.email != "").group_by(stg.c.email)
+        resumen["duplicadas_en_archivo"] += conn.execute(
+            delete(stg).where(stg.c.email != "", stg.c.fila.not_in(ultima_por_email))
+        ).rowcount or 0
+
+        # --- 3. Emparejar con aspirantes existentes (documento, luego email) ---
+        por_documento = select(func.min(A.c.id_aspirante)).where(A.c.num_documento == stg.c.num_documento).scalar_subquery()
+        conn.execute(update(stg).values(id_aspirante=por_documento))
+        # Staging ya viene en minúsculas y sin espacios; los guardados no (índice de expresión, migración 0005)
+        por_email = select(func.min(A.c.id_aspirante)).where(email_normalizado(A.c.email) == stg.c.email).scalar_subquery()
+        conn.execute(update(stg).where(stg.c.id_aspirante == None, stg.c.email != "").values(id_aspirante=por_email))
+        # Dos filas con documentos distintos pueden apuntar al mismo aspirante vía email: gana la última
+        ultima_por_aspirante = select(func.max(stg.c.fila)).where(stg.c.id_aspirante != None).group_by(stg.c.id_aspirante)
+        resumen["duplicadas_en_archivo"] += conn.execute(
+            delete(stg).where(stg.c.id_aspirante != None, stg.c.fila.not_in(ultima_por_aspirante))
+        ).rowcount or 0
+
+        # --- 4a. Actualizar aspirantes existentes (solo las columnas presentes en el archivo) ---
+        existentes = conn.execute(select(stg).where(stg.c.id_aspirante != None)).mappings().all()
+        if existentes:
+            campos = ["num_documento"] + [c for c in _CAMPOS_ASPIRANTE if c in presentes]
+            conn.execute(
+                update(A).where(A.c.id_aspirante == bindparam("b_id")).values({c: bindparam(f"b_{c}") for c in campos}),
+                [{"b_id": r["id_aspirante"], **{f"b_{c}": r[c] for c in campos}} for r in existentes],
+            )
+        resumen["actualizados"] = len(existentes)
+
+        # --- 4b. Insertar aspirantes nuevos y recuperar sus ids ---
+        nuevos = select(stg.c.tipo_documento, stg.c.num_documento, stg.c.nombre_completo, stg.c.email, stg.c.celular) \
+            .where(stg.c.id_aspirante == None).order_by(stg.c.fila)
+        resumen["nuevos"] = conn.execute(
+            insert(A).from_select(["tipo_documento", "num_documento", "nombre_completo", "email", "celular"], nuevos)
+        ).rowcount or 0
+        conn.execute(update(stg).where(stg.c.id_aspirante == None).values(id_aspirante=por_documento))
+
+        ids_importados = select(stg.c.id_aspirante)
+        # Las búsquedas van siempre de las tablas grandes hacia staging (indexada por id_aspirante)
+        # o por IN materializado, nunca con un subquery correlacionado sobre la tabla grande.
+        conn.exec_driver_sql("CREATE INDEX ix_stg_aspirante ON stg_aspirante (id_aspirante)")
+
+        # --- 4c. Tablas hijas 1:1: UPDATE de las columnas presentes, INSERT para quien no tiene fila ---
+        for tabla, campos in ((INFO, _CAMPOS_INFO), (SEDE, MUNICIPIOS), (FAC, ["nombre_facultad"])):
+            # Aspirante_Informacion lleva marca de escritura (el autocompletado de la API la vigila)
+            marca = {"actualizado": ahora} if tabla is INFO else {}
+            actualizables = [c for c in campos if c in presentes]
+            if actualizables:
+                # UPDATE ... FROM staging (un join, no un subquery por columna)
+                condicion = [tabla.c.id_aspirante == stg.c.id_aspirante]
+                if tabla is FAC:
+                    condicion.append(stg.c.nombre_facultad != "")  # Celda vacía: se conserva la facultad registrada
+                conn.execute(update(tabla).where(*condicion).values({**{c: stg.c[c] for c in actualizables}, **marca}))
+
+            # Las columnas ausentes del archivo quedan con el valor vacío de staging ("" / False)
+            origen = select(stg.c.id_aspirante, *[stg.c[c] for c in campos], *[literal(v) for v in marca.values()]).where(
+                stg.c.id_aspirante.not_in(select(tabla.c.id_aspirante).where(tabla.c.id_aspirante != None)))
+            if tabla is FAC:
+                origen = origen.where(stg.c.nombre_facultad != "")
+            conn.execute(insert(tabla).from_select(["id_aspirante"] + campos + list(marca), origen))
+
+        # --- 5. URLs: insertar las nuevas y resetear las que cambiaron ---
+        url_importada = select(stg.c.url_hoja_de_vida).where(stg.c.id_aspirante == URL.c.id_aspirante).scalar_subquery()
+        cambio_url = conn.execute(
+            update(URL)
+            .where(URL.c.id_aspirante.in_(ids_importados), url_importada != "", URL.c.url_hoja_de_vida != url_importada)
+            # Archivo nuevo: la procedencia del resumen anterior (versión, hash) ya no aplica
+            .values(url_hoja_de_vida=url_importada, resumen_estructurado=None, resumen_version=None,
+                    contenido_hash=None, resumen_actualizado=None)
+            .returning(URL.c.id_url)
+        ).scalars().all()
+        if cambio_url:
+            # Formatos "no soportados" o trabajos fallidos se re-evalúan con el archivo nuevo
+            # (mismo reinicio que encolar_pendientes: prioridad de CV sin resumen y marca de tiempo)
+            conn.execute(
+                update(COLA).where(COLA.c.id_url.in_(cambio_url))
+                .values(estado=PENDIENTE, intentos=0, prioridad=0, ultimo_error=None, lease_hasta=None, actualizado=ahora)
+            )
+
+        sin_url = select(stg.c.id_aspirante, stg.c.url_hoja_de_vida).where(
+            stg.c.url_hoja_de_vida != "",
+            stg.c.id_aspirante.not_in(select(URL.c.id_aspirante).where(URL.c.id_aspirante != None)),
+        )
+        urls_nuevas = conn.execute(insert(URL).from_select(["id_aspirante", "url_hoja_de_vida"], sin_url)).rowcount or 0
+        resumen["urls_para_procesar"] = len(cambio_url) + urls_nuevas
+
+        # Las tarjetas de búsqueda de los importados quedan obsoletas (se vuelven a guardar al final)
+        conn.execute(delete(Tarjeta_Candidato.__table__).where(Tarjeta_Candidato.__table__.c.id_aspirante.in_(ids_importados)))
+        importados = conn.execute(ids_importados).scalars().all()
+        stg.drop(conn)
+
+    # Crea los trabajos de la cola para las URLs sin resumen
+    encolar_pendientes()
+    # El importador es el escritor: deja las tarjetas listas para que /search no tenga que escribirlas
+    for i in range(0, len(importados), LOTE_TARJETAS):
+        refrescar_tarjetas(importados[i:i + LOTE_TARJETAS])
+    return resumen
+
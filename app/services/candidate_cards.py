@@ -0,0 +1,182 @@
+import json
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import selectinload
+from sqlmodel import Session, select
+from app.core.database import engine
+from app.core.invalidation import suscribir
+from app.models.models import (
+    Aspirante, Aspirante_Informacion, Aspirante_Sede, Url_HojaDeVida, Tarjeta_Candidato
+)
+from app.services.recommendation import obtener_sedes_activas, calcular_bonificacion, aplicar_bonificacion
+
+# Tablas que alimentan la tarjeta: cualquier cambio en ellas la invalida
+_MODELOS_FUENTE = (Aspirante, Aspirante_Informacion, Aspirante_Sede, Url_HojaDeVida)
+LOTE_RECONSTRUCCION = 500
+
+
+def renderizar_tarjeta(aspirante_db: Aspirante, texto_ia: Optional[str]) -> Tuple[float, str]:
+    """
+    Construye la tarjeta del candidato (todo SearchResult menos los scores) y la
+    serializa una sola vez. Retorna (bonificacion, fragmento_json sin llaves externas).
+    """
+    info = aspirante_db.informacion
+    sede = aspirante_db.sede
+    texto_ia = texto_ia or "Sin análisis detallado disponible."
+
+    # Construcción del Resumen Rico
+    resumen_rico = (
+        f"🎓 Título: {info.titulo_profesional if info else 'N/A'}\n"
+        f"📚 Posgrado: {info.titulo_posgrado if info else 'N/A'}\n"
+        f"🕒 Disponibilidad: {info.disponibilidad if info else 'No especificada'}\n"
+        f"📋 Detalle Experiencia: {getattr(info, 'detalle_experiencia', 'Sin registro manual')}\n"
+        f"📧 Email: {aspirante_db.email}\n"
+        f"{texto_ia}" # <--- AQUÍ INYECTAMOS LA EXPERIENCIA Y PERFIL
+    )
+
+    bono, bonuses = calcular_bonificacion(info)
+    tarjeta = {
+        "id_aspirante": str(aspirante_db.id_aspirante),
+        "nombre": aspirante_db.nombre_completo,
+        "email": aspirante_db.email,
+        "celular": aspirante_db.celular,
+        "municipios": obtener_sedes_activas(sede),
+        "titulo_profesional": info.titulo_profesional if info else "",
+        "titulo_posgrado": info.titulo_posgrado if info else "",
+        "resumen": resumen_rico,
+        "bonificaciones": bonuses,
+    }
+    return bono, json.dumps(tarjeta, ensure_ascii=False)[1:-1]
+
+
+class TarjetaRenderizada(NamedTuple):
+    bonificacion: float
+    fragmento_json: str
+
+
+def _renderizar_tarjetas(session: Session, ids: List[int]) -> Dict[int, TarjetaRenderizada]:
+    """Renderiza las tarjetas de los aspirantes indicados (hidratación en lote), sin escribir nada."""
+    aspirantes = session.exec(
+        select(Aspirante)
+        .where(Aspirante.id_aspirante.in_(ids))
+        .options(selectinload(Aspirante.informacion), selectinload(Aspirante.sede))
+    ).all()
+    textos = {
+        hv.id_aspirante: hv.resumen_estructurado
+        for hv in session.exec(select(Url_HojaDeVida).where(Url_HojaDeVida.id_aspirante.in_(ids))).all()
+        if hv.resumen_estructurado
+    }
+    return {
+        aspirante_db.id_aspirante: TarjetaRenderizada(*renderizar_tarjeta(aspirante_db, textos.get(aspirante_db.id_aspirante)))
+        for aspirante_db in aspirantes
+    }
+
+
+def refrescar_tarjetas(ids_aspirantes: Iterable[int], session: Optional[Session] = None) -> Dict[int, TarjetaRenderizada]:
+    """
+    Re-renderiza y guarda las tarjetas de los aspirantes indicados. Lo llaman los escritores
+    (process_pdfs, importador, sync_pinecone) después de cambiar las tablas fuente.
+    """
+    ids = list({int(i) for i in ids_aspirantes if i is not None})
+    if not ids:
+        return {}
+    if session is None:
+        with Session(engine, expire_on_commit=False) as nueva:
+            return refrescar_tarjetas(ids, nueva)
+
+    tarjetas = _renderizar_tarjetas(session, ids)
+    ahora = datetime.now(timezone.utc)
+    # Read model: se reemplazan las filas en bloque (sin instanciar un objeto ORM por tarjeta)
+    conn = session.connection()
+    conn.execute(delete(Tarjeta_Candidato).where(Tarjeta_Candidato.id_aspirante.in_(ids)))
+    if tarjetas:
+        conn.execute(insert(Tarjeta_Candidato), [
+            {"id_aspirante": aid, "bonificacion": t.bonificacion, "fragmento_json": t.fragmento_json, "actualizado": ahora}
+            for aid, t in tarjetas.items()
+        ])
+    session.commit()
+    return tarjetas
+
+
+def reconstruir_tarjetas(todas: bool = False, lote: int = LOTE_RECONSTRUCCION) -> int:
+    """
+    Llena el read model por lotes: las tarjetas que faltan (base migrada, invalidaciones que no se
+    alcanzaron a refrescar) o, con `todas`, todas de nuevo. Retorna cuántas tarjetas se guardaron.
+    """
+    consulta = select(Aspirante.id_aspirante).order_by(Aspirante.id_aspirante)
+    if not todas:
+        consulta = consulta.where(~select(Tarjeta_Candidato.id_aspirante)
+                                  .where(Tarjeta_Candidato.id_aspirante == Aspirante.id_aspirante).exists())
+    with Session(engine) as session:
+        ids = session.exec(consulta).all()
+
+    guardadas = 0
+    for i in range(0, len(ids), lote):
+        guardadas += len(refrescar_tarjetas(ids[i:i + lote]))
+    return guardadas
+
+
+def obtener_tarjetas(ids_aspirantes: List[int]) -> Dict[int, TarjetaRenderizada]:
+    """
+    Lee las tarjetas cacheadas; las que falten (nuevas o invalidadas) se renderizan en memoria
+    sin guardarlas: el camino de lectura no toma locks de escritura mientras los workers escriben.
+    """
+    if not ids_aspirantes:
+        return {}
+    T = Tarjeta_Candidato
+    with Session(engine) as session:
+        tarjetas = {
+            aid: TarjetaRenderizada(bono, fragmento)
+            for aid, bono, fragmento in session.exec(
+                select(T.id_aspirante, T.bonificacion, T.fragmento_json).where(T.id_aspirante.in_(ids_aspirantes))
+            ).all()
+        }
+        faltantes = [aid for aid in ids_aspirantes if aid not in tarjetas]
+        if faltantes:
+            tarjetas.update(_renderizar_tarjetas(session, faltantes))
+        return tarjetas
+
+
+def serializar_resultados(filas: List[Tuple[float, float, str]]) -> str:
+    """
+    Arma la respuesta JSON empalmando fragmentos pre-serializados.
+    Cada fila es (score_final, score_semantico, fragmento_json).
+    """
+    return "[" + ",".join(serializar_fila(*fila) for fila in filas) + "]"
+
+
+def serializar_fila(score_final: float, score_semantico: float, fragmento: str) -> str:
+    """Objeto JSON de un SearchResult a partir de su fragmento pre-serializado."""
+    return f'{{"score_semantico":{json.dumps(round(score_semantico, 4))},"score_final":{json.dumps(score_final)},{fragmento}}}'
+
+
+def filas_resultado(aspirantes_ids: List[int], scores_map: Dict[int, float]) -> List[Tuple[float, float, str]]:
+    """(score_final, score_semantico, fragmento) en el orden de `aspirantes_ids`, omitiendo los que no existen en la BD."""
+    tarjetas = obtener_tarjetas(aspirantes_ids)
+    filas = []
+    for aid in aspirantes_ids:
+        tarjeta = tarjetas.get(aid)
+        if not tarjeta: continue
+        base_score = scores_map.get(aid, 0.0)
+        filas.append((aplicar_bonificacion(base_score, tarjeta.bonificacion), base_score, tarjeta.fragmento_json))
+    return filas
+
+
+# --- Invalidación automática ---
+# Cualquier edición ORM sobre las tablas fuente borra la tarjeta del aspirante en la misma transacción
+# (nunca se sirve una tarjeta vieja) y, tras el commit, se vuelve a guardar. Si ese refresco falla,
+# las búsquedas la renderizan en memoria hasta el próximo reconstruir_tarjetas.
+def _borrar_tarjetas(session: Session, ids: Set[int]):
+    session.connection().execute(delete(Tarjeta_Candidato).where(Tarjeta_Candidato.id_aspirante.in_(ids)))
+
+
+def _refrescar_tras_commit(ids: Set[int]):
+    try:
+        refrescar_tarjetas(ids)
+    except Exception as e:
+        # El cambio del escritor ya quedó guardado: no se le propaga el error de la caché
+        print(f"⚠️ No se pudieron refrescar las tarjetas de {len(ids)} aspirantes: {e}")
+
+
+suscribir("tarjetas", _MODELOS_FUENTE, tras_commit=_refrescar_tras_commit, durante_flush=_borrar_tarjetas)
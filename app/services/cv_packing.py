@@ -0,0 +1,112 @@
+import json
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Formato plano de resumen_estructurado (lo que consumen tarjetas, embeddings y autocompletado)
+SECCIONES = [
+    "PERFIL_PROFESIONAL", "TITULOS_ACADEMICOS", "HABILIDADES_TECNICAS",
+    "EXPERIENCIA_DOCENTE", "EXPERIENCIA_INDUSTRIA", "IDIOMAS",
+]
+SIN_DATOS = "DATOS_NO_DISPONIBLES"
+
+CARACTERES_POR_TOKEN = 4      # Aproximación conservadora para español
+TOKENS_PROMPT_LOTE = 600      # Instrucciones + delimitadores
+TOKENS_SALIDA_POR_CV = 500    # Se reserva para la respuesta de cada CV
+
+
+def estimar_tokens(contenido: bytes) -> int:
+    return len(contenido.decode("utf-8", errors="ignore")) // CARACTERES_POR_TOKEN + 1
+
+
+def empaquetar(documentos: Sequence[Tuple[str, bytes]], max_tokens: int, max_documentos: int) -> List[List[Tuple[str, bytes]]]:
+    """
+    Agrupa (id, texto) en paquetes que no superan `max_tokens` (entrada + salida reservada)
+    ni `max_documentos`. Primero los más grandes (first-fit decreasing). Un documento que
+    no cabe solo queda en un paquete de uno y se analiza por la vía individual.
+    """
+    paquetes: List[Tuple[int, List[Tuple[str, bytes]]]] = []
+    costo = lambda doc: estimar_tokens(doc[1]) + TOKENS_SALIDA_POR_CV
+    for doc in sorted(documentos, key=costo, reverse=True):
+        tokens = costo(doc)
+        for i, (usados, paquete) in enumerate(paquetes):
+            if len(paquete) < max_documentos and usados + tokens <= max_tokens:
+                paquetes[i] = (usados + tokens, paquete + [doc])
+                break
+        else:
+            paquetes.append((TOKENS_PROMPT_LOTE + tokens, [doc]))
+    return [paquete for _, paquete in paquetes]
+
+
+def construir_prompt_lote(documentos: Sequence[Tuple[str, bytes]]) -> str:
+    cuerpo = "\n\n".join(
+        f"<<<CV id={doc_id}>>>\n{contenido.decode('utf-8', errors='ignore')}\n<<<FIN CV id={doc_id}>>>"
+        for doc_id, contenido in documentos
+    )
+    ejemplo = json.dumps([{"id": "<id del delimitador>", "datos_no_disponibles": False, **{s: "..." for s in SECCIONES}}])
+    return f"""
+    A continuación hay {len(documentos)} hojas de vida, cada una delimitada por <<<CV id=...>>> y <<<FIN CV id=...>>>.
+    Analiza CADA una por separado, sin mezclar información entre documentos.
+
+    Responde SOLO con un arreglo JSON con un objeto por hoja de vida, en cualquier orden:
+    {ejemplo}
+
+    - Si un documento está vacío, ilegible o no es un CV, usa "datos_no_disponibles": true y deja las demás claves vacías.
+    - TITULOS_ACADEMICOS e HABILIDADES_TECNICAS son listas separadas por comas dentro de un texto.
+    - Cada valor es texto plano de una sola línea.
+
+    {cuerpo}
+    """
+
+
+def _texto_plano(valor) -> str:
+    if isinstance(valor, list):
+        valor = ", ".join(str(v) for v in valor)
+    return " ".join(str(valor or "").split())
+
+
+def validar_resumen(texto: Optional[str]) -> bool:
+    """Un resumen válido trae todas las secciones del formato plano, en orden, y un perfil no vacío."""
+    if not texto or SIN_DATOS in texto:
+        return False
+    posiciones = [texto.find(f"{s}:") for s in SECCIONES]
+    if -1 in posiciones or posiciones != sorted(posiciones):
+        return False
+    perfil = texto[posiciones[0] + len(SECCIONES[0]) + 1: posiciones[1]].strip()
+    return bool(perfil)
+
+
+def separar_respuesta_lote(texto: str, ids: Sequence[str]) -> Dict[str, Optional[str]]:
+    """
+    Convierte la respuesta JSON del lote en {id: resumen_plano | None}.
+    None = el modelo indicó que no hay datos. Los ids ausentes, repetidos o con un
+    resumen que no pasa la validación no se incluyen: el llamador los reintenta uno a uno.
+    Lanza ValueError si la respuesta no es JSON con la forma esperada.
+    """
+    texto = texto.strip()
+    if texto.startswith("```"):
+        texto = texto.strip("`").removeprefix("json").strip()
+    datos = json.loads(texto)
+    if isinstance(datos, dict):
+        datos = datos.get("resultados", [datos])
+    if not isinstance(datos, list):
+        raise ValueError("La respuesta del lote no es un arreglo JSON")
+
+    esperados = set(ids)
+    vistos, resultados = set(), {}
+    for item in datos:
+        if not isinstance(item, dict):
+            continue
+        doc_id = str(item.get("id", "")).strip()
+        if doc_id not in esperados:
+            continue
+        if doc_id in vistos:
+            resultados.pop(doc_id, None)  # Respuesta ambigua: se resuelve individualmente
+            continue
+        vistos.add(doc_id)
+
+        if item.get("datos_no_disponibles") is True:
+            resultados[doc_id] = None
+            continue
+        resumen = "\n".join(f"{s}: {_texto_plano(item.get(s)) or 'No especificado'}" for s in SECCIONES)
+        if _texto_plano(item.get(SECCIONES[0])) and validar_resumen(resumen):
+            resultados[doc_id] = resumen
+    return resultados
@@ -0,0 +1,388 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+from sqlmodel import Session, select, func
+from sqlalchemy import update, insert, literal, and_, or_, bindparam
+from app.core.database import engine
+from app.models.models import (
+    Url_HojaDeVida, Procesamiento_HojaDeVida, Archivo_Drive, Popularidad_Aspirante, Duplicado_Aspirante
+)
+
+# --- Estados de la cola ---
+PENDIENTE = "pendiente"
+EN_PROCESO = "en_proceso"
+COMPLETADO = "completado"
+ERROR = "error"                # Falló, pero se puede reintentar
+FALLIDO = "fallido"            # Agotó los reintentos: no vuelve a la cola
+NO_SOPORTADO = "no_soportado"  # Formato que nunca podremos leer (ej: .doc viejos)
+DUPLICADO = "duplicado"        # El aspirante fue colapsado en otro (ver app/services/dedup.py)
+
+MAX_INTENTOS = 3
+LEASE_SEGUNDOS = 15 * 60
+
+
+class ArchivoNoSoportado(Exception):
+    """El archivo existe pero su formato nunca será procesable (se excluye de la cola)."""
+
+    def __init__(self, mime_type: Optional[str]):
+        super().__init__(f"Formato no soportado: {mime_type}")
+        self.mime_type = mime_type
+
+
+class CuotaAgotada(Exception):
+    """Gemini rechazó la llamada por cuota: no es culpa del CV, así que no debe gastar un intento."""
+
+
+def _ahora() -> datetime:
+    # Todas las fechas de la cola se guardan en UTC
+    return datetime.now(timezone.utc)
+
+
+def _condicion_reclamable(ahora: datetime):
+    """Trabajos que un worker puede tomar: nuevos, con error reintentable o con lease vencido."""
+    T = Procesamiento_HojaDeVida
+    return or_(
+        T.estado == PENDIENTE,
+        and_(T.estado == ERROR, T.intentos < MAX_INTENTOS),
+        and_(T.estado == EN_PROCESO, T.lease_hasta < ahora, T.intentos < MAX_INTENTOS),
+    )
+
+
+def _fallar_leases_agotados(session: Session, ahora: datetime) -> int:
+    """
+    Un CV que tumba o cuelga al worker en cada intento nunca llega a marcar_error: su lease
+    vence una y otra vez. Al agotar los reintentos así, el trabajo queda FALLIDO y sale de la cola.
+    """
+    T = Procesamiento_HojaDeVida
+    return session.exec(
+        update(T)
+        .where(T.estado == EN_PROCESO, T.lease_hasta < ahora, T.intentos >= MAX_INTENTOS)
+        .values(estado=FALLIDO, lease_hasta=None, actualizado=ahora,
+                ultimo_error=f"Lease vencido en {MAX_INTENTOS} intentos (worker caído o colgado)")
+        .execution_options(synchronize_session=False)
+    ).rowcount or 0
+
+
+def _sin_duplicado():
+    return ~select(Duplicado_Aspirante.id_aspirante).where(
+        Duplicado_Aspirante.id_aspirante == Url_HojaDeVida.id_aspirante).exists()
+
+
+def encolar_pendientes() -> int:
+    """
+    Crea un trabajo por cada hoja de vida sin resumen que aún no esté en la cola
+    y reactiva los completados cuyo resumen fue borrado (y los duplicados que dejaron de serlo).
+    Los aspirantes colapsados como duplicados no se encolan. Retorna cuántos se encolaron.
+    """
+    T = Procesamiento_HojaDeVida
+    ahora = _ahora()
+    with Session(engine) as session:
+        # INSERT ... SELECT en una sola sentencia: si dos workers encolan a la vez,
+        # el índice único sobre id_url evita duplicados.
+        sin_trabajo = (
+            select(Url_HojaDeVida.id_url, literal(PENDIENTE), literal(0), literal(ahora))
+            .where(Url_HojaDeVida.resumen_estructurado == None, _sin_duplicado())
+            .where(~select(T.id_trabajo).where(T.id_url == Url_HojaDeVida.id_url).exists())
+        )
+        nuevos = session.exec(
+            insert(T).from_select(["id_url", "estado", "intentos", "actualizado"], sin_trabajo)
+        ).rowcount
+
+        sin_resumen = select(Url_HojaDeVida.id_url).where(Url_HojaDeVida.resumen_estructurado == None, _sin_duplicado())
+        reactivados = session.exec(
+            update(T)
+            .where(T.estado.in_([COMPLETADO, DUPLICADO]), T.id_url.in_(sin_resumen))
+            .values(estado=PENDIENTE, intentos=0, prioridad=0, ultimo_error=None, actualizado=ahora)
+        ).rowcount
+
+        session.commit()
+        return (nuevos or 0) + (reactivados or 0)
+
+
+def _consulta_desactualizados(version: str):
+    """Hojas de vida con resumen de otra versión (o sin versión), las más buscadas primero."""
+    U, P = Url_HojaDeVida, Popularidad_Aspirante
+    return (
+        select(U.id_url)
+        .outerjoin(P, P.id_aspirante == U.id_aspirante)
+        .where(U.resumen_estructurado != None, or_(U.resumen_version == None, U.resumen_version != version), _sin_duplicado())
+        .order_by(func.coalesce(P.apariciones, 0).desc(), U.id_url)
+    )
+
+
+def encolar_reprocesamiento(version: str, limite: Optional[int] = None) -> int:
+    """
+    Encola (o reactiva) los trabajos de las hojas de vida cuyo resumen no es de `version`.
+    El resumen viejo se conserva hasta que el nuevo quede listo. La prioridad sigue la popularidad
+    (-1 = el más buscado) y va detrás de los CVs sin resumen (prioridad 0). Con `limite` solo entran
+    los N primeros; las siguientes corridas continúan con el resto, porque lo ya reprocesado queda al día.
+    Los que ya están en cola (pendiente, en proceso, error) no se tocan. Retorna cuántos se encolaron.
+    """
+    T = Procesamiento_HojaDeVida
+    ahora = _ahora()
+    consulta = _consulta_desactualizados(version)
+    if limite:
+        consulta = consulta.limit(limite)
+
+    with Session(engine) as session:
+        ids = session.exec(consulta).all()
+        if not ids:
+            return 0
+        estados = dict(session.exec(select(T.id_url, T.estado).where(T.id_url.in_(ids))).all())
+
+        nuevos, reactivar = [], []
+        for posicion, id_url in enumerate(ids):
+            prioridad = -(posicion + 1)
+            estado = estados.get(id_url)
+            if estado is None:
+                nuevos.append({"id_url": id_url, "estado": PENDIENTE, "intentos": 0, "prioridad": prioridad, "actualizado": ahora})
+            elif estado in (COMPLETADO, FALLIDO):
+                reactivar.append({"b_id_url": id_url, "b_prioridad": prioridad})
+
+        conn = session.connection()
+        if nuevos:
+            conn.execute(insert(T), nuevos)
+        if reactivar:
+            conn.execute(
+                update(T)
+                .where(T.id_url == bindparam("b_id_url"))
+                .values(estado=PENDIENTE, intentos=0, ultimo_error=None, prioridad=bindparam("b_prioridad"), actualizado=ahora),
+                reactivar,
+            )
+        session.commit()
+        return len(nuevos) + len(reactivar)
+
+
+def adoptar_resumenes_sin_version(version: str) -> int:
+    """
+    Marca como `version` los resúmenes generados antes del versionado (resumen_version NULL), para
+    no re-analizar todo el corpus solo por falta de etiqueta. Es una decisión explícita del operador:
+    se asume que salieron del prompt y modelo vigentes. Retorna cuántos se marcaron.
+    """
+    U = Url_HojaDeVida
+    with Session(engine) as session:
+        marcados = session.exec(
+            update(U)
+            .where(U.resumen_estructurado != None, U.resumen_version == None)
+            .values(resumen_version=version)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        session.commit()
+        return marcados or 0
+
+
+def contar_por_version() -> Dict[Optional[str], int]:
+    """Resúmenes existentes por versión de prompt/modelo (None = generados antes del versionado)."""
+    U = Url_HojaDeVida
+    with Session(engine) as session:
+        filas = session.exec(
+            select(U.resumen_version, func.count(U.id_url)).where(U.resumen_estructurado != None).group_by(U.resumen_version)
+        ).all()
+        return {version: total for version, total in filas}
+
+
+def reclamar_trabajos(worker_id: str, limite: int = 10, lease_segundos: int = LEASE_SEGUNDOS) -> List[Procesamiento_HojaDeVida]:
+    """
+    Toma hasta `limite` trabajos para `worker_id` con un lease temporal.
+    El UPDATE repite la condición de reclamo, así que dos workers nunca se quedan con la misma fila:
+    si el lease del otro vence (worker caído), el trabajo vuelve a estar disponible, salvo que ya
+    haya agotado los reintentos: entonces queda FALLIDO.
+    """
+    T = Procesamiento_HojaDeVida
+    ahora = _ahora()
+    with Session(engine, expire_on_commit=False) as session:
+        _fallar_leases_agotados(session, ahora)
+        candidatos = (
+            select(T.id_trabajo)
+            .where(_condicion_reclamable(ahora))
+            .order_by(T.prioridad.desc(), T.intentos, T.id_trabajo)
+            .limit(limite)
+        )
+        session.exec(
+            update(T)
+            .where(T.id_trabajo.in_(candidatos), _condicion_reclamable(ahora))
+            .values(
+                estado=EN_PROCESO,
+                worker_id=worker_id,
+                lease_hasta=ahora + timedelta(seconds=lease_segundos),
+                intentos=T.intentos + 1,
+                actualizado=ahora,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        session.commit()
+
+        return list(session.exec(
+            select(T)
+            .where(T.estado == EN_PROCESO, T.worker_id == worker_id, T.lease_hasta > ahora)
+            .order_by(T.id_trabajo)
+        ).all())
+
+
+def _finalizar(id_trabajo: int, worker_id: str, **valores) -> bool:
+    """Cierra un trabajo solo si el worker aún tiene el lease. Retorna False si lo perdió."""
+    T = Procesamiento_HojaDeVida
+    with Session(engine) as session:
+        filas = session.exec(
+            update(T)
+            .where(T.id_trabajo == id_trabajo, T.worker_id == worker_id, T.estado == EN_PROCESO)
+            .values(lease_hasta=None, actualizado=_ahora(), **valores)
+        ).rowcount
+        session.commit()
+        return bool(filas)
+
+
+def marcar_completado(trabajo: Procesamiento_HojaDeVida, worker_id: str, tipo_contenido: Optional[str] = None) -> bool:
+    return _finalizar(trabajo.id_trabajo, worker_id, estado=COMPLETADO, ultimo_error=None,
+                      tipo_contenido=tipo_contenido or trabajo.tipo_contenido)
+
+
+def marcar_duplicado(trabajo: Procesamiento_HojaDeVida, worker_id: str, tipo_contenido: Optional[str] = None) -> bool:
+    return _finalizar(trabajo.id_trabajo, worker_id, estado=DUPLICADO, ultimo_error=None,
+                      tipo_contenido=tipo_contenido or trabajo.tipo_contenido)
+
+
+def marcar_error(trabajo: Procesamiento_HojaDeVida, worker_id: str, mensaje: str, tipo_contenido: Optional[str] = None) -> bool:
+    # Al agotar los reintentos el trabajo queda FALLIDO y sale de la cola
+    estado = FALLIDO if trabajo.intentos >= MAX_INTENTOS else ERROR
+    return _finalizar(trabajo.id_trabajo, worker_id, estado=estado, ultimo_error=mensaje[:2000],
+                      tipo_contenido=tipo_contenido or trabajo.tipo_contenido)
+
+
+def liberar_por_cuota(trabajo: Procesamiento_HojaDeVida, worker_id: str, tipo_contenido: Optional[str] = None) -> bool:
+    # Vuelve a la cola sin descontar el intento que sumó reclamar_trabajos: la cuota nunca lo lleva a FALLIDO
+    return _finalizar(trabajo.id_trabajo, worker_id, estado=PENDIENTE, intentos=Procesamiento_HojaDeVida.intentos - 1,
+                      ultimo_error="Cuota de Gemini excedida", tipo_contenido=tipo_contenido or trabajo.tipo_contenido)
+
+
+def marcar_no_soportado(trabajo: Procesamiento_HojaDeVida, worker_id: str, tipo_contenido: Optional[str]) -> bool:
+    return _finalizar(trabajo.id_trabajo, worker_id, estado=NO_SOPORTADO,
+                      ultimo_error=f"Formato no soportado: {tipo_contenido}", tipo_contenido=tipo_contenido)
+
+
+def urls_en_cola() -> List[Tuple[int, str]]:
+    """(id_url, url) de los trabajos que todavía esperan worker (pendientes o con error reintentable)."""
+    T = Procesamiento_HojaDeVida
+    with Session(engine) as session:
+        return list(session.exec(
+            select(T.id_url, Url_HojaDeVida.url_hoja_de_vida)
+            .join(Url_HojaDeVida, Url_HojaDeVida.id_url == T.id_url)
+            .where(or_(T.estado == PENDIENTE, and_(T.estado == ERROR, T.intentos < MAX_INTENTOS)))
+        ).all())
+
+
+def urls_con_resumen() -> List[Tuple[int, str]]:
+    """(id_url, url) de las hojas de vida ya analizadas (sin duplicados): candidatas a revisar cambios en Drive."""
+    with Session(engine) as session:
+        return list(session.exec(
+            select(Url_HojaDeVida.id_url, Url_HojaDeVida.url_hoja_de_vida)
+            .where(Url_HojaDeVida.resumen_estructurado != None, _sin_duplicado())
+        ).all())
+
+
+def metadatos_en_cache(file_ids: List[str]) -> Dict[str, Archivo_Drive]:
+    if not file_ids:
+        return {}
+    with Session(engine, expire_on_commit=False) as session:
+        filas = session.exec(select(Archivo_Drive).where(Archivo_Drive.file_id.in_(file_ids))).all()
+        return {a.file_id: a for a in filas}
+
+
+def guardar_metadatos_drive(metadatos: List[Dict[str, Any]]):
+    """Guarda (o refresca) en la caché local los metadatos devueltos por files().get de Drive."""
+    ahora = _ahora()
+    with Session(engine) as session:
+        for m in metadatos:
+            archivo = session.get(Archivo_Drive, m["id"]) or Archivo_Drive(file_id=m["id"])
+            archivo.nombre = m.get("name")
+            archivo.mime_type = m.get("mimeType")
+            archivo.tamano = int(m["size"]) if m.get("size") else None
+            archivo.md5_checksum = m.get("md5Checksum")
+            archivo.no_encontrado_hasta = None
+            archivo.actualizado = ahora
+            session.add(archivo)
+        session.commit()
+
+
+def registrar_no_encontrados(file_ids: List[str], reintentar_en: timedelta):
+    """Caché negativa: los archivos que Drive reportó como 404 no se vuelven a consultar hasta `reintentar_en`."""
+    ahora = _ahora()
+    with Session(engine) as session:
+        for file_id in file_ids:
+            archivo = session.get(Archivo_Drive, file_id) or Archivo_Drive(file_id=file_id)
+            archivo.no_encontrado_hasta = ahora + reintentar_en
+            archivo.actualizado = ahora
+            session.add(archivo)
+        session.commit()
+
+
+def no_encontrados_vigentes(file_ids: List[str]) -> Set[str]:
+    """Los `file_ids` con un 404 reciente (su fecha de reintento aún no llega)."""
+    if not file_ids:
+        return set()
+    with Session(engine) as session:
+        return set(session.exec(
+            select(Archivo_Drive.file_id)
+            .where(Archivo_Drive.file_id.in_(file_ids), Archivo_Drive.no_encontrado_hasta > _ahora())
+        ).all())
+
+
+def registrar_md5_analizado(file_id: Optional[str], md5: Optional[str]):
+    """Recuerda qué revisión del archivo (md5 de Drive) produjo el resumen: si no cambia, no hay que re-analizarlo."""
+    if not file_id or not md5:
+        return
+    with Session(engine) as session:
+        session.exec(update(Archivo_Drive).where(Archivo_Drive.file_id == file_id).values(md5_analizado=md5))
+        session.commit()
+
+
+def encolar_archivos_cambiados(ids_url: List[int]) -> int:
+    """
+    Re-encola las hojas de vida cuyo archivo cambió en Drive. Se borra la versión del resumen (no el
+    resumen: la búsqueda lo sigue usando hasta que el nuevo quede listo) para que el worker no lo dé por vigente.
+    """
+    if not ids_url:
+        return 0
+    T, U = Procesamiento_HojaDeVida, Url_HojaDeVida
+    ahora = _ahora()
+    with Session(engine) as session:
+        session.exec(update(U).where(U.id_url.in_(ids_url)).values(resumen_version=None, contenido_hash=None)
+                     .execution_options(synchronize_session=False))
+        con_trabajo = set(session.exec(select(T.id_url).where(T.id_url.in_(ids_url))).all())
+        nuevos = [{"id_url": i, "estado": PENDIENTE, "intentos": 0, "prioridad": 0, "actualizado": ahora}
+                  for i in ids_url if i not in con_trabajo]
+        if nuevos:
+            session.connection().execute(insert(T), nuevos)
+        reactivados = session.exec(
+            update(T)
+            .where(T.id_url.in_(con_trabajo), T.estado.in_([COMPLETADO, FALLIDO, ERROR]))
+            .values(estado=PENDIENTE, intentos=0, prioridad=0, ultimo_error=None, actualizado=ahora)
+            .execution_options(synchronize_session=False)
+        ).rowcount if con_trabajo else 0
+        session.commit()
+        return len(nuevos) + (reactivados or 0)
+
+
+def excluir_no_soportados(mimes_por_url: Dict[int, Optional[str]]) -> int:
+    """
+    Marca como NO_SOPORTADO (sin pasar por un worker) los trabajos en espera cuyo
+    formato ya sabemos que no se puede procesar. Retorna cuántos se excluyeron.
+    """
+    T = Procesamiento_HojaDeVida
+    excluidos = 0
+    with Session(engine) as session:
+        for id_url, mime in mimes_por_url.items():
+            excluidos += session.exec(
+                update(T)
+                .where(T.id_url == id_url, or_(T.estado == PENDIENTE, T.estado == ERROR))
+                .values(estado=NO_SOPORTADO, tipo_contenido=mime, lease_hasta=None, actualizado=_ahora(),
+                        ultimo_error=f"Formato no soportado: {mime}")
+            ).rowcount or 0
+        session.commit()
+    return excluidos
+
+
+def contar_por_estado() -> Dict[str, int]:
+    T = Procesamiento_HojaDeVida
+    with Session(engine) as session:
+        filas = session.exec(select(T.estado, func.count(T.id_trabajo)).group_by(T.estado)).all()
+        return {estado: total for estado, total in filas}
@@ -0,0 +1,272 @@
+import threading
+import time
+import zlib
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+import numpy as np
+from sqlalchemy import delete, insert, update, exists
+from sqlmodel import Session, select
+from app.core.config import settings
+from app.core.database import engine
+from app.models.models import Aspirante, Aspirante_Sede, Url_HojaDeVida, Procesamiento_HojaDeVida, Duplicado_Aspirante
+from app.services.cv_processor import PENDIENTE, ERROR, DUPLICADO
+from app.services.suggestions import normalizar
+from app.services.facets import indice_facetas
+from app.services.recommendation import MUNICIPIOS
+
+# --- MinHash / LSH sobre resumen_estructurado ---
+NUM_PERMUTACIONES = 128
+BANDAS = 32                   # 32 bandas x 4 filas: pares con Jaccard >~0.42 caen juntos en algún bucket
+TAMANO_SHINGLE = 3            # Shingles de 3 palabras normalizadas
+MIN_SHINGLES = 20             # Resúmenes más cortos ("No especificado" en todo) no se comparan
+# Dos análisis de Gemini del mismo CV re-subido no salen idénticos (Jaccard ~0.5-0.7 en nuestro corpus),
+# por eso el umbral es moderado y se exige además que los nombres coincidan
+UMBRAL_SIMILITUD = 0.5
+UMBRAL_NOMBRE = 0.75          # Evita fusionar personas distintas con CVs de plantilla
+
+_PRIMO = (1 << 31) - 1
+_rng = np.random.default_rng(20240601)
+_A = _rng.integers(1, _PRIMO, size=NUM_PERMUTACIONES, dtype=np.uint64)
+_B = _rng.integers(0, _PRIMO, size=NUM_PERMUTACIONES, dtype=np.uint64)
+
+MOTIVO_DOCUMENTO = "documento"
+MOTIVO_EMAIL = "email"
+MOTIVO_ARCHIVO = "archivo"    # Mismo documento (hash de contenido) analizado para dos aspirantes
+MOTIVO_RESUMEN = "resumen"
+
+
+def firma_minhash(texto: Optional[str]) -> Optional[np.ndarray]:
+    palabras = normalizar(texto or "").split()
+    shingles = {" ".join(palabras[i:i + TAMANO_SHINGLE]) for i in range(len(palabras) - TAMANO_SHINGLE + 1)}
+    if len(shingles) < MIN_SHINGLES:
+        return None
+    x = np.fromiter((zlib.crc32(s.encode("utf-8")) % _PRIMO for s in shingles), dtype=np.uint64, count=len(shingles))
+    return ((_A[:, None] * x[None, :] + _B[:, None]) % _PRIMO).min(axis=1)
+
+
+def similitud_estimada(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.mean(a == b))
+
+
+def pares_candidatos(firmas: Dict[int, np.ndarray]) -> Set[Tuple[int, int]]:
+    """LSH por bandas: solo se comparan los pares que comparten al menos un bucket."""
+    filas = NUM_PERMUTACIONES // BANDAS
+    pares = set()
+    for banda in range(BANDAS):
+        buckets = defaultdict(list)
+        for aid, firma in firmas.items():
+            buckets[firma[banda * filas:(banda + 1) * filas].tobytes()].append(aid)
+        for miembros in buckets.values():
+            for i in range(len(miembros)):
+                for j in range(i + 1, len(miembros)):
+                    pares.add((min(miembros[i], miembros[j]), max(miembros[i], miembros[j])))
+    return pares
+
+
+def nombres_compatibles(a: str, b: str) -> bool:
+    """'Juan Pérez' ~ 'Juan Carlos Perez': el nombre más corto está (casi) contenido en el otro."""
+    ta, tb = set(normalizar(a).split()), set(normalizar(b).split())
+    if not ta or not tb:
+        return False
+    return len(ta & tb) / min(len(ta), len(tb)) >= UMBRAL_NOMBRE
+
+
+class _Grupos:
+    """Union-find con los motivos que unieron cada componente."""
+
+    def __init__(self):
+        self.padre: Dict[int, int] = {}
+        self.motivos: Dict[int, Set[str]] = defaultdict(set)
+        self.similitud: Dict[int, float] = {}
+
+    def raiz(self, x: int) -> int:
+        self.padre.setdefault(x, x)
+        while self.padre[x] != x:
+            self.padre[x] = self.padre[self.padre[x]]
+            x = self.padre[x]
+        return x
+
+    def unir(self, a: int, b: int, motivo: str, similitud: Optional[float] = None):
+        ra, rb = self.raiz(a), self.raiz(b)
+        if ra != rb:
+            self.padre[rb] = ra
+            self.motivos[ra] |= self.motivos.pop(rb, set())
+            if rb in self.similitud:
+                self.similitud[ra] = max(self.similitud.get(ra, 0.0), self.similitud.pop(rb))
+        self.motivos[ra].add(motivo)
+        if similitud is not None:
+            self.similitud[ra] = max(self.similitud.get(ra, 0.0), similitud)
+
+    def componentes(self) -> Dict[int, List[int]]:
+        grupos = defaultdict(list)
+        for x in list(self.padre):
+            grupos[self.raiz(x)].append(x)
+        return {r: sorted(m) for r, m in grupos.items() if len(m) > 1}
+
+
+def _unir_por_clave(grupos: _Grupos, claves: Dict[int, Optional[str]], motivo: str):
+    por_clave = defaultdict(list)
+    for aid, clave in claves.items():
+        if clave:
+            por_clave[clave].append(aid)
+    for miembros in por_clave.values():
+        for otro in miembros[1:]:
+            grupos.unir(miembros[0], otro, motivo)
+
+
+def detectar_duplicados(incluir_resumenes: bool = True) -> Dict[str, int]:
+    """
+    Reconstruye Duplicado_Aspirante: coincidencia exacta de documento, email u hoja de vida
+    (hash de contenido) y, si `incluir_resumenes`, MinHash/LSH sobre los resúmenes con nombres compatibles.
+    Cada grupo se colapsa en un aspirante canónico (el más reciente con resumen) y los trabajos
+    pendientes de los demás salen de la cola.
+    """
+    with Session(engine) as session:
+        aspirantes = session.exec(
+            select(Aspirante.id_aspirante, Aspirante.num_documento, Aspirante.email, Aspirante.nombre_completo)
+        ).all()
+        hojas = session.exec(
+            select(Url_HojaDeVida.id_aspirante, Url_HojaDeVida.resumen_estructurado, Url_HojaDeVida.contenido_hash)
+        ).all()
+
+    nombres = {aid: nombre or "" for aid, _, _, nombre in aspirantes}
+    resumenes = {aid: resumen for aid, resumen, _ in hojas if resumen and aid is not None}
+
+    grupos = _Grupos()
+    _unir_por_clave(grupos, {aid: str(doc) if doc else None for aid, doc, _, _ in aspirantes}, MOTIVO_DOCUMENTO)
+    _unir_por_clave(grupos, {aid: (email or "").strip().lower() or None for aid, _, email, _ in aspirantes}, MOTIVO_EMAIL)
+    _unir_por_clave(grupos, {aid: h for aid, _, h in hojas if aid is not None}, MOTIVO_ARCHIVO)
+
+    comparados = 0
+    if incluir_resumenes:
+        firmas = {aid: f for aid, f in ((aid, firma_minhash(r)) for aid, r in resumenes.items()) if f is not None}
+        for a, b in pares_candidatos(firmas):
+            comparados += 1
+            similitud = similitud_estimada(firmas[a], firmas[b])
+            if similitud >= UMBRAL_SIMILITUD and nombres_compatibles(nombres.get(a, ""), nombres.get(b, "")):
+                grupos.unir(a, b, MOTIVO_RESUMEN, round(similitud, 4))
+
+    ahora = datetime.now(timezone.utc)
+    filas = []
+    for raiz, miembros in grupos.componentes().items():
+        canonico = max(miembros, key=lambda aid: (aid in resumenes, aid))
+        motivo = ",".join(sorted(grupos.motivos.get(raiz, set())))
+        filas.extend(
+            {"id_aspirante": aid, "id_canonico": canonico, "motivo": motivo,
+             "similitud": grupos.similitud.get(raiz), "detectado": ahora}
+            for aid in miembros if aid != canonico
+        )
+
+    D, T, U = Duplicado_Aspirante.__table__, Procesamiento_HojaDeVida, Url_HojaDeVida
+    with Session(engine) as session:
+        conn = session.connection()
+        conn.execute(delete(D))
+        if filas:
+            conn.execute(insert(D), filas)
+        # Antes de procesar: los duplicados no gastan análisis de Gemini
+        retirados = conn.execute(
+            update(T.__table__)
+            .where(T.estado.in_([PENDIENTE, ERROR]),
+                   T.id_url.in_(select(U.id_url).where(U.id_aspirante.in_(select(D.c.id_aspirante)))))
+            .values(estado=DUPLICADO, lease_hasta=None, actualizado=ahora)
+        ).rowcount
+        session.commit()
+
+    _invalidar_caches()
+    return {
+        "grupos": len({f["id_canonico"] for f in filas}),
+        "duplicados": len(filas),
+        "pares_comparados": comparados,
+        "trabajos_retirados": retirados or 0,
+    }
+
+
+def registrar_duplicado_por_archivo(id_aspirante: int, contenido_hash: str) -> Optional[int]:
+    """
+    Si otro aspirante ya tiene un resumen del mismo archivo exacto, marca a `id_aspirante` como su
+    duplicado (sin llamar a Gemini) y retorna el id canónico; si no, None.
+    """
+    with Session(engine) as session:
+        canonico = session.exec(
+            select(Url_HojaDeVida.id_aspirante)
+            .where(Url_HojaDeVida.contenido_hash == contenido_hash,
+                   Url_HojaDeVida.resumen_estructurado != None,
+                   Url_HojaDeVida.id_aspirante != id_aspirante)
+            .order_by(Url_HojaDeVida.id_aspirante.desc())
+        ).first()
+        if canonico is None:
+            return None
+        # El canónico de ese aspirante, si a su vez ya fue colapsado
+        canonico = session.exec(
+            select(Duplicado_Aspirante.id_canonico).where(Duplicado_Aspirante.id_aspirante == canonico)
+        ).first() or canonico
+        session.merge(Duplicado_Aspirante(id_aspirante=id_aspirante, id_canonico=canonico, motivo=MOTIVO_ARCHIVO,
+                                          detectado=datetime.now(timezone.utc)))
+        session.commit()
+    _invalidar_caches()
+    return canonico
+
+
+def _invalidar_caches():
+    mapa_duplicados.invalidar()
+    indice_facetas.invalidar()
+
+
+def no_es_duplicado(columna_id_aspirante):
+    """Condición SQL para excluir aspirantes colapsados (NOT EXISTS sobre la PK de Duplicado_Aspirante)."""
+    return ~exists().where(Duplicado_Aspirante.id_aspirante == columna_id_aspirante)
+
+
+class MapaDuplicados:
+    """{duplicado: canónico} en memoria para deduplicar resultados en cada búsqueda."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._mapa: Dict[int, int] = {}
+        self._vigente_hasta = 0.0
+
+    def invalidar(self):
+        self._vigente_hasta = 0.0
+
+    def obtener(self) -> Dict[int, int]:
+        if time.monotonic() >= self._vigente_hasta:
+            with Session(engine) as session:
+                mapa = dict(session.exec(select(Duplicado_Aspirante.id_aspirante, Duplicado_Aspirante.id_canonico)).all())
+            with self._lock:
+                self._mapa = mapa
+                self._vigente_hasta = time.monotonic() + settings.DEDUP_REFRESCO_SEGUNDOS
+        return self._mapa
+
+    def colapsar(self, matches: Sequence, municipio: Optional[str] = None) -> List[Tuple[int, float]]:
+        """
+        Matches de Pinecone -> [(id_aspirante, score)] con una sola fila por persona, conservando el orden
+        (y por tanto el mejor score) de su primera aparición. Normalmente la fila es la del canónico; con
+        filtro de `municipio`, si el canónico no tiene esa sede se conserva el miembro que sí coincidió.
+        """
+        mapa = self.obtener()
+        aciertos = [(int(match.id), match.score) for match in matches]
+        canonicos = {mapa[aid] for aid, _ in aciertos if aid in mapa}
+        if canonicos and municipio in MUNICIPIOS:
+            canonicos = _con_sede(canonicos, municipio)
+
+        vistos, resultado = set(), []
+        for aid, score in aciertos:
+            persona = mapa.get(aid, aid)
+            if persona in vistos:
+                continue
+            vistos.add(persona)
+            resultado.append((persona if persona in canonicos else aid, score))
+        return resultado
+
+
+def _con_sede(ids: Set[int], municipio: str) -> Set[int]:
+    """Los `ids` que tienen sede en `municipio` (el mismo filtro que Pinecone aplicó a los matches)."""
+    with Session(engine) as session:
+        return set(session.exec(
+            select(Aspirante_Sede.id_aspirante)
+            .where(Aspirante_Sede.id_aspirante.in_(ids), getattr(Aspirante_Sede, municipio) == True)
+        ).all())
+
+
+mapa_duplicados = MapaDuplicados()
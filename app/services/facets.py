@@ -0,0 +1,137 @@
+import threading
+import time
+from typing import Dict, Iterable, Optional
+import numpy as np
+from sqlmodel import Session, select
+from app.core.config import settings
+from app.core.database import engine
+from app.core.invalidation import suscribir
+from app.models.models import Aspirante, Aspirante_Informacion, Aspirante_Sede, Duplicado_Aspirante
+from app.services.recommendation import MUNICIPIOS
+
+NIVELES = ["Doctorado", "Maestría", "Especialización", "Pregrado/Otro"]
+EXPERIENCIA = ["Sí", "No", "Sin dato"]
+
+
+def nivel_formacion(titulo_posgrado: Optional[str]) -> int:
+    """Misma normalización que el dashboard de /stats (índice en NIVELES)."""
+    titulo = (titulo_posgrado or "").lower()
+    if "doctor" in titulo or "phd" in titulo:
+        return 0
+    if "maestr" in titulo or "magister" in titulo or "master" in titulo:
+        return 1
+    if "especiali" in titulo:
+        return 2
+    return 3
+
+
+def experiencia(tiene_experiencia: Optional[str]) -> int:
+    valor = (tiene_experiencia or "").lower().strip()
+    if valor in ["si", "sí", "s", "true", "1"]:
+        return 0
+    if valor in ["no", "n", "false", "0"]:
+        return 1
+    return 2
+
+
+class IndiceFacetas:
+    """
+    Atributos facetables precalculados por aspirante en arreglos numpy alineados por posición:
+    ids ordenados, matriz booleana de municipios (n x 23) y códigos de nivel/experiencia.
+    Contar facetas de un conjunto de resultados es un searchsorted + sumas vectorizadas.
+    Al vencer, un solo hilo reconstruye; los demás siguen contando con los arreglos anteriores.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lock_reconstruccion = threading.Lock()
+        self._construido = False
+        self._generacion = 0  # Sube con cada invalidar(): una invalidación durante la reconstrucción no se pierde
+        self._ids = np.empty(0, dtype=np.int64)
+        self._municipios = np.zeros((0, len(MUNICIPIOS)), dtype=bool)
+        self._nivel = np.empty(0, dtype=np.int8)
+        self._experiencia = np.empty(0, dtype=np.int8)
+        self._vigente_hasta = 0.0
+
+    def reconstruir(self):
+        generacion = self._generacion
+        columnas_sede = [getattr(Aspirante_Sede, m) for m in MUNICIPIOS]
+        with Session(engine) as session:
+            filas = session.exec(
+                select(Aspirante.id_aspirante, Aspirante_Informacion.titulo_posgrado,
+                       Aspirante_Informacion.tiene_experiencia, *columnas_sede)
+                .outerjoin(Aspirante_Informacion, Aspirante_Informacion.id_aspirante == Aspirante.id_aspirante)
+                .outerjoin(Aspirante_Sede, Aspirante_Sede.id_aspirante == Aspirante.id_aspirante)
+                # Los duplicados colapsados no son candidatos (misma regla que la búsqueda)
+                .where(~select(Duplicado_Aspirante.id_aspirante)
+                       .where(Duplicado_Aspirante.id_aspirante == Aspirante.id_aspirante).exists())
+                .order_by(Aspirante.id_aspirante)
+            ).all()
+
+        # Un aspirante con varias filas de información/sede queda con la primera
+        ids, posiciones = np.unique(np.array([f[0] for f in filas], dtype=np.int64), return_index=True)
+        filas = [filas[i] for i in posiciones]
+        with self._lock:
+            self._ids = ids
+            self._nivel = np.array([nivel_formacion(f[1]) for f in filas], dtype=np.int8)
+            self._experiencia = np.array([experiencia(f[2]) for f in filas], dtype=np.int8)
+            self._municipios = np.array([[bool(v) for v in f[3:]] for f in filas], dtype=bool).reshape(-1, len(MUNICIPIOS))
+            self._construido = True
+            if generacion == self._generacion:
+                self._vigente_hasta = time.monotonic() + settings.FACETAS_REFRESCO_SEGUNDOS
+
+    def invalidar(self):
+        with self._lock:
+            self._generacion += 1
+            self._vigente_hasta = 0.0
+
+    def _asegurar_vigente(self):
+        if time.monotonic() < self._vigente_hasta:
+            return
+        # Solo la primera construcción (aún sin arreglos) hace esperar a los demás hilos
+        if not self._lock_reconstruccion.acquire(blocking=not self._construido):
+            return
+        try:
+            if time.monotonic() >= self._vigente_hasta:
+                self.reconstruir()
+        finally:
+            self._lock_reconstruccion.release()
+
+    def contar(self, ids_aspirantes: Optional[Iterable[int]] = None, municipio: Optional[str] = None) -> Dict:
+        """
+        Conteos por municipio, nivel de formación y experiencia sobre el conjunto indicado:
+        los ids de una búsqueda semántica, o todos los aspirantes (filtrados por municipio) si ids es None.
+        """
+        self._asegurar_vigente()
+        with self._lock:
+            ids, municipios, nivel, exp = self._ids, self._municipios, self._nivel, self._experiencia
+
+        if ids_aspirantes is None:
+            mascara = np.ones(len(ids), dtype=bool)
+        else:
+            buscados = np.fromiter(ids_aspirantes, dtype=np.int64)
+            posiciones = np.searchsorted(ids, buscados).clip(0, max(len(ids) - 1, 0))
+            mascara = np.zeros(len(ids), dtype=bool)
+            if len(ids):
+                mascara[posiciones[ids[posiciones] == buscados]] = True
+        if municipio in MUNICIPIOS:
+            mascara &= municipios[:, MUNICIPIOS.index(municipio)]
+
+        conteo_municipios = municipios[mascara].sum(axis=0)
+        conteo_nivel = np.bincount(nivel[mascara], minlength=len(NIVELES))
+        conteo_exp = np.bincount(exp[mascara], minlength=len(EXPERIENCIA))
+        orden = np.argsort(-conteo_municipios, kind="stable")
+        return {
+            "total": int(mascara.sum()),
+            "municipio": {MUNICIPIOS[i]: int(conteo_municipios[i]) for i in orden if conteo_municipios[i] > 0},
+            "nivel_formacion": {n: int(c) for n, c in zip(NIVELES, conteo_nivel) if c > 0},
+            "experiencia": {e: int(c) for e, c in zip(EXPERIENCIA, conteo_exp) if c > 0},
+        }
+
+
+indice_facetas = IndiceFacetas()
+
+
+# Ediciones ORM de este proceso: los arreglos se recalculan en la próxima búsqueda con facetas.
+# Los cambios de otros procesos (importador) se recogen al vencer FACETAS_REFRESCO_SEGUNDOS.
+suscribir("facetas", (Aspirante, Aspirante_Informacion, Aspirante_Sede), tras_commit=lambda ids: indice_facetas.invalidar())
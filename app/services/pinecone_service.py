@@ -1,31 +1,47 @@
 import time
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Set
 from pinecone import Pinecone # <--- IMPORTANTE: Así se llama en la nueva versión
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
 from app.core.config import settings
+from app.services.vector_projection import INDEX_BASE, nombre_indice, reducir_embedding
 
 # Configurar Gemini y Pinecone
 genai.configure(api_key=settings.GOOGLE_API_KEY)
 pc = Pinecone(api_key=settings.PINECONE_API_KEY) 
 
-INDEX_NAME = "hojas-de-vida-index"
+INDEX_NAME = INDEX_BASE  # Índice completo (768); el activo lo define nombre_indice()
+
+class CuotaExcedida(Exception):
+    """Gemini o Pinecone rechazaron la llamada por cuota/rate limit (no es un 'sin resultados')."""
+
+class ServicioNoDisponible(Exception):
+    """Gemini o Pinecone fallaron por otra causa (red, caída, credenciales): tampoco es un 'sin resultados'."""
+
+def _es_error_de_cuota(e: Exception) -> bool:
+    return isinstance(e, google_exceptions.ResourceExhausted) or getattr(e, "status", None) == 429
+
+def _embed(text: str, reducir: bool = True) -> List[float]:
+    # Usamos el modelo optimizado 004
+    result = genai.embed_content(
+        model=settings.EMBEDDING_MODELO,
+        content=text,
+        task_type="retrieval_document"
+    )
+    # Documentos y queries pasan por la MISMA reducción (truncado/PCA) configurada
+    return reducir_embedding(result['embedding']) if reducir else result['embedding']
 
 def get_embedding(text: str) -> List[float]:
     try:
-        # Usamos el modelo optimizado 004
-        result = genai.embed_content(
-            model="models/text-embedding-004",
-            content=text,
-            task_type="retrieval_document"
-        )
-        return result['embedding']
+        return _embed(text)
     except Exception as e:
         print(f"Error generando embedding: {e}")
         return []
 
-def upsert_to_pinecone(data_batch: List[Dict[str, Any]]):
+def upsert_to_pinecone(data_batch: List[Dict[str, Any]]) -> List[str]:
+    """Embebe y sube el lote. Retorna los ids efectivamente subidos (vacío si falló)."""
     try:
-        index = pc.Index(INDEX_NAME)
+        index = pc.Index(nombre_indice())
         
         vectors_to_upsert = []
         for item in data_batch:
@@ -42,37 +58,74 @@ def upsert_to_pinecone(data_batch: List[Dict[str, Any]]):
             index.upsert(vectors=vectors_to_upsert)
             # Un print pequeño para saber que el servicio está trabajando
             # (Opcional, ya que la barra de progreso del sync nos dice cómo vamos)
+        return [v["id"] for v in vectors_to_upsert]
             
     except Exception as e:
         print(f"❌ Error en servicio Pinecone: {e}")
+        return []
+
+def update_metadata_pinecone(data_batch: List[Dict[str, Any]]) -> List[str]:
+    """Actualiza solo la metadata de vectores existentes (sin re-embeber). Retorna los ids actualizados."""
+    actualizados = []
+    try:
+        index = pc.Index(nombre_indice())
+        for item in data_batch:
+            index.update(id=str(item['id']), set_metadata=item['metadata'])
+            actualizados.append(str(item['id']))
+    except Exception as e:
+        print(f"❌ Error actualizando metadata en Pinecone: {e}")
+    return actualizados
+
+def ids_indexados(ids: List[str], lote: int = 100) -> Set[str]:
+    """Cuáles de `ids` ya tienen vector en el índice activo (fetch por lotes, sin llamar a Gemini)."""
+    index = pc.Index(nombre_indice())
+    encontrados = set()
+    for i in range(0, len(ids), lote):
+        encontrados.update(index.fetch(ids=[str(x) for x in ids[i:i + lote]]).vectors.keys())
+    return encontrados
+
+def delete_from_pinecone(ids: List[str]) -> bool:
+    """Elimina vectores del índice activo (ej: aspirantes colapsados como duplicados)."""
+    try:
+        pc.Index(nombre_indice()).delete(ids=[str(i) for i in ids])
+        return True
+    except Exception as e:
+        print(f"❌ Error eliminando vectores en Pinecone: {e}")
+        return False
 
-def search_best_matches(query_text: str, filters: Dict[str, Any] = None, top_k: int = 10):
+def search_best_matches(query_text: str, filters: Dict[str, Any] = None, top_k: int = 10, include_metadata: bool = True):
     """
     Busca los candidatos más similares semánticamente.
     - query_text: Lo que escribe RRHH (ej: "Profesor experto en Python y Data Science")
     - filters: Diccionario de filtros duros (ej: {"municipios": {"$in": ["Manizales"]}})
+    Lanza CuotaExcedida si Gemini o Pinecone responden por rate limit y ServicioNoDisponible
+    ante cualquier otra falla, para que la API lo reporte como 429/503 y no como una lista vacía de candidatos.
     """
     try:
         # 1. Convertir la pregunta de RRHH en números (Vector)
         print(f"🧮 Generando embedding para: '{query_text}'...")
-        query_vector = get_embedding(query_text)
+        query_vector = _embed(query_text)
         
         if not query_vector:
-            return {"error": "No se pudo generar el vector del query"}
+            raise ServicioNoDisponible("No se pudo generar el vector del query")
 
         # 2. Consultar Pinecone
-        index = pc.Index(INDEX_NAME)
+        index = pc.Index(nombre_indice())
         
         print(f"🔍 Buscando en Pinecone con filtros: {filters}...")
         results = index.query(
             vector=query_vector,
             top_k=top_k,
-            include_metadata=True, # ¡Clave! Queremos ver quiénes son
+            include_metadata=include_metadata, # ¡Clave! Queremos ver quiénes son (salvo que solo interesen los IDs)
             filter=filters         # Aquí ocurre la magia híbrida
         )
         
         return results
         
+    except ServicioNoDisponible:
+        raise
     except Exception as e:
+        if _es_error_de_cuota(e):
+            raise CuotaExcedida(str(e)) from e
         print(f"❌ Error buscando en Pinecone: {e}")
-        return []
\ No newline at end of file
+        raise ServicioNoDisponible(str(e)) from e
\ No newline at end of file
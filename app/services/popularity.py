@@ -0,0 +1,89 @@
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Iterable
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from app.core.database import engine
+from app.models.models import Popularidad_Aspirante
+
+VOLCAR_CADA_SEGUNDOS = 60
+VOLCAR_CADA_IDS = 500
+
+# Motores con INSERT ... ON CONFLICT DO UPDATE; el resto usa select + update/insert
+_INSERT_UPSERT = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+class ContadorApariciones:
+    """
+    Cuenta en memoria cuántas veces aparece cada aspirante en una página de resultados
+    y lo acumula en Popularidad_Aspirante por lotes (un UPSERT cada minuto o cada 500 ids),
+    para no escribir en la base en cada búsqueda.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pendientes: Counter = Counter()
+        self._ultimo_volcado = time.monotonic()
+
+    def registrar(self, ids_aspirantes: Iterable[int]):
+        with self._lock:
+            self._pendientes.update(ids_aspirantes)
+            volcar = (sum(self._pendientes.values()) >= VOLCAR_CADA_IDS
+                      or time.monotonic() - self._ultimo_volcado >= VOLCAR_CADA_SEGUNDOS)
+        if volcar:
+            self.volcar()
+
+    def volcar(self):
+        with self._lock:
+            pendientes, self._pendientes = self._pendientes, Counter()
+            self._ultimo_volcado = time.monotonic()
+        if not pendientes:
+            return
+
+        ahora = datetime.now(timezone.utc)
+        filas = [{"id_aspirante": aid, "apariciones": n, "actualizado": ahora} for aid, n in pendientes.items()]
+        try:
+            with engine.begin() as conn:
+                if engine.dialect.name in _INSERT_UPSERT:
+                    self._upsert(conn, filas)
+                else:
+                    self._actualizar_o_insertar(conn, filas)
+        except Exception as e:
+            # La popularidad es solo una señal de prioridad: nunca debe romper una búsqueda
+            print(f"⚠️ No se pudo guardar la popularidad de aspirantes: {e}")
+
+
+    @staticmethod
+    def _upsert(conn, filas):
+        P = Popularidad_Aspirante.__table__
+        sentencia = _INSERT_UPSERT[engine.dialect.name](P)
+        sentencia = sentencia.on_conflict_do_update(
+            index_elements=[P.c.id_aspirante],
+            set_={"apariciones": P.c.apariciones + sentencia.excluded.apariciones, "actualizado": sentencia.excluded.actualizado},
+        )
+        conn.execute(sentencia, filas)
+
+    @staticmethod
+    def _actualizar_o_insertar(conn, filas):
+        P = Popularidad_Aspirante.__table__
+        existentes = set(conn.execute(
+            select(P.c.id_aspirante).where(P.c.id_aspirante.in_([f["id_aspirante"] for f in filas]))
+        ).scalars())
+        actualizar = [
+            {"b_id": f["id_aspirante"], "b_apariciones": f["apariciones"], "b_actualizado": f["actualizado"]}
+            for f in filas if f["id_aspirante"] in existentes
+        ]
+        if actualizar:
+            conn.execute(
+                update(P).where(P.c.id_aspirante == bindparam("b_id"))
+                .values(apariciones=P.c.apariciones + bindparam("b_apariciones"), actualizado=bindparam("b_actualizado")),
+                actualizar,
+            )
+        nuevas = [f for f in filas if f["id_aspirante"] not in existentes]
+        if nuevas:
+            conn.execute(insert(P), nuevas)
+
+
+contador_apariciones = ContadorApariciones()
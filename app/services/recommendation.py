@@ -0,0 +1,47 @@
+from typing import List, Tuple
+
+# Columnas booleanas de la tabla Aspirante_Sede
+MUNICIPIOS = [
+    "Manizales", "Chinchiná", "Villamaría", "Neira", "Palestina",
+    "Risaralda", "Riosucio", "Anserma", "La_Dorada", "Supia",
+    "Palestina_Arauca", "Arauca", "Viterbo", "Salamina", "Belalcazar",
+    "Filadelfia", "Aguadas", "San_José", "Pacora", "Victoria",
+    "Manzanares", "Norcasia", "Samaná"
+]
+
+
+def obtener_sedes_activas(sede_obj) -> List[str]:
+    if not sede_obj: return []
+    return [c for c in MUNICIPIOS if getattr(sede_obj, c, False)]
+
+
+def calcular_bonificacion(info_db) -> Tuple[float, List[str]]:
+    """Bonificación fija del candidato (no depende del query): posgrado y experiencia."""
+    bono = 0.0
+    bonus_log = []
+
+    if info_db:
+        posgrado = (info_db.titulo_posgrado or "").lower()
+        if 'doctor' in posgrado or 'phd' in posgrado:
+            bono += 0.2
+            bonus_log.append("Doctorado (+0.2)")
+        elif 'maestr' in posgrado or 'magister' in posgrado:
+            bono += 0.1
+            bonus_log.append("Maestría (+0.1)")
+
+        experiencia = (info_db.tiene_experiencia or "").lower()
+        if experiencia in ['si', 'sí', 's', 'true', '1']:
+            bono += 0.05
+            bonus_log.append("Tiene Experiencia (+0.05)")
+
+    return bono, bonus_log
+
+
+def aplicar_bonificacion(match_score: float, bono: float) -> float:
+    # ESTANDARIZACIÓN (Tope máximo 100%)
+    return round(min(1.0, match_score + bono), 4)
+
+
+def calcular_reranking(match_score, info_db) -> Tuple[float, List[str]]:
+    bono, bonus_log = calcular_bonificacion(info_db)
+    return aplicar_bonificacion(match_score, bono), bonus_log
@@ -0,0 +1,88 @@
+import json
+import math
+from typing import Any, Dict, List, Sequence
+
+
+def cargar_casos(ruta: str) -> List[Dict[str, Any]]:
+    """
+    Lee el set etiquetado (JSON o JSONL). Cada caso:
+    {"query": "...", "municipio": "Manizales" | null, "relevantes": [12, 48, 301]}
+    """
+    with open(ruta, encoding="utf-8") as f:
+        contenido = f.read().strip()
+    if contenido.startswith("["):
+        casos = json.loads(contenido)
+    else:
+        casos = [json.loads(linea) for linea in contenido.splitlines() if linea.strip()]
+    for caso in casos:
+        caso["relevantes"] = [str(r) for r in caso.get("relevantes", [])]
+        caso.setdefault("municipio", None)
+    return casos
+
+
+def recall_at_k(ranking: Sequence[str], relevantes: Sequence[str], k: int) -> float:
+    if not relevantes:
+        return 0.0
+    return len(set(ranking[:k]) & set(relevantes)) / len(relevantes)
+
+
+def ndcg_at_k(ranking: Sequence[str], relevantes: Sequence[str], k: int) -> float:
+    """nDCG binario: ganancia 1 por cada relevante, descontada por log2 de su posición."""
+    relevantes = set(relevantes)
+    dcg = sum(1.0 / math.log2(i + 2) for i, aid in enumerate(ranking[:k]) if aid in relevantes)
+    ideal = sum(1.0 / math.log2(i + 2) for i in range(min(k, len(relevantes))))
+    return dcg / ideal if ideal else 0.0
+
+
+def reciprocal_rank(ranking: Sequence[str], relevantes: Sequence[str]) -> float:
+    relevantes = set(relevantes)
+    for i, aid in enumerate(ranking):
+        if aid in relevantes:
+            return 1.0 / (i + 1)
+    return 0.0
+
+
+def percentil(valores: Sequence[float], p: float) -> float:
+    """Percentil por rango más cercano (suficiente para decenas/cientos de consultas)."""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = max(0, math.ceil(p / 100 * len(ordenados)) - 1)
+    return ordenados[indice]
+
+
+def resumir_corrida(resultados: List[Dict[str, Any]], k: int) -> Dict[str, float]:
+    """Promedia las métricas por consulta y agrega la latencia (ms)."""
+    n = len(resultados) or 1
+    latencias = [r["latencia_ms"] for r in resultados]
+    return {
+        "consultas": len(resultados),
+        "errores": sum(1 for r in resultados if r.get("error")),
+        f"recall@{k}": round(sum(r["recall"] for r in resultados) / n, 4),
+        f"ndcg@{k}": round(sum(r["ndcg"] for r in resultados) / n, 4),
+        "mrr": round(sum(r["rr"] for r in resultados) / n, 4),
+        "p50_ms": round(percentil(latencias, 50), 1),
+        "p95_ms": round(percentil(latencias, 95), 1),
+    }
+
+
+def comparar_corridas(corridas: List[Dict[str, Any]]) -> str:
+    """Tabla de texto con las métricas de varias corridas lado a lado (la primera es la referencia)."""
+    if not corridas:
+        return ""
+    metricas = list(corridas[0]["resumen"].keys())
+    nombres = [c["nombre"] for c in corridas]
+    ancho = max(20, *(len(n) + 2 for n in nombres))
+
+    lineas = [f"{'métrica':<12}" + "".join(f"{n:>{ancho}}" for n in nombres)]
+    for m in metricas:
+        base = corridas[0]["resumen"].get(m)
+        celdas = []
+        for i, c in enumerate(corridas):
+            valor = c["resumen"].get(m)
+            texto = f"{valor}"
+            if i > 0 and isinstance(valor, (int, float)) and isinstance(base, (int, float)) and valor != base:
+                texto += f" ({valor - base:+.4g})"
+            celdas.append(f"{texto:>{ancho}}")
+        lineas.append(f"{m:<12}" + "".join(celdas))
+    return "\n".join(lineas)
@@ -0,0 +1,76 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class EsperaAgotada(Exception):
+    """El líder del vuelo no terminó dentro del plazo de espera del seguidor."""
+
+
+class _Vuelo:
+    __slots__ = ("listo", "resultado", "error")
+
+    def __init__(self):
+        self.listo = threading.Event()
+        self.resultado = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce llamadas concurrentes con la misma clave: la primera (líder) ejecuta la función
+    y las demás esperan y reciben el mismo resultado (o la misma excepción).
+    Al terminar el vuelo la clave se libera, así que no retiene memoria entre peticiones.
+    Los seguidores esperan como máximo `timeout` segundos: un líder colgado no retiene
+    indefinidamente a todas las peticiones idénticas (ni sus hilos).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._vuelos: Dict[Hashable, _Vuelo] = {}
+        self.ejecuciones = 0
+        self.coalescidas = 0
+        self.esperas_agotadas = 0
+
+    def ejecutar(self, clave: Hashable, funcion: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        with self._lock:
+            vuelo = self._vuelos.get(clave)
+            if vuelo is not None:
+                self.coalescidas += 1
+                es_lider = False
+            else:
+                vuelo = self._vuelos[clave] = _Vuelo()
+                self.ejecuciones += 1
+                es_lider = True
+
+        if not es_lider:
+            if not vuelo.listo.wait(timeout):
+                with self._lock:
+                    self.esperas_agotadas += 1
+                raise EsperaAgotada(f"El vuelo no terminó en {timeout}s")
+            if vuelo.error is not None:
+                raise vuelo.error
+            return vuelo.resultado
+
+        try:
+            vuelo.resultado = funcion()
+        except BaseException as e:
+            vuelo.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._vuelos[clave]
+            vuelo.listo.set()
+        return vuelo.resultado
+
+    def metricas(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "en_vuelo": len(self._vuelos),
+                "ejecuciones": self.ejecuciones,
+                "coalescidas": self.coalescidas,
+                "esperas_agotadas": self.esperas_agotadas,
+            }
+
+
+# Búsquedas idénticas concurrentes comparten embedding, consulta a Pinecone e hidratación
+vuelos_busqueda = SingleFlight()
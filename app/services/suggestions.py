@@ -0,0 +1,280 @@
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import func
+from sqlmodel import Session, select
+from app.core.config import settings
+from app.core.database import engine
+from app.core.invalidation import suscribir
+from app.models.models import Aspirante, Aspirante_Informacion, Url_HojaDeVida, Procesamiento_HojaDeVida
+
+TITULO = "titulo"
+HABILIDAD = "habilidad"
+
+# Secciones del resumen de Gemini que aportan términos (ver prompt en scripts/process_pdfs.py)
+_SECCIONES = {"TITULOS_ACADEMICOS": TITULO, "HABILIDADES_TECNICAS": HABILIDAD}
+_VACIOS = {"", "n/a", "na", "ninguno", "desconocido", "no especificado", "no especificada", "datos_no_disponibles"}
+# Los títulos del resumen suelen venir como "Antropólogo, Universidad de Caldas (2019)"
+_INSTITUCIONES = ("universidad", "escuela", "instituto", "institucion", "corporacion", "fundacion", "colegio", "sena")
+_MAX_LARGO_TERMINO = 60
+_MAX_CACHE = 2048
+
+
+def normalizar(texto: str) -> str:
+    """'Magíster en Artes ' -> 'magister en artes' (sin tildes, minúsculas, espacios simples)."""
+    sin_tildes = unicodedata.normalize("NFKD", texto or "").encode("ascii", "ignore").decode("ascii")
+    return " ".join(re.sub(r"[^a-z0-9+#]+", " ", sin_tildes.lower()).split())
+
+
+def _limpiar(termino: str) -> str:
+    termino = re.sub(r"\([^)]*\)", "", termino)  # "(2019)", "(BIM)"
+    return " ".join(termino.strip(" .:-–\"'").split())
+
+
+def _termino_valido(original: str, clave: str) -> bool:
+    return (
+        2 < len(original) <= _MAX_LARGO_TERMINO
+        and clave not in _VACIOS
+        and not clave.startswith(_INSTITUCIONES)
+        and not clave.replace(" ", "").isdigit()
+    )
+
+
+def extraer_terminos(titulo_profesional: Optional[str], titulo_posgrado: Optional[str],
+                     resumenes: Iterable[Optional[str]]) -> Dict[str, Tuple[str, str]]:
+    """Términos de un aspirante: {clave_normalizada: (forma_original, tipo)}."""
+    candidatos = [(titulo_profesional, TITULO), (titulo_posgrado, TITULO)]
+    for resumen in resumenes:
+        for linea in (resumen or "").splitlines():
+            seccion, _, valor = linea.partition(":")
+            tipo = _SECCIONES.get(seccion.strip().upper())
+            if tipo:
+                candidatos.extend((parte, tipo) for parte in re.split(r"[,;]", valor))
+
+    terminos = {}
+    for texto, tipo in candidatos:
+        original = _limpiar(texto or "")
+        clave = normalizar(original)
+        if _termino_valido(original, clave) and (clave not in terminos or tipo == TITULO):
+            terminos[clave] = (original, tipo)
+    return terminos
+
+
+def _claves_busqueda(termino: str) -> List[str]:
+    """'ingenieria ambiental' se encuentra tanto por 'ingen' como por 'ambien' (prefijo de cada palabra)."""
+    palabras = termino.split(" ")
+    return [" ".join(palabras[i:]) for i in range(len(palabras))]
+
+
+class IndiceSugerencias:
+    """
+    Índice de prefijos en memoria para autocompletar: un arreglo ordenado de claves
+    (cada sufijo por palabra de cada término) + bisect. La frecuencia de un término es
+    el número de aspirantes que lo tienen. Se actualiza por aspirante, sin reconstruir todo.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._vaciar()
+        self._pendientes: Set[int] = set()
+        self._construido = False
+        self._marca_trabajos: Optional[datetime] = None
+        self._marca_informacion: Optional[datetime] = None
+        self._max_aspirante = 0
+        self._ultima_revision = 0.0
+
+    def _vaciar(self):
+        self._claves: List[str] = []                         # Ordenado: "clave\x00termino"
+        self._frecuencia: Counter = Counter()                # termino -> n aspirantes
+        self._formas: Dict[str, Counter] = defaultdict(Counter)  # termino -> escrituras originales
+        self._tipos: Dict[str, Counter] = defaultdict(Counter)
+        self._por_aspirante: Dict[int, Dict[str, Tuple[str, str]]] = {}
+        self._cache: Dict[Tuple[str, int], List[dict]] = {}
+
+    # --- Mantenimiento ---
+    def _agregar(self, aid: int, terminos: Dict[str, Tuple[str, str]], ordenado: bool = True):
+        for termino, (original, tipo) in terminos.items():
+            if self._frecuencia[termino] == 0:
+                for clave in _claves_busqueda(termino):
+                    if ordenado:
+                        insort(self._claves, f"{clave}\x00{termino}")
+                    else:
+                        self._claves.append(f"{clave}\x00{termino}")
+            self._frecuencia[termino] += 1
+            self._formas[termino][original] += 1
+            self._tipos[termino][tipo] += 1
+        self._por_aspirante[aid] = terminos
+
+    def _quitar(self, aid: int):
+        for termino, (original, tipo) in self._por_aspirante.pop(aid, {}).items():
+            self._frecuencia[termino] -= 1
+            self._formas[termino][original] -= 1
+            self._tipos[termino][tipo] -= 1
+            if self._frecuencia[termino] <= 0:
+                del self._frecuencia[termino], self._formas[termino], self._tipos[termino]
+                for clave in _claves_busqueda(termino):
+                    i = bisect_left(self._claves, f"{clave}\x00{termino}")
+                    del self._claves[i]
+
+    def _cargar(self, session: Session, ids: Optional[List[int]] = None) -> Dict[int, Dict[str, Tuple[str, str]]]:
+        consulta_info = select(Aspirante_Informacion.id_aspirante, Aspirante_Informacion.titulo_profesional,
+                               Aspirante_Informacion.titulo_posgrado)
+        consulta_hv = select(Url_HojaDeVida.id_aspirante, Url_HojaDeVida.resumen_estructurado).where(
+            Url_HojaDeVida.resumen_estructurado != None)
+        consulta_asp = select(Aspirante.id_aspirante)
+        if ids is not None:
+            consulta_info = consulta_info.where(Aspirante_Informacion.id_aspirante.in_(ids))
+            consulta_hv = consulta_hv.where(Url_HojaDeVida.id_aspirante.in_(ids))
+            consulta_asp = consulta_asp.where(Aspirante.id_aspirante.in_(ids))
+
+        titulos = {aid: (pro, pos) for aid, pro, pos in session.exec(consulta_info).all()}
+        resumenes = defaultdict(list)
+        for aid, resumen in session.exec(consulta_hv).all():
+            resumenes[aid].append(resumen)
+        return {
+            aid: extraer_terminos(*titulos.get(aid, (None, None)), resumenes.get(aid, []))
+            for aid in session.exec(consulta_asp).all()
+        }
+
+    def _marcas_actuales(self, session: Session) -> Tuple[Optional[datetime], Optional[datetime], int]:
+        return (
+            session.exec(select(func.max(Procesamiento_HojaDeVida.actualizado))).one(),
+            session.exec(select(func.max(Aspirante_Informacion.actualizado))).one(),
+            session.exec(select(func.max(Aspirante.id_aspirante))).one() or 0,
+        )
+
+    def _avanzar_marcas(self, marca_trabajos: Optional[datetime], marca_informacion: Optional[datetime], max_aspirante: int):
+        """Solo hacia adelante (con el lock tomado): una revisión lenta no puede devolver las marcas."""
+        mayor = lambda actual, nueva: nueva if actual is None or (nueva is not None and nueva > actual) else actual
+        self._marca_trabajos = mayor(self._marca_trabajos, marca_trabajos)
+        self._marca_informacion = mayor(self._marca_informacion, marca_informacion)
+        self._max_aspirante = max(self._max_aspirante, max_aspirante)
+
+    def reconstruir(self):
+        """Construcción completa (arranque o reinicio manual)."""
+        with Session(engine) as session:
+            marcas = self._marcas_actuales(session)
+            datos = self._cargar(session)
+        with self._lock:
+            self._vaciar()
+            for aid, terminos in datos.items():
+                self._agregar(aid, terminos, ordenado=False)
+            self._claves.sort()
+            self._construido = True
+            self._avanzar_marcas(*marcas)
+            self._ultima_revision = time.monotonic()
+
+    def actualizar(self, ids_aspirantes: Iterable[int]):
+        """Re-lee solo los aspirantes indicados y ajusta sus términos (los borrados desaparecen)."""
+        ids = list({int(i) for i in ids_aspirantes if i is not None})
+        if not ids:
+            return
+        with Session(engine) as session:
+            datos = self._cargar(session, ids)
+        with self._lock:
+            for aid in ids:
+                self._quitar(aid)
+                if aid in datos:
+                    self._agregar(aid, datos[aid])
+            self._cache.clear()
+
+    def marcar(self, ids_aspirantes: Iterable[int]):
+        """Agenda aspirantes modificados en este proceso; se aplican en la próxima sugerencia."""
+        if not self._construido:
+            return  # Índice sin usar en este proceso (workers, scripts): la construcción leerá todo
+        with self._lock:
+            self._pendientes.update(ids_aspirantes)
+
+    def _cambios_externos(self) -> List[int]:
+        """
+        Cambios hechos por otros procesos (process_pdfs, import_aspirantes) desde la última revisión:
+        trabajos de la cola tocados (resúmenes nuevos o URLs re-encoladas), títulos escritos por el
+        importador (Aspirante_Informacion.actualizado) y aspirantes nuevos.
+        """
+        with self._lock:
+            desde_trabajos, desde_informacion, desde_aspirante = (
+                self._marca_trabajos, self._marca_informacion, self._max_aspirante)
+
+        with Session(engine) as session:
+            marca_trabajos, marca_informacion, max_aspirante = marcas = self._marcas_actuales(session)
+            ids = []
+            if marca_trabajos is not None and (desde_trabajos is None or marca_trabajos > desde_trabajos):
+                consulta = select(Url_HojaDeVida.id_aspirante).join(
+                    Procesamiento_HojaDeVida, Procesamiento_HojaDeVida.id_url == Url_HojaDeVida.id_url)
+                if desde_trabajos is not None:
+                    consulta = consulta.where(Procesamiento_HojaDeVida.actualizado > desde_trabajos)
+                ids.extend(session.exec(consulta).all())
+            if marca_informacion is not None and (desde_informacion is None or marca_informacion > desde_informacion):
+                # Sin marca previa, todo lo que tiene marca es posterior a la construcción del índice
+                ids.extend(session.exec(select(Aspirante_Informacion.id_aspirante).where(
+                    Aspirante_Informacion.actualizado > desde_informacion if desde_informacion is not None
+                    else Aspirante_Informacion.actualizado != None)).all())
+            if max_aspirante > desde_aspirante:
+                ids.extend(session.exec(
+                    select(Aspirante.id_aspirante).where(Aspirante.id_aspirante > desde_aspirante)).all())
+
+        with self._lock:
+            self._avanzar_marcas(*marcas)
+        return ids
+
+    def _asegurar_vigente(self):
+        if not self._construido:
+            self.reconstruir()
+            return
+        with self._lock:
+            pendientes, self._pendientes = self._pendientes, set()
+            revisar = time.monotonic() - self._ultima_revision >= settings.SUGGEST_REFRESCO_SEGUNDOS
+            if revisar:
+                self._ultima_revision = time.monotonic()
+        if revisar:
+            pendientes.update(self._cambios_externos())
+        if pendientes:
+            self.actualizar(pendientes)
+
+    # --- Consulta ---
+    def sugerir(self, prefijo: str, limite: int = 10) -> List[dict]:
+        """Completaciones del prefijo (sin tildes ni mayúsculas), ordenadas por frecuencia."""
+        self._asegurar_vigente()
+        prefijo = normalizar(prefijo)
+        if not prefijo:
+            return []
+
+        with self._lock:
+            cache_clave = (prefijo, limite)
+            if cache_clave in self._cache:
+                return self._cache[cache_clave]
+
+            inicio = bisect_left(self._claves, prefijo)
+            fin = bisect_left(self._claves, prefijo + "\uffff", lo=inicio)
+            terminos = {clave.split("\x00", 1)[1] for clave in self._claves[inicio:fin]}
+            mejores = heapq.nlargest(limite, terminos, key=lambda t: (self._frecuencia[t], -len(t)))
+            resultado = [
+                {
+                    "texto": self._formas[t].most_common(1)[0][0],
+                    "frecuencia": self._frecuencia[t],
+                    "tipo": self._tipos[t].most_common(1)[0][0],
+                }
+                for t in mejores
+            ]
+            if len(self._cache) >= _MAX_CACHE:
+                self._cache.clear()
+            self._cache[cache_clave] = resultado
+            return resultado
+
+    def metricas(self) -> Dict[str, int]:
+        with self._lock:
+            return {"terminos": len(self._frecuencia), "claves": len(self._claves), "aspirantes": len(self._por_aspirante)}
+
+
+indice_sugerencias = IndiceSugerencias()
+
+
+# --- Invalidación dentro del proceso ---
+# Las ediciones ORM llegan tras el commit (ver app/core/invalidation.py) y se aplican en la próxima sugerencia
+suscribir("sugerencias", (Aspirante, Aspirante_Informacion, Url_HojaDeVida), tras_commit=indice_sugerencias.marcar)
@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from app.core.config import settings
+
+INDEX_BASE = "hojas-de-vida-index"
+DIMENSION_COMPLETA = 768  # text-embedding-004
+
+MODO_COMPLETO = "completo"
+MODO_TRUNCADO = "truncado"
+MODO_PCA = "pca"
+
+
+class Proyeccion:
+    """Proyección PCA ajustada sobre nuestro corpus y versionada por el hash de sus componentes."""
+
+    def __init__(self, media: np.ndarray, componentes: np.ndarray, version: str, metadatos: Optional[dict] = None):
+        self.media = media.astype(np.float32)
+        self.componentes = componentes.astype(np.float32)  # (dimension, 768)
+        self.version = version
+        self.metadatos = metadatos or {}
+
+    @property
+    def dimension(self) -> int:
+        return self.componentes.shape[0]
+
+    def aplicar(self, matriz: np.ndarray) -> np.ndarray:
+        return (matriz - self.media) @ self.componentes.T
+
+    def guardar(self, ruta: str):
+        os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+        np.savez(ruta, media=self.media, componentes=self.componentes, version=self.version)
+        with open(os.path.splitext(ruta)[0] + ".json", "w", encoding="utf-8") as f:
+            json.dump({"version": self.version, "dimension": self.dimension, **self.metadatos}, f, indent=2, ensure_ascii=False)
+
+    @classmethod
+    def cargar(cls, ruta: str) -> "Proyeccion":
+        datos = np.load(ruta)
+        return cls(datos["media"], datos["componentes"], str(datos["version"]))
+
+
+def ajustar_pca(matriz: np.ndarray, dimension: int, metadatos: Optional[dict] = None) -> Proyeccion:
+    """PCA por SVD sobre los embeddings completos del corpus (filas = documentos)."""
+    matriz = np.asarray(matriz, dtype=np.float64)
+    media = matriz.mean(axis=0)
+    _, valores, vt = np.linalg.svd(matriz - media, full_matrices=False)
+    componentes = vt[:dimension]
+    varianza = (valores ** 2) / max(1, (valores ** 2).sum())
+
+    version = hashlib.sha1(componentes.astype(np.float32).tobytes()).hexdigest()[:8]
+    info = {
+        "n_muestras": int(matriz.shape[0]),
+        "varianza_explicada": round(float(varianza[:dimension].sum()), 4),
+        "ajustado": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        **(metadatos or {}),
+    }
+    return Proyeccion(media, componentes, version, info)
+
+
+def _normalizar(matriz: np.ndarray) -> np.ndarray:
+    normas = np.linalg.norm(matriz, axis=-1, keepdims=True)
+    return matriz / np.where(normas == 0, 1, normas)
+
+
+def reducir_matriz(matriz: np.ndarray, modo: str, dimension: int, proyeccion: Optional[Proyeccion] = None) -> np.ndarray:
+    """Lleva embeddings completos al espacio reducido (normalizados L2 para el índice coseno)."""
+    matriz = np.asarray(matriz, dtype=np.float32)
+    if modo == MODO_COMPLETO:
+        return matriz
+    if modo == MODO_TRUNCADO:
+        # text-embedding-004 es tipo Matryoshka: las primeras dimensiones concentran la información
+        return _normalizar(matriz[..., :dimension])
+    if modo == MODO_PCA:
+        if proyeccion is None:
+            raise ValueError("El modo PCA requiere una proyección ajustada (scripts/fit_projection.py)")
+        return _normalizar(proyeccion.aplicar(matriz)[..., :dimension])
+    raise ValueError(f"Modo de embedding desconocido: {modo}")
+
+
+@lru_cache(maxsize=1)
+def proyeccion_activa() -> Optional[Proyeccion]:
+    if settings.EMBEDDING_MODO != MODO_PCA:
+        return None
+    return Proyeccion.cargar(settings.EMBEDDING_PROYECCION_PATH)
+
+
+def dimension_activa() -> int:
+    if settings.EMBEDDING_MODO == MODO_COMPLETO:
+        return DIMENSION_COMPLETA
+    return settings.EMBEDDING_DIMENSION
+
+
+def nombre_indice() -> str:
+    """
+    Cada modo/dimensión/versión vive en su propio índice de Pinecone, para no mezclar
+    nunca vectores de espacios distintos (ej: hojas-de-vida-index-pca256-1a2b3c4d).
+    """
+    if settings.EMBEDDING_MODO == MODO_COMPLETO:
+        return INDEX_BASE
+    if settings.EMBEDDING_MODO == MODO_PCA:
+        return f"{INDEX_BASE}-pca{dimension_activa()}-{proyeccion_activa().version}"
+    return f"{INDEX_BASE}-trunc{dimension_activa()}"
+
+
+def version_vector() -> str:
+    """Etiqueta guardada en la metadata de cada vector (para auditar qué espacio lo generó)."""
+    if settings.EMBEDDING_MODO == MODO_PCA:
+        return f"pca{dimension_activa()}-{proyeccion_activa().version}"
+    if settings.EMBEDDING_MODO == MODO_TRUNCADO:
+        return f"trunc{dimension_activa()}"
+    return "completo768"
+
+
+def reducir_embedding(vector: Sequence[float]) -> List[float]:
+    if settings.EMBEDDING_MODO == MODO_COMPLETO or not vector:
+        return list(vector)
+    return reducir_matriz(np.asarray(vector), settings.EMBEDDING_MODO, dimension_activa(), proyeccion_activa()).tolist()
+
+
+# --- Evaluación: recall@k frente al índice completo ---
+def _top_k(consultas: np.ndarray, corpus: np.ndarray, k: int, excluir_diagonal: bool) -> np.ndarray:
+    similitudes = _normalizar(consultas) @ _normalizar(corpus).T
+    if excluir_diagonal:
+        np.fill_diagonal(similitudes, -np.inf)
+    k = min(k, corpus.shape[0] - (1 if excluir_diagonal else 0))
+    indices = np.argpartition(-similitudes, k - 1, axis=1)[:, :k]
+    return indices
+
+
+def recall_at_k(corpus: np.ndarray, corpus_reducido: np.ndarray, k: int = 10,
+                consultas: Optional[np.ndarray] = None, consultas_reducidas: Optional[np.ndarray] = None) -> float:
+    """
+    Fracción de los k vecinos exactos (espacio completo) que el espacio reducido también recupera.
+    Sin consultas explícitas se usa cada documento del corpus como consulta (leave-one-out).
+    """
+    excluir = consultas is None
+    if excluir:
+        consultas, consultas_reducidas = corpus, corpus_reducido
+    verdad = _top_k(consultas, corpus, k, excluir)
+    aproximado = _top_k(consultas_reducidas, corpus_reducido, k, excluir)
+    aciertos = sum(len(set(v) & set(a)) for v, a in zip(verdad, aproximado))
+    return aciertos / verdad.size
+
+
+def particionar(corpus: np.ndarray, fraccion_prueba: float = 0.2, semilla: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Separa (ajuste, prueba) al azar con semilla fija: la PCA nunca ve los documentos con que se mide."""
+    orden = np.random.default_rng(semilla).permutation(corpus.shape[0])
+    n_prueba = max(1, int(round(corpus.shape[0] * fraccion_prueba)))
+    return corpus[orden[n_prueba:]], corpus[orden[:n_prueba]]
+
+
+def comparar_dimensiones(corpus: np.ndarray, dimensiones: Sequence[int], k: int = 10,
+                         consultas: Optional[np.ndarray] = None,
+                         ajuste: Optional[np.ndarray] = None) -> List[Dict]:
+    """
+    Tabla recall@k / memoria para truncado y PCA en varias dimensiones, contra el baseline de 768.
+    La PCA se ajusta sobre `ajuste` (por defecto el mismo corpus): para un recall honesto, pasar una
+    partición disjunta de las consultas (ver particionar).
+    """
+    ajuste = corpus if ajuste is None else ajuste
+    filas = [{"modo": MODO_COMPLETO, "dimension": corpus.shape[1], "recall": 1.0, "bytes_por_vector": corpus.shape[1] * 4}]
+    for dimension in dimensiones:
+        pca = ajustar_pca(ajuste, dimension)
+        for modo, proyeccion in ((MODO_TRUNCADO, None), (MODO_PCA, pca)):
+            reducido = reducir_matriz(corpus, modo, dimension, proyeccion)
+            consultas_red = reducir_matriz(consultas, modo, dimension, proyeccion) if consultas is not None else None
+            filas.append({
+                "modo": modo,
+                "dimension": dimension,
+                "recall": round(recall_at_k(corpus, reducido, k, consultas, consultas_red), 4),
+                "bytes_por_vector": dimension * 4,
+            })
+    return filas
@@ -0,0 +1,93 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+from sqlalchemy import delete
+from sqlmodel import Session, select
+from app.core.config import settings
+from app.core.database import engine
+from app.models.models import Vector_Aspirante
+from app.services.cv_packing import SECCIONES, construir_prompt_lote
+from app.services.vector_projection import version_vector
+
+# Prompt del análisis individual. El de lotes (cv_packing.construir_prompt_lote) produce las mismas SECCIONES
+# y también entra en la versión: un resumen empaquetado y uno individual comparten etiqueta solo si ambos prompts son los vigentes.
+PROMPT_CV = """
+    Analiza la información del CV proporcionado.
+    SI EL DOCUMENTO ESTÁ VACÍO, ILEGIBLE O NO ES UN CV, RESPONDE: "DATOS_NO_DISPONIBLES".
+
+    De lo contrario, extrae el resumen siguiendo ESTRICTAMENTE este formato plano:
+
+    PERFIL_PROFESIONAL: [Resumen]
+    TITULOS_ACADEMICOS: [Lista]
+    HABILIDADES_TECNICAS: [Lista]
+    EXPERIENCIA_DOCENTE: [Resumen]
+    EXPERIENCIA_INDUSTRIA: [Resumen]
+    IDIOMAS: [Idiomas]
+    """
+
+# Subir manualmente cuando cambie la semántica de la extracción sin tocar el texto del prompt
+# (ej: la lógica que arma el resumen plano a partir del JSON de lotes)
+REVISION_PROMPT = 1
+
+
+def hash_texto(texto: str) -> str:
+    return hashlib.sha256((texto or "").encode("utf-8")).hexdigest()
+
+
+def hash_contenido(contenido: bytes) -> str:
+    """Huella del documento exacto que recibió Gemini (PDF o texto convertido)."""
+    return hashlib.sha256(contenido).hexdigest()
+
+
+def hash_json(valor: Any) -> str:
+    return hash_texto(json.dumps(valor, sort_keys=True, ensure_ascii=False))
+
+
+def _plantilla_lote() -> str:
+    """El prompt de lotes renderizado con un documento fijo: cualquier edición de la plantilla cambia este texto."""
+    return construir_prompt_lote([("ID", b"")])
+
+
+def version_resumen() -> str:
+    """
+    'gemini-2.0-flash:p1-3f2a9c1b': modelo + revisión + hash de ambos prompts (individual y lotes) y sus secciones.
+    Cualquier edición de un prompt o cambio de GEMINI_MODELO deja los resúmenes anteriores desactualizados.
+    """
+    huella = hash_texto(PROMPT_CV + "|" + _plantilla_lote() + "|" + "|".join(SECCIONES))[:8]
+    return f"{settings.GEMINI_MODELO.split('/')[-1]}:p{REVISION_PROMPT}-{huella}"
+
+
+def version_embedding() -> str:
+    """'text-embedding-004:pca256-1a2b3c4d': modelo de embedding + espacio vectorial activo."""
+    return f"{settings.EMBEDDING_MODELO.split('/')[-1]}:{version_vector()}"
+
+
+# --- Estado de los vectores en Pinecone ---
+def estados_vectores() -> Dict[int, Vector_Aspirante]:
+    with Session(engine, expire_on_commit=False) as session:
+        return {v.id_aspirante: v for v in session.exec(select(Vector_Aspirante)).all()}
+
+
+def registrar_vectores(filas: List[dict]):
+    """Guarda versión y hashes de los vectores recién subidos (cada lote queda registrado: el sync es reanudable)."""
+    if not filas:
+        return
+    ahora = datetime.now(timezone.utc)
+    with Session(engine) as session:
+        for fila in filas:
+            estado = session.get(Vector_Aspirante, fila["id_aspirante"]) or Vector_Aspirante(id_aspirante=fila["id_aspirante"])
+            estado.version = fila["version"]
+            estado.texto_hash = fila["texto_hash"]
+            estado.metadata_hash = fila["metadata_hash"]
+            estado.actualizado = ahora
+            session.add(estado)
+        session.commit()
+
+
+def olvidar_vectores(ids_aspirantes: List[int]):
+    if not ids_aspirantes:
+        return
+    with Session(engine) as session:
+        session.exec(delete(Vector_Aspirante).where(Vector_Aspirante.id_aspirante.in_(ids_aspirantes)))
+        session.commit()
@@ -0,0 +1,97 @@
+import os
+import sys
+from datetime import datetime, timezone
+
+# Setup path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, text
+from sqlmodel import select
+from app.core.database import engine, init_db
+from app.core.migrations import _INDICES_OBSOLETOS
+from app.models.models import (
+    Aspirante, Aspirante_Informacion, Aspirante_Sede, Url_HojaDeVida, Procesamiento_HojaDeVida, Tarjeta_Candidato
+)
+from app.services.cv_processor import _condicion_reclamable
+from app.services.bulk_import import email_normalizado
+
+IDS = [1, 2, 3]
+
+# (nombre, consulta, al menos uno de estos fragmentos debe aparecer en el plan)
+CHECKS = [
+    ("Tarjetas: resumen por id_aspirante",
+     select(Url_HojaDeVida).where(Url_HojaDeVida.id_aspirante.in_(IDS)),
+     ["ix_url_hojadevida_id_aspirante"]),
+    ("Tarjetas: selectinload de informacion",
+     select(Aspirante_Informacion).where(Aspirante_Informacion.id_aspirante.in_(IDS)),
+     ["ix_aspirante_informacion_id_aspirante"]),
+    ("Tarjetas: selectinload de sede",
+     select(Aspirante_Sede).where(Aspirante_Sede.id_aspirante.in_(IDS)),
+     ["ix_aspirante_sede_id_aspirante"]),
+    ("Tarjetas: lectura del read model",
+     select(Tarjeta_Candidato).where(Tarjeta_Candidato.id_aspirante.in_(IDS)),
+     ["PRIMARY KEY"]),
+    ("Search caso B: JOIN aspirante-sede por municipio",
+     select(Aspirante).join(Aspirante_Sede).where(Aspirante_Sede.Manizales == True).offset(25).limit(25),
+     ["ix_aspirante_sede_id_aspirante", "INTEGER PRIMARY KEY"]),
+    ("Cola: hojas de vida pendientes de resumen",
+     select(Url_HojaDeVida.id_url).where(Url_HojaDeVida.resumen_estructurado == None),
+     ["ix_url_hojadevida_pendientes"]),
+    ("Stats: KPI de pendientes",
+     select(func.count(Url_HojaDeVida.id_url)).where(Url_HojaDeVida.resumen_estructurado == None),
+     ["ix_url_hojadevida_pendientes"]),
+    ("Cola: reclamo de trabajos",
+     select(Procesamiento_HojaDeVida.id_trabajo)
+     .where(_condicion_reclamable(datetime.now(timezone.utc)))
+     .order_by(Procesamiento_HojaDeVida.prioridad.desc(), Procesamiento_HojaDeVida.intentos,
+               Procesamiento_HojaDeVida.id_trabajo).limit(10),
+     ["ix_procesamiento_hojadevida_estado_intentos"]),
+    ("Autocompletado: títulos editados por otros procesos",
+     select(Aspirante_Informacion.id_aspirante).where(Aspirante_Informacion.actualizado > datetime(2024, 1, 1, tzinfo=timezone.utc)),
+     ["ix_aspirante_informacion_actualizado"]),
+    ("Importador: match por documento",
+     select(Aspirante.id_aspirante).where(Aspirante.num_documento == "16071354"),
+     ["ix_aspirante_num_documento"]),
+    ("Importador: match por email (sin mayúsculas ni espacios)",
+     select(Aspirante.id_aspirante).where(email_normalizado(Aspirante.email) == "correo@ejemplo.com"),
+     ["ix_aspirante_email_normalizado"]),
+]
+
+def plan(conn, statement) -> str:
+    sql = str(statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    filas = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+    return "\n".join(f[-1] for f in filas)
+
+def main():
+    if engine.dialect.name != "sqlite":
+        print(f"⚠️ EXPLAIN QUERY PLAN solo está implementado para SQLite (dialecto actual: {engine.dialect.name}).")
+        return
+
+    print("🔬 Verificando planes de consulta (EXPLAIN QUERY PLAN)...")
+    init_db()  # Asegura tablas + migraciones (índices) al día
+
+    fallos = 0
+    with engine.connect() as conn:
+        for nombre, statement, esperados in CHECKS:
+            detalle = plan(conn, statement)
+            ok = any(e in detalle for e in esperados)
+            fallos += not ok
+            print(f"{'✅' if ok else '❌'} {nombre}")
+            if not ok:
+                print("   Plan obtenido:\n   " + detalle.replace("\n", "\n   "))
+                print(f"   Se esperaba uno de: {esperados}")
+
+        existentes = {n for (n,) in conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'"))}
+        sobrantes = sorted(existentes & set(_INDICES_OBSOLETOS))
+        fallos += bool(sobrantes)
+        print(f"{'❌' if sobrantes else '✅'} Sin índices de escritura costosa (texto libre / booleanos de sede)")
+        if sobrantes:
+            print(f"   Siguen existiendo: {sobrantes}")
+
+    if fallos:
+        print(f"\n❌ {fallos} verificación(es) fallaron.")
+        sys.exit(1)
+    print("\n🏁 Todos los planes usan los índices esperados.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import os
+import sys
+import time
+
+# Setup paths
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlmodel import Session, select, func
+from app.core.database import engine, init_db
+from app.models.models import Duplicado_Aspirante
+from app.services.dedup import detectar_duplicados
+
+def main():
+    print("👥 Detectando postulaciones duplicadas (documento / email / archivo / resumen MinHash)...")
+    init_db()
+
+    inicio = time.perf_counter()
+    resumen = detectar_duplicados()
+    duracion = time.perf_counter() - inicio
+
+    print(f"   🔗 Grupos: {resumen['grupos']} | Aspirantes colapsados: {resumen['duplicados']}")
+    print(f"   🧮 Pares candidatos LSH comparados: {resumen['pares_comparados']}")
+    print(f"   ⛔ Trabajos retirados de la cola: {resumen['trabajos_retirados']}")
+
+    with Session(engine) as session:
+        por_motivo = session.exec(
+            select(Duplicado_Aspirante.motivo, func.count(Duplicado_Aspirante.id_aspirante)).group_by(Duplicado_Aspirante.motivo)
+        ).all()
+    for motivo, total in sorted(por_motivo, key=lambda x: -x[1]):
+        print(f"      - {motivo}: {total}")
+
+    print(f"\n✅ Deduplicación finalizada en {duracion:.2f}s. "
+          "Ejecuta scripts/sync_pinecone.py para retirar del índice los vectores de los duplicados.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import os
+import sys
+import json
+import time
+import argparse
+import urllib.request
+from typing import Callable, List, Optional
+from tqdm import tqdm
+
+# Setup path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.search_evaluation import (
+    cargar_casos, recall_at_k, ndcg_at_k, reciprocal_rank, resumir_corrida, comparar_corridas
+)
+
+DIRECTORIO_CORRIDAS = "eval_runs"
+
+# --- Backends: todos reciben (query, municipio, k) y retornan IDs de aspirantes en orden ---
+def backend_local(k: int) -> Callable[[str, Optional[str]], List[str]]:
+    """Endpoint completo en proceso: Pinecone + re-ranking + tarjetas (lo que ve RRHH)."""
+    from app.api.v1.endpoints.search import search_candidates, SearchRequest
+
+    def buscar(query: str, municipio: Optional[str]) -> List[str]:
+        respuesta = search_candidates(SearchRequest(query=query, municipio=municipio, page=1, page_size=k))
+        return [r["id_aspirante"] for r in json.loads(respuesta.body)]
+    return buscar
+
+def backend_pinecone(k: int) -> Callable[[str, Optional[str]], List[str]]:
+    """Solo el vector search (sin re-ranking): aísla cambios de índice/embeddings."""
+    from app.services.pinecone_service import search_best_matches
+
+    def buscar(query: str, municipio: Optional[str]) -> List[str]:
+        filtros = {"municipios": {"$in": [municipio]}} if municipio and municipio != "Todos" else None
+        resultados = search_best_matches(query, filters=filtros, top_k=k, include_metadata=False)
+        return [m.id for m in resultados.matches] if hasattr(resultados, "matches") else []
+    return buscar
+
+def backend_api(k: int, url: str) -> Callable[[str, Optional[str]], List[str]]:
+    """Un servidor desplegado (incluye red, serialización y middleware)."""
+    def buscar(query: str, municipio: Optional[str]) -> List[str]:
+        cuerpo = json.dumps({"query": query, "municipio": municipio, "page": 1, "page_size": k}).encode("utf-8")
+        peticion = urllib.request.Request(f"{url.rstrip('/')}/api/v1/search/", data=cuerpo,
+                                          headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(peticion, timeout=60) as r:
+            return [item["id_aspirante"] for item in json.loads(r.read())]
+    return buscar
+
+def ejecutar(args):
+    casos = cargar_casos(args.casos)
+    if args.backend == "api":
+        buscar = backend_api(args.k, args.url)
+    elif args.backend == "pinecone":
+        buscar = backend_pinecone(args.k)
+    else:
+        buscar = backend_local(args.k)
+
+    print(f"🧪 Evaluando {len(casos)} consultas | backend={args.backend} | k={args.k}")
+    resultados = []
+    for caso in tqdm(casos, desc="Consultas", unit="q"):
+        inicio = time.perf_counter()
+        error = None
+        try:
+            ranking = buscar(caso["query"], caso["municipio"])
+        except Exception as e:
+            ranking, error = [], f"{type(e).__name__}: {e}"
+        latencia_ms = (time.perf_counter() - inicio) * 1000
+
+        resultados.append({
+            "query": caso["query"],
+            "municipio": caso["municipio"],
+            "ranking": ranking,
+            "latencia_ms": round(latencia_ms, 2),
+            "recall": recall_at_k(ranking, caso["relevantes"], args.k),
+            "ndcg": ndcg_at_k(ranking, caso["relevantes"], args.k),
+            "rr": reciprocal_rank(ranking, caso["relevantes"]),
+            "error": error,
+        })
+        if args.pausa:
+            time.sleep(args.pausa)
+
+    corrida = {
+        "nombre": args.nombre or f"{args.backend}-{time.strftime('%Y%m%d-%H%M%S')}",
+        "backend": args.backend,
+        "k": args.k,
+        "casos": args.casos,
+        "resumen": resumir_corrida(resultados, args.k),
+        "resultados": resultados,
+    }
+
+    os.makedirs(DIRECTORIO_CORRIDAS, exist_ok=True)
+    ruta = os.path.join(DIRECTORIO_CORRIDAS, f"{corrida['nombre']}.json")
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(corrida, f, indent=2, ensure_ascii=False)
+
+    print("\n📊 Resultados:")
+    for metrica, valor in corrida["resumen"].items():
+        print(f"   {metrica:<12} {valor}")
+    print(f"\n💾 Corrida guardada en {ruta}")
+
+def comparar(rutas: List[str]):
+    corridas = []
+    for ruta in rutas:
+        with open(ruta, encoding="utf-8") as f:
+            corridas.append(json.load(f))
+    print("⚖️ Comparación (la primera corrida es la referencia):\n")
+    print(comparar_corridas(corridas))
+
+def main():
+    parser = argparse.ArgumentParser(description="Calidad vs latencia del buscador de candidatos")
+    parser.add_argument("casos", nargs="?", help="Set etiquetado (JSON/JSONL con query, municipio, relevantes)")
+    parser.add_argument("--backend", choices=["local", "pinecone", "api"], default="local")
+    parser.add_argument("--url", default="http://localhost:8000", help="Base URL para --backend api")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nombre", help="Nombre de la corrida (archivo en eval_runs/)")
+    parser.add_argument("--pausa", type=float, default=0.0, help="Segundos entre consultas (cuotas)")
+    parser.add_argument("--comparar", nargs="+", metavar="CORRIDA", help="Compara corridas guardadas lado a lado")
+    args = parser.parse_args()
+
+    if args.comparar:
+        comparar(args.comparar)
+    elif args.casos:
+        ejecutar(args)
+    else:
+        parser.print_help()
+
+if __name__ == "__main__":
+    main()
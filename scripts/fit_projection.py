@@ -0,0 +1,96 @@
+import argparse
+import os
+import sys
+from typing import List, Tuple
+import numpy as np
+from tqdm import tqdm
+
+# Setup paths
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlmodel import Session, select
+from app.core.config import settings
+from app.core.database import engine
+from app.models.models import Url_HojaDeVida
+from app.services.pinecone_service import pc, _embed
+from app.services.search_evaluation import cargar_casos
+from app.services.vector_projection import INDEX_BASE, ajustar_pca, comparar_dimensiones, particionar
+
+DIMENSIONES = [64, 128, 256, 384]  # Candidatas a comparar contra el baseline de 768
+K = 10
+FETCH_BATCH = 100
+FRACCION_PRUEBA = 0.2  # Documentos apartados: la PCA no los ve y se usan como consultas
+
+# Consultas típicas de RRHH: se suman a la evaluación sobre la partición apartada
+CONSULTAS_REFERENCIA = [
+    "Ingeniero de sistemas con experiencia docente en inteligencia artificial y bases de datos",
+    "Licenciado en matemáticas con maestría en educación",
+    "Contador público con experiencia en docencia universitaria",
+    "Enfermera con especialización en salud pública",
+    "Abogado con experiencia en derecho administrativo",
+]
+
+def cargar_corpus() -> Tuple[List[str], np.ndarray]:
+    """Trae los vectores COMPLETOS (768) ya indexados, sin volver a llamar a Gemini por cada CV."""
+    with Session(engine) as session:
+        ids = [str(i) for i in session.exec(
+            select(Url_HojaDeVida.id_aspirante).where(Url_HojaDeVida.resumen_estructurado != None)
+        ).all() if i is not None]
+
+    index = pc.Index(INDEX_BASE)
+    encontrados, vectores = [], []
+    for i in tqdm(range(0, len(ids), FETCH_BATCH), desc="Descargando vectores", unit="lote"):
+        respuesta = index.fetch(ids=ids[i:i + FETCH_BATCH])
+        for vid, vector in respuesta.vectors.items():
+            encontrados.append(vid)
+            vectores.append(vector.values)
+    return encontrados, np.asarray(vectores, dtype=np.float32)
+
+def imprimir_tabla(titulo: str, filas):
+    print(f"\n--- {titulo} ---")
+    print(f"{'modo':<10}{'dim':>6}{'recall@' + str(K):>12}{'bytes/vector':>15}")
+    for f in filas:
+        print(f"{f['modo']:<10}{f['dimension']:>6}{f['recall']:>12.4f}{f['bytes_por_vector']:>15}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Ajusta la proyección PCA y compara recall@K contra 768")
+    parser.add_argument("--casos", help="Set etiquetado de eval_search (sus consultas se suman a las de referencia)")
+    args = parser.parse_args()
+
+    print("📐 Ajustando proyección de dimensión reducida sobre el corpus...")
+    ids, corpus = cargar_corpus()
+    if len(ids) * (1 - FRACCION_PRUEBA) < max(DIMENSIONES):
+        print(f"❌ Solo hay {len(ids)} vectores en '{INDEX_BASE}'. Ejecuta primero sync_pinecone en modo completo.")
+        return
+    print(f"📊 Vectores del corpus: {corpus.shape}")
+
+    # 1. Recall@K vs 768 fuera de muestra: la PCA se ajusta sin los documentos apartados,
+    #    que luego se buscan como consultas contra el resto del corpus
+    entrenamiento, prueba = particionar(corpus, FRACCION_PRUEBA)
+    tabla_corpus = comparar_dimensiones(entrenamiento, DIMENSIONES, K, consultas=prueba, ajuste=entrenamiento)
+    imprimir_tabla(f"Recall partición apartada ({len(prueba)} docs)", tabla_corpus)
+
+    # 2. Recall@K vs 768 para consultas reales de RRHH (nunca forman parte del ajuste)
+    textos = list(CONSULTAS_REFERENCIA)
+    if args.casos:
+        textos += [caso["query"] for caso in cargar_casos(args.casos)]
+    consultas = np.asarray([_embed(q, reducir=False) for q in tqdm(textos, desc="Consultas", unit="q")], dtype=np.float32)
+    tabla_consultas = comparar_dimensiones(corpus, DIMENSIONES, K, consultas=consultas)
+    imprimir_tabla(f"Recall consultas ({len(textos)})", tabla_consultas)
+
+    # 3. Proyección definitiva con la dimensión configurada, ya sobre todo el corpus (versionada por hash)
+    dimension = settings.EMBEDDING_DIMENSION
+    proyeccion = ajustar_pca(corpus, dimension, {
+        "k": K,
+        "fraccion_prueba": FRACCION_PRUEBA,
+        "recall_apartado": tabla_corpus,
+        "recall_consultas": tabla_consultas,
+    })
+    proyeccion.guardar(settings.EMBEDDING_PROYECCION_PATH)
+
+    print(f"\n✅ Proyección PCA {dimension}d versión '{proyeccion.version}' guardada en {settings.EMBEDDING_PROYECCION_PATH}")
+    print(f"   Varianza explicada: {proyeccion.metadatos['varianza_explicada']:.2%}")
+    print("💡 Para activarla: EMBEDDING_MODO=pca en .env, luego init_pinecone.py y sync_pinecone.py.")
+
+if __name__ == "__main__":
+    main()
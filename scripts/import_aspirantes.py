@@ -0,0 +1,35 @@
+import os
+import sys
+import time
+
+# Setup paths
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import init_db
+from app.services.bulk_import import leer_filas, importar_aspirantes
+
+def main():
+    if len(sys.argv) < 2:
+        print("Uso: python scripts/import_aspirantes.py <export_formulario.csv|.xlsx>")
+        sys.exit(1)
+
+    ruta = sys.argv[1]
+    if not os.path.exists(ruta):
+        print(f"❌ No encuentro el archivo: {ruta}")
+        sys.exit(1)
+
+    print(f"📥 Importando aspirantes desde '{ruta}'...")
+    init_db()
+
+    inicio = time.perf_counter()
+    with open(ruta, "rb") as f:
+        resumen = importar_aspirantes(leer_filas(ruta, f.read()))
+    duracion = time.perf_counter() - inicio
+
+    print(f"   📄 Filas leídas: {resumen['leidas']} (sin documento: {resumen['sin_documento']}, duplicadas: {resumen['duplicadas_en_archivo']})")
+    print(f"   🆕 Aspirantes nuevos: {resumen['nuevos']} | ♻️ Actualizados: {resumen['actualizados']}")
+    print(f"   🔗 URLs pendientes de procesar: {resumen['urls_para_procesar']}")
+    print(f"\n✅ Importación finalizada en {duracion:.2f}s. Ejecuta scripts/process_pdfs.py para analizar los CVs nuevos.")
+
+if __name__ == "__main__":
+    main()
@@ -6,13 +6,16 @@ from pinecone import Pinecone, ServerlessSpec
 # Setup path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from app.core.config import settings
+from app.services.vector_projection import nombre_indice, dimension_activa
 
 def init_pinecone_index():
     print("⚙️ Configurando infraestructura vectorial en Pinecone...")
     
     pc = Pinecone(api_key=settings.PINECONE_API_KEY)
     
-    index_name = "hojas-de-vida-index"
+    # El nombre y la dimensión dependen del modo de vectores (completo / truncado / pca)
+    index_name = nombre_indice()
+    dimension = dimension_activa()
     
     # Verificar si ya existe
     existing_indexes = [i.name for i in pc.list_indexes()]
@@ -21,7 +24,7 @@ def init_pinecone_index():
         print(f"✅ El índice '{index_name}' ya existe. No es necesario hacer nada.")
         return
 
-    print(f"🏗️ Creando índice '{index_name}' (Esto puede tardar unos segundos)...")
+    print(f"🏗️ Creando índice '{index_name}' ({dimension} dims, modo {settings.EMBEDDING_MODO}). Esto puede tardar unos segundos...")
     
     # AQUÍ es donde usamos el PINECONE_ENV (Region)
     # Si no definiste PINECONE_ENV en .env, usa 'us-east-1' por defecto
@@ -30,7 +33,7 @@ def init_pinecone_index():
     try:
         pc.create_index(
             name=index_name,
-            dimension=768, # Dimensión estándar para text-embedding-004 y 001
+            dimension=dimension, # 768 para text-embedding-004 completo; menor en modo truncado/pca
             metric="cosine", # La mejor para similitud semántica de texto
             spec=ServerlessSpec(
                 cloud="aws", # Pinecone Serverless corre mayormente en AWS
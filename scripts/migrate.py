@@ -0,0 +1,32 @@
+import os
+import sys
+
+# Setup path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import engine
+from app.core.migrations import MIGRACIONES, migrar, version_actual
+from app.services.candidate_cards import reconstruir_tarjetas
+
+def main():
+    print("🧱 Migraciones de esquema")
+
+    with engine.begin() as conn:
+        actual = version_actual(conn)
+    ultima = max(m.version for m in MIGRACIONES)
+    print(f"   Versión actual: {actual} | Última disponible: {ultima}")
+
+    if actual >= ultima:
+        print("✅ La base de datos ya está al día.")
+        return
+
+    # Tablas nuevas primero (create_all no toca las existentes), luego los cambios versionados
+    for migracion in migrar(engine):
+        print(f"   ✅ {migracion.version:04d} - {migracion.descripcion}")
+
+    # Read model de /search: una base migrada llega sin tarjetas
+    print(f"   🃏 Tarjetas de candidatos completadas: {reconstruir_tarjetas()}")
+    print("🏁 Migraciones aplicadas.")
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,14 @@
 import os
 import sys
+import argparse
 import io
 import re
 import time
+import socket
 import logging
 import zipfile
-from typing import Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, NamedTuple, Optional, Tuple
 from tqdm import tqdm
 from docx import Document 
 
@@ -20,9 +23,20 @@ import google.generativeai as genai
 from google.api_core import exceptions as google_exceptions
 from googleapiclient.errors import HttpError
 
-from app.core.database import engine
-from app.models.models import Url_HojaDeVida
+from app.core.database import engine, init_db
+from app.models.models import Url_HojaDeVida, Procesamiento_HojaDeVida
 from app.core.config import settings
+from app.services.cv_processor import (
+    ArchivoNoSoportado, CuotaAgotada, liberar_por_cuota, encolar_pendientes, reclamar_trabajos, contar_por_estado,
+    marcar_completado, marcar_error, marcar_no_soportado, marcar_duplicado, PENDIENTE, ERROR, EN_PROCESO,
+    urls_en_cola, metadatos_en_cache, guardar_metadatos_drive, excluir_no_soportados,
+    registrar_no_encontrados, no_encontrados_vigentes, registrar_md5_analizado, urls_con_resumen,
+    encolar_archivos_cambiados
+)
+from app.services.cv_packing import empaquetar, construir_prompt_lote, separar_respuesta_lote
+from app.services.versioning import PROMPT_CV, version_resumen, hash_contenido
+from app.services.dedup import detectar_duplicados, registrar_duplicado_por_archivo
+import app.services.candidate_cards  # noqa: F401  (registra el refresco de tarjetas tras cada commit)
 
 # --- CONFIGURACIÓN DE LOGS ---
 logging.basicConfig()
@@ -32,6 +46,25 @@ logging.getLogger('googleapiclient.discovery_cache').setLevel(logging.ERROR)
 # --- CONFIGURACIÓN ---
 SCOPES = ['https://www.googleapis.com/auth/drive.readonly']
 SERVICE_ACCOUNT_FILE = 'scripts/credentials.json'
+LOTE_TRABAJOS = 10  # Cuántos CVs reclama cada worker por vuelta
+LOTE_METADATOS = 100  # Máximo de llamadas que admite una petición batch de Drive
+CAMPOS_METADATOS = "id, name, mimeType, size, md5Checksum"
+REINTENTO_NO_ENCONTRADO = timedelta(hours=24)  # Un 404 de Drive no se vuelve a consultar antes de esto
+# Empaque de CVs convertidos a texto (DOCX/DOCM) en una sola llamada a Gemini
+EMPAQUE_MAX_TOKENS = 30000    # Entrada + salida reservada por paquete
+EMPAQUE_MAX_DOCUMENTOS = 8    # 1 = desactiva el empaque (una llamada por CV)
+# Cuota de Gemini: el worker devuelve sus trabajos a la cola, pausa y reintenta; tras varias pausas seguidas se detiene
+PAUSA_CUOTA_SEGUNDOS = 20
+MAX_PAUSAS_CUOTA = 5
+
+# --- LISTA BLANCA ESTRICTA DE FORMATOS ---
+MIME_GOOGLE_DOC = 'application/vnd.google-apps.document'
+MIME_PDF = 'application/pdf'
+MIMES_WORD = [
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document', # .docx
+    'application/vnd.ms-word.document.macroenabled.12' # .docm
+]
+MIMES_SOPORTADOS = [MIME_GOOGLE_DOC, MIME_PDF] + MIMES_WORD
 
 genai.configure(api_key=settings.GOOGLE_API_KEY)
 
@@ -74,44 +107,134 @@ def convert_docx_bytes_to_text(docx_bytes: bytes) -> Optional[bytes]:
         # Si falla (ej: es un .doc renombrado), retornamos None
         return None
 
-def smart_download_file(service, file_id: str) -> Optional[Tuple[bytes, str]]:
+def fetch_metadatos_batch(service, file_ids: List[str]) -> Tuple[Dict[str, dict], List[str]]:
+    """
+    Obtiene mimeType, size y md5Checksum de varios archivos usando peticiones batch de Drive
+    (hasta 100 llamadas por petición HTTP). Retorna (metadatos, ids con 404); los demás fallos
+    (permisos, lote caído) se omiten y se consultarán al descargar.
+    """
+    resultados, no_encontrados = {}, []
+
+    def _callback(request_id, response, exception):
+        if exception is None and response:
+            resultados[request_id] = response
+        elif isinstance(exception, HttpError) and exception.resp.status == 404:
+            no_encontrados.append(request_id)
+
+    for i in range(0, len(file_ids), LOTE_METADATOS):
+        batch = service.new_batch_http_request(callback=_callback)
+        for file_id in file_ids[i:i + LOTE_METADATOS]:
+            batch.add(service.files().get(fileId=file_id, fields=CAMPOS_METADATOS), request_id=file_id)
+        try:
+            batch.execute()
+        except HttpError as e:
+            print(f"⚠️ Falló un lote de metadatos ({e}). Se consultarán uno a uno al descargar.")
+
+    return resultados, no_encontrados
+
+def actualizar_metadatos(service, file_ids: List[str]) -> Dict[str, dict]:
+    """Consulta en lote y guarda en la caché (los 404 quedan en caché negativa con fecha de reintento)."""
+    nuevos, no_encontrados = fetch_metadatos_batch(service, file_ids) if file_ids else ({}, [])
+    if nuevos:
+        guardar_metadatos_drive(list(nuevos.values()))
+    if no_encontrados:
+        registrar_no_encontrados(no_encontrados, REINTENTO_NO_ENCONTRADO)
+    return nuevos
+
+def prefetch_metadatos(service) -> Tuple[int, int]:
+    """
+    Etapa previa a la descarga: resuelve los file_id de la cola, trae sus metadatos
+    por lotes a la caché local y saca de la cola los formatos no soportados
+    antes de que algún worker los reclame. Los 404 recientes no se vuelven a consultar.
+    Retorna (consultados, excluidos).
+    """
+    en_cola = urls_en_cola()
+    ids_por_url = {id_url: extract_id_from_url(url) for id_url, url in en_cola}
+
+    file_ids = sorted({fid for fid in ids_por_url.values() if fid})
+    cache = metadatos_en_cache(file_ids)
+    recientes_404 = no_encontrados_vigentes(file_ids)
+    # Sin caché, o con un 404 cuya fecha de reintento ya pasó
+    faltantes = [fid for fid in file_ids
+                 if fid not in recientes_404 and (fid not in cache or cache[fid].no_encontrado_hasta is not None)]
+
+    if actualizar_metadatos(service, faltantes):
+        cache = metadatos_en_cache(file_ids)
+
+    no_soportados = {}
+    for id_url, file_id in ids_por_url.items():
+        if not file_id:
+            no_soportados[id_url] = None
+            continue
+        meta = cache.get(file_id)
+        if meta and meta.mime_type and meta.mime_type not in MIMES_SOPORTADOS:
+            no_soportados[id_url] = meta.mime_type
+
+    return len(faltantes), excluir_no_soportados(no_soportados)
+
+def revisar_cambios(service) -> Tuple[int, int]:
+    """
+    Vuelve a consultar en lote los metadatos de los CVs ya analizados y re-encola solo aquellos cuyo
+    md5Checksum cambió en Drive: los archivos intactos se saltan sin descargarlos ni llamar a Gemini.
+    Los Google Docs no tienen md5 y no se revisan. Retorna (revisados, re-encolados).
+    """
+    ids_por_url = {id_url: extract_id_from_url(url) for id_url, url in urls_con_resumen()}
+    file_ids = sorted({fid for fid in ids_por_url.values() if fid})
+    recientes_404 = no_encontrados_vigentes(file_ids)
+    file_ids = [fid for fid in file_ids if fid not in recientes_404]
+    anteriores = metadatos_en_cache(file_ids)
+    actuales = actualizar_metadatos(service, file_ids)
+
+    cambiados = set()
+    for file_id, meta in actuales.items():
+        md5 = meta.get("md5Checksum")
+        previo = anteriores.get(file_id)
+        analizado = previo.md5_analizado if previo else None
+        if not md5:
+            continue
+        if analizado is None:
+            # Resumen previo a este registro: la revisión actual pasa a ser la referencia
+            registrar_md5_analizado(file_id, md5)
+        elif md5 != analizado:
+            cambiados.add(file_id)
+
+    return len(actuales), encolar_archivos_cambiados([i for i, fid in ids_por_url.items() if fid in cambiados])
+
+def smart_download_file(service, file_id: str, file_metadata: Optional[dict] = None) -> Optional[Tuple[bytes, str]]:
     """
     Descarga SOLO formatos soportados. Filtra los .doc viejos para evitar errores 400.
+    Si ya se tienen los metadatos (caché del prefetch) se evita la llamada files().get.
+    Lanza ArchivoNoSoportado si el formato nunca será procesable; retorna None ante fallos reintentables.
     """
     try:
-        # 1. Obtener Metadatos
-        file_metadata = service.files().get(fileId=file_id, fields="name, mimeType, size").execute()
+        # 1. Obtener Metadatos (solo si el prefetch no los trajo)
+        if not file_metadata:
+            file_metadata = service.files().get(fileId=file_id, fields="name, mimeType, size").execute()
         original_mime = file_metadata.get('mimeType')
         
         request = None
         target_mime = None
         needs_conversion_to_text = False
 
-        # --- LISTA BLANCA ESTRICTA ---
-        
         # CASO 1: Google Doc -> Exportar a PDF
-        if original_mime == 'application/vnd.google-apps.document':
-            request = service.files().export(fileId=file_id, mimeType='application/pdf')
-            target_mime = 'application/pdf'
+        if original_mime == MIME_GOOGLE_DOC:
+            request = service.files().export(fileId=file_id, mimeType=MIME_PDF)
+            target_mime = MIME_PDF
             
         # CASO 2: PDF Nativo -> Descargar directo
-        elif original_mime == 'application/pdf':
+        elif original_mime == MIME_PDF:
             request = service.files().get_media(fileId=file_id)
-            target_mime = 'application/pdf'
+            target_mime = MIME_PDF
 
         # CASO 3: Word Moderno (.docx) O con Macros (.docm) -> Descargar y Convertir a Texto
-        elif original_mime in [
-            'application/vnd.openxmlformats-officedocument.wordprocessingml.document', # .docx
-            'application/vnd.ms-word.document.macroenabled.12' # .docm
-        ]:
+        elif original_mime in MIMES_WORD:
             request = service.files().get_media(fileId=file_id)
             target_mime = 'text/plain' # Gemini recibirá texto plano
             needs_conversion_to_text = True
 
-        # CASO 4: Todo lo demás (incluido application/msword que son los .doc viejos) -> IGNORAR
+        # CASO 4: Todo lo demás (incluido application/msword que son los .doc viejos) -> EXCLUIR DE LA COLA
         else:
-            # print(f"⚠️ Formato no soportado ignorado: {original_mime}")
-            return None
+            raise ArchivoNoSoportado(original_mime)
 
         # 2. Ejecutar Descarga
         file_stream = io.BytesIO()
@@ -136,32 +259,21 @@ def smart_download_file(service, file_id: str) -> Optional[Tuple[bytes, str]]:
             
         return data, target_mime
 
+    except ArchivoNoSoportado:
+        raise
     except HttpError:
         return None
     except Exception:
         return None
 
 def analyze_cv_with_gemini(file_content: bytes, mime_type: str) -> Optional[str]:
-    model = genai.GenerativeModel("models/gemini-2.0-flash") 
-    
-    prompt = """
-    Analiza la información del CV proporcionado.
-    SI EL DOCUMENTO ESTÁ VACÍO, ILEGIBLE O NO ES UN CV, RESPONDE: "DATOS_NO_DISPONIBLES".
-    
-    De lo contrario, extrae el resumen siguiendo ESTRICTAMENTE este formato plano:
-
-    PERFIL_PROFESIONAL: [Resumen]
-    TITULOS_ACADEMICOS: [Lista]
-    HABILIDADES_TECNICAS: [Lista]
-    EXPERIENCIA_DOCENTE: [Resumen]
-    EXPERIENCIA_INDUSTRIA: [Resumen]
-    IDIOMAS: [Idiomas]
-    """
+    """Retorna el resumen o None si no hay datos/falló. Lanza CuotaAgotada si Gemini rechaza por cuota."""
+    model = genai.GenerativeModel(settings.GEMINI_MODELO)
     
     try:
         response = model.generate_content([
             {'mime_type': mime_type, 'data': file_content},
-            prompt
+            PROMPT_CV
         ])
         
         text = response.text
@@ -170,66 +282,247 @@ def analyze_cv_with_gemini(file_content: bytes, mime_type: str) -> Optional[str]
             
         return text
 
-    except google_exceptions.ResourceExhausted:
-        print("\n⚠️  Cuota excedida. Pausando 20s...")
-        time.sleep(20)
-        return None
+    except google_exceptions.ResourceExhausted as e:
+        raise CuotaAgotada(str(e)) from e
     except Exception as e:
         # print(f"\n❌ Error Gemini: {e}") 
         return None
 
+def analyze_cvs_packed_with_gemini(documentos: List[Tuple[str, bytes]]) -> Dict[str, Optional[str]]:
+    """
+    Analiza varios CVs en texto plano en una sola llamada (respuesta JSON).
+    Retorna {id: resumen | None (sin datos)} solo para los documentos que se pudieron separar
+    y validar; los ausentes deben reintentarse con analyze_cv_with_gemini.
+    Lanza CuotaAgotada si Gemini rechaza por cuota (reintentarlos uno a uno solo repetiría el rechazo).
+    """
+    model = genai.GenerativeModel(settings.GEMINI_MODELO)
+    try:
+        response = model.generate_content(
+            construir_prompt_lote(documentos),
+            generation_config={"response_mime_type": "application/json"},
+        )
+        return separar_respuesta_lote(response.text, [doc_id for doc_id, _ in documentos])
+    except google_exceptions.ResourceExhausted as e:
+        raise CuotaAgotada(str(e)) from e
+    except Exception:
+        # JSON inválido, respuesta bloqueada, etc.: todo el paquete cae a la vía individual
+        return {}
+
+class DocumentoListo(NamedTuple):
+    trabajo: Procesamiento_HojaDeVida
+    contenido: bytes
+    mime_type: str
+    file_id: Optional[str] = None
+    md5: Optional[str] = None  # md5Checksum de Drive de la revisión descargada (None en Google Docs)
+
+def preparar_trabajo(drive_service, trabajo, worker_id: str) -> Optional[DocumentoListo]:
+    """Descarga el CV de un trabajo reclamado. Si no hay nada que analizar deja su estado final y retorna None."""
+    with Session(engine) as session:
+        cv = session.get(Url_HojaDeVida, trabajo.id_url)
+        if not cv:
+            marcar_error(trabajo, worker_id, "Url_HojaDeVida inexistente")
+            return None
+        if cv.resumen_estructurado and cv.resumen_version == version_resumen():
+            # Otro worker (o una corrida anterior) ya lo resolvió con el prompt/modelo vigente
+            marcar_completado(trabajo, worker_id)
+            return None
+        url = cv.url_hoja_de_vida
+        id_aspirante = cv.id_aspirante
+
+    file_id = extract_id_from_url(url)
+    if not file_id:
+        marcar_no_soportado(trabajo, worker_id, None)
+        return None
+
+    if no_encontrados_vigentes([file_id]):
+        # 404 reciente en Drive: no se intenta descargar hasta la fecha de reintento
+        marcar_error(trabajo, worker_id, "Archivo no encontrado en Drive (404)")
+        return None
+
+    cacheado = metadatos_en_cache([file_id]).get(file_id)
+    metadatos = {"mimeType": cacheado.mime_type, "size": cacheado.tamano} if cacheado and cacheado.mime_type else None
+    md5 = cacheado.md5_checksum if metadatos else None
+
+    try:
+        result = smart_download_file(drive_service, file_id, metadatos)
+    except ArchivoNoSoportado as e:
+        marcar_no_soportado(trabajo, worker_id, e.mime_type)
+        return None
+
+    if not result:
+        # Descarga fallida, archivo corrupto o vacío: cuenta como intento
+        marcar_error(trabajo, worker_id, "Descarga fallida o contenido vacío")
+        return None
+
+    file_data, mime_type = result
+
+    # Mismo archivo exacto que ya se analizó para otra postulación: se colapsa sin llamar a Gemini
+    huella = hash_contenido(file_data)
+    if registrar_duplicado_por_archivo(id_aspirante, huella) is not None:
+        with Session(engine) as session:
+            cv = session.get(Url_HojaDeVida, trabajo.id_url)
+            cv.contenido_hash = huella
+            session.add(cv)
+            session.commit()
+        registrar_md5_analizado(file_id, md5)
+        marcar_duplicado(trabajo, worker_id, mime_type)
+        return None
+
+    return DocumentoListo(trabajo, file_data, mime_type, file_id, md5)
+
+def guardar_resumen(documento: DocumentoListo, worker_id: str, resumen: Optional[str]) -> bool:
+    """Persiste el resumen y cierra el trabajo. Retorna True si generó resumen."""
+    trabajo = documento.trabajo
+    if not resumen:
+        marcar_error(trabajo, worker_id, "Gemini no retornó un resumen válido", documento.mime_type)
+        return False
+
+    with Session(engine) as session:
+        cv = session.get(Url_HojaDeVida, trabajo.id_url)
+        cv.resumen_estructurado = resumen
+        cv.resumen_version = version_resumen()
+        cv.contenido_hash = hash_contenido(documento.contenido)
+        cv.resumen_actualizado = datetime.now(timezone.utc)
+        session.add(cv)
+        session.commit()
+    registrar_md5_analizado(documento.file_id, documento.md5)
+    marcar_completado(trabajo, worker_id, documento.mime_type)  # La tarjeta la refresca el hook de invalidación
+    return True
+
+def analizar_documentos(documentos: List[DocumentoListo]) -> Tuple[List[Tuple[DocumentoListo, Optional[str]]], List[DocumentoListo]]:
+    """
+    Los textos convertidos (DOCX/DOCM) se empaquetan por presupuesto de tokens; los PDF,
+    los paquetes de un solo documento y lo que no se pudo separar van de a uno.
+    Retorna (analizados, sin_analizar): al agotarse la cuota se deja de llamar a Gemini y
+    los documentos restantes vuelven sin resultado para devolverlos a la cola.
+    """
+    resultados = []
+    individuales = [d for d in documentos if d.mime_type != 'text/plain']
+    por_id = {str(d.trabajo.id_url): d for d in documentos if d.mime_type == 'text/plain'}
+
+    paquetes = empaquetar([(i, d.contenido) for i, d in por_id.items()], EMPAQUE_MAX_TOKENS, EMPAQUE_MAX_DOCUMENTOS)
+    for n, paquete in enumerate(paquetes):
+        if len(paquete) == 1:
+            individuales.append(por_id[paquete[0][0]])
+            continue
+        try:
+            respuestas = analyze_cvs_packed_with_gemini(paquete)
+        except CuotaAgotada:
+            # El paquete completo y todo lo que falta vuelve a la cola (sin caer a la vía individual)
+            restantes = [por_id[doc_id] for p in paquetes[n:] for doc_id, _ in p]
+            return resultados, restantes + individuales
+        time.sleep(1)
+        for doc_id, _ in paquete:
+            if doc_id in respuestas:
+                resultados.append((por_id[doc_id], respuestas[doc_id]))
+            else:
+                individuales.append(por_id[doc_id])
+
+    for i, documento in enumerate(individuales):
+        try:
+            resultados.append((documento, analyze_cv_with_gemini(documento.contenido, documento.mime_type)))
+        except CuotaAgotada:
+            return resultados, individuales[i:]
+        time.sleep(1)
+    return resultados, []
+
 def main():
+    parser = argparse.ArgumentParser(description="Analiza con Gemini las hojas de vida en cola")
+    parser.add_argument("--revisar-cambios", action="store_true",
+                        help="Re-encola los CVs ya analizados cuyo archivo cambió en Drive (md5), saltando los intactos")
+    args = parser.parse_args()
+
     print("🚀 Iniciando Motor (Filtro Inteligente: Solo PDF/DOCX/DOCM)")
-    
+
     drive_service = get_drive_service()
     if not drive_service: return
 
-    with Session(engine) as session:
-        statement = select(Url_HojaDeVida).where(Url_HojaDeVida.resumen_estructurado == None)
-        cvs = session.exec(statement).all()
-        
-        total_cvs = len(cvs)
-        print(f"📊 Pendientes: {total_cvs}")
-        
-        pbar = tqdm(cvs, desc="Procesando", unit="cv")
-        processed_count = 0
-        
-        for cv in pbar:
+    # Crea la tabla de la cola si la base es anterior a ella
+    init_db()
+
+    # Identificador único del worker: varios procesos pueden drenar la cola en paralelo
+    worker_id = f"{socket.gethostname()}-{os.getpid()}"
+
+    # Colapsa postulaciones repetidas antes de encolar: los duplicados no gastan análisis ni vectores
+    dedup = detectar_duplicados()
+    print(f"👥 Duplicados colapsados: {dedup['duplicados']} en {dedup['grupos']} grupos | Retirados de la cola: {dedup['trabajos_retirados']}")
+
+    nuevos = encolar_pendientes()
+    if args.revisar_cambios:
+        revisados, cambiados = revisar_cambios(drive_service)
+        print(f"🔁 Archivos revisados en Drive: {revisados} | Con contenido nuevo (re-encolados): {cambiados}")
+
+    # Metadatos por lotes: descarta formatos no soportados antes de reclamar trabajos
+    consultados, excluidos = prefetch_metadatos(drive_service)
+    print(f"🗂️ Metadatos consultados en lote: {consultados} | ⛔ Excluidos por formato: {excluidos}")
+
+    estados = contar_por_estado()
+    total_cvs = estados.get(PENDIENTE, 0) + estados.get(ERROR, 0) + estados.get(EN_PROCESO, 0)
+    print(f"📥 Encolados nuevos: {nuevos} | 📊 Pendientes en cola: {total_cvs} | Worker: {worker_id}")
+
+    pbar = tqdm(total=total_cvs, desc="Procesando", unit="cv")
+    processed_count = 0
+    intentados = 0
+    pausas_cuota = 0
+
+    while True:
+        trabajos = reclamar_trabajos(worker_id, limite=LOTE_TRABAJOS)
+        if not trabajos:
+            break
+
+        # 1. Descargas (los trabajos sin nada que analizar quedan cerrados aquí)
+        listos = []
+        for trabajo in trabajos:
+            pbar.set_description(f"URL {trabajo.id_url} (intento {trabajo.intentos})")
             try:
-                file_id = extract_id_from_url(cv.url_hoja_de_vida)
-                if not file_id: continue
-
-                result = smart_download_file(drive_service, file_id)
-                
-                if result:
-                    file_data, mime_type = result 
-                    
-                    # Log visual limpio
-                    label = "TXT" if "text" in mime_type else "PDF"
-                    pbar.set_description(f"ID {cv.id_aspirante} ({label} -> AI)")
-                    
-                    resumen = analyze_cv_with_gemini(file_data, mime_type)
-                    
-                    if resumen:
-                        cv.resumen_estructurado = resumen
-                        session.add(cv)
-                        session.commit()
-                        processed_count += 1
-                        pbar.set_description(f"ID {cv.id_aspirante} ✅")
-                    else:
-                        session.rollback()
-                else:
-                    # Si entra aquí es porque el archivo era .doc viejo o corrupto.
-                    # No hacemos nada, solo pasamos al siguiente.
-                    pass
-                
-                time.sleep(1)
-
-            except Exception:
-                session.rollback()
-                continue 
-
-    print(f"\n🏁 Finalizado. Éxito: {processed_count}/{total_cvs}")
+                documento = preparar_trabajo(drive_service, trabajo, worker_id)
+            except Exception as e:
+                marcar_error(trabajo, worker_id, f"{type(e).__name__}: {e}")
+                documento = None
+            if documento:
+                listos.append(documento)
+            else:
+                intentados += 1
+                pbar.update(1)
+
+        # 2. Análisis con Gemini (empaquetado cuando aplica) y persistencia
+        sin_analizar = []
+        try:
+            analizados, sin_analizar = analizar_documentos(listos)
+        except Exception as e:
+            analizados = []
+            for documento in listos:
+                marcar_error(documento.trabajo, worker_id, f"{type(e).__name__}: {e}")
+            intentados += len(listos)
+            pbar.update(len(listos))
+
+        for documento, resumen in analizados:
+            try:
+                if guardar_resumen(documento, worker_id, resumen):
+                    processed_count += 1
+                    pbar.set_description(f"URL {documento.trabajo.id_url} ✅")
+            except Exception as e:
+                marcar_error(documento.trabajo, worker_id, f"{type(e).__name__}: {e}")
+
+            intentados += 1
+            pbar.update(1)
+
+        # 3. Cuota agotada: los no analizados vuelven a la cola sin gastar intento y todo el worker pausa
+        if sin_analizar:
+            for documento in sin_analizar:
+                liberar_por_cuota(documento.trabajo, worker_id, documento.mime_type)
+            pausas_cuota += 1
+            if pausas_cuota > MAX_PAUSAS_CUOTA:
+                print(f"\n⛔ Cuota de Gemini agotada tras {MAX_PAUSAS_CUOTA} pausas. Los pendientes siguen en la cola; retoma más tarde.")
+                break
+            print(f"\n⚠️  Cuota excedida. {len(sin_analizar)} CVs devueltos a la cola. Pausando {PAUSA_CUOTA_SEGUNDOS}s...")
+            time.sleep(PAUSA_CUOTA_SEGUNDOS)
+        elif analizados:
+            pausas_cuota = 0
+
+    pbar.close()
+    print(f"\n🏁 Finalizado. Éxito: {processed_count}/{intentados}")
+    print(f"📋 Estado de la cola: {contar_por_estado()}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,33 @@
+import argparse
+import os
+import sys
+import time
+
+# Setup path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlmodel import Session, select, func
+from app.core.database import engine, init_db
+from app.models.models import Aspirante, Tarjeta_Candidato
+from app.services.candidate_cards import reconstruir_tarjetas, LOTE_RECONSTRUCCION
+
+def contar(columna) -> int:
+    with Session(engine) as session:
+        return session.exec(select(func.count(columna))).one()
+
+def main():
+    parser = argparse.ArgumentParser(description="Llena (o rehace) las tarjetas de candidatos que sirve /search")
+    parser.add_argument("--todas", action="store_true", help="Re-renderiza todas, no solo las que faltan")
+    parser.add_argument("--lote", type=int, default=LOTE_RECONSTRUCCION)
+    args = parser.parse_args()
+
+    init_db()
+    print("🃏 Reconstrucción de tarjetas de candidatos")
+    print(f"   Aspirantes: {contar(Aspirante.id_aspirante)} | Tarjetas: {contar(Tarjeta_Candidato.id_aspirante)}")
+
+    inicio = time.perf_counter()
+    guardadas = reconstruir_tarjetas(todas=args.todas, lote=args.lote)
+    print(f"✅ {guardadas} tarjetas guardadas en {time.perf_counter() - inicio:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import os
+import sys
+import argparse
+
+# Setup paths
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import init_db
+from app.services.cv_processor import (
+    encolar_reprocesamiento, contar_por_version, contar_por_estado, adoptar_resumenes_sin_version
+)
+from app.services.versioning import version_resumen
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Encola para re-análisis solo los resúmenes generados con otro prompt/modelo (los más buscados primero)"
+    )
+    parser.add_argument("--limite", type=int, default=None, help="Máximo de CVs a encolar en esta corrida")
+    parser.add_argument("--dry-run", action="store_true", help="Solo muestra el estado por versión, sin encolar")
+    parser.add_argument("--adoptar", action="store_true",
+                        help="Marca los resúmenes sin versión (previos al versionado) como de la versión vigente, sin re-analizarlos")
+    args = parser.parse_args()
+
+    init_db()
+    vigente = version_resumen()
+    print(f"🏷️ Versión vigente del análisis: {vigente}")
+    if args.adoptar and not args.dry_run:
+        print(f"📌 Resúmenes sin versión adoptados como vigentes: {adoptar_resumenes_sin_version(vigente)}")
+    for version, total in sorted(contar_por_version().items(), key=lambda x: -x[1]):
+        marca = "✅" if version == vigente else "♻️"
+        print(f"   {marca} {version or '(sin versión)'}: {total}")
+
+    if args.dry_run:
+        return
+
+    encolados = encolar_reprocesamiento(vigente, args.limite)
+    print(f"\n📥 Encolados para reprocesar: {encolados} | 📋 Estado de la cola: {contar_por_estado()}")
+    print("Ejecuta scripts/process_pdfs.py para procesarlos (se puede interrumpir y retomar) "
+          "y luego scripts/sync_pinecone.py para re-embeber solo los vectores afectados.")
+
+if __name__ == "__main__":
+    main()
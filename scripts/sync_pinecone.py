@@ -1,16 +1,23 @@
 import os
 import sys
 import time
+import argparse
 from typing import List, Dict, Any
 from tqdm import tqdm
 
 # Setup paths
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from sqlmodel import Session, select
-from app.core.database import engine
-from app.models.models import Url_HojaDeVida, Aspirante
-from app.services.pinecone_service import upsert_to_pinecone
+from sqlmodel import Session, select, func
+from sqlalchemy.orm import selectinload
+from app.core.database import engine, init_db
+from app.models.models import Url_HojaDeVida, Aspirante, Popularidad_Aspirante
+from app.services.pinecone_service import upsert_to_pinecone, update_metadata_pinecone, delete_from_pinecone, ids_indexados
+from app.services.vector_projection import INDEX_BASE, nombre_indice, version_vector
+from app.services.versioning import (
+    version_embedding, hash_texto, hash_json, estados_vectores, registrar_vectores, olvidar_vectores
+)
+from app.services.dedup import mapa_duplicados
 
 # Función auxiliar para extraer las sedes marcadas como True
 def obtener_sedes_activas(sede_obj) -> List[str]:
@@ -27,63 +34,112 @@ def obtener_sedes_activas(sede_obj) -> List[str]:
     # Retorna solo las ciudades que están en True
     return [c for c in ciudades if getattr(sede_obj, c, False)]
 
+def preparar_item(cv) -> Dict[str, Any]:
+    info = cv.aspirante.informacion # Tabla Aspirante_Informacion
+    sede = cv.aspirante.sede        # Tabla Aspirante_Sede
+
+    # Construimos el diccionario de metadatos
+    metadata = {
+        "id_aspirante": cv.id_aspirante,
+        "nombre": cv.aspirante.nombre_completo,
+        "municipios": obtener_sedes_activas(sede), # Lista de strings, ej: ['Manizales', 'Neira']
+        "titulo_profesional": info.titulo_profesional if info else "No registrado",
+        "titulo_posgrado": info.titulo_posgrado if info else "No registrado",
+        "tiene_experiencia": info.tiene_experiencia if info else "No",
+        "disponibilidad": info.disponibilidad if info else "No especificada",
+        "version_vector": version_vector() # Espacio (completo/truncado/pca) que generó el vector
+    }
+    return {
+        "id": str(cv.id_aspirante), # ID único en Pinecone
+        "text": cv.resumen_estructurado,  # Texto base: el resumen que la IA convertirá en números
+        "metadata": metadata,       # Info extra para filtrar
+    }
+
+def subir_lote(items: List[Dict[str, Any]], solo_metadata: bool):
+    """Sube (o actualiza metadata de) un lote y registra su estado: si el proceso se corta, se retoma desde aquí."""
+    subidos = set(update_metadata_pinecone(items) if solo_metadata else upsert_to_pinecone(items))
+    registrar_vectores([
+        {"id_aspirante": item["metadata"]["id_aspirante"], "version": version_embedding(),
+         "texto_hash": hash_texto(item["text"]), "metadata_hash": hash_json(item["metadata"])}
+        for item in items if item["id"] in subidos
+    ])
+    return len(subidos)
+
 def main():
+    parser = argparse.ArgumentParser(description="Sincroniza a Pinecone solo los vectores desactualizados")
+    parser.add_argument("--todos", action="store_true", help="Re-embebe todos los candidatos aunque estén al día")
+    parser.add_argument("--limite", type=int, default=None, help="Máximo de vectores a re-embeber en esta corrida")
+    parser.add_argument("--adoptar", action="store_true",
+                        help="Registra los vectores ya indexados antes del versionado como vigentes (solo se refresca su metadata)")
+    args = parser.parse_args()
+    if args.adoptar and (args.todos or nombre_indice() != INDEX_BASE):
+        # Los vectores previos al versionado viven en el índice completo: en otro espacio no hay nada que adoptar
+        print(f"❌ --adoptar solo aplica al índice completo '{INDEX_BASE}' y no se combina con --todos.")
+        return
+
     print("🚀 Iniciando Sincronización a Pinecone (Vectores + Metadata)...")
+    print(f"🧭 Índice destino: '{nombre_indice()}' (vectores {version_embedding()})")
     
     BATCH_SIZE = 50 # Subiremos de 50 en 50 para ser eficientes
+    init_db()
+    estados = {} if args.todos else estados_vectores()
+    version = version_embedding()
+
+    # Los aspirantes colapsados como duplicados no se indexan; si ya tenían vector, se retira
+    duplicados = set(mapa_duplicados.obtener())
+    retirar = sorted(duplicados & set(estados_vectores()))
+    if retirar and delete_from_pinecone(retirar):
+        olvidar_vectores(retirar)
+        print(f"👥 Vectores de duplicados retirados del índice: {len(retirar)}")
 
     with Session(engine) as session:
-        # 1. Seleccionar CVs que YA tienen resumen estructurado (Solo procesamos lo que ya leyó la IA)
-        statement = select(Url_HojaDeVida).where(Url_HojaDeVida.resumen_estructurado != None)
+        # 1. Seleccionar CVs que YA tienen resumen estructurado (Solo procesamos lo que ya leyó la IA),
+        #    los más buscados primero para que sean los primeros en quedar al día
+        statement = (
+            select(Url_HojaDeVida)
+            .outerjoin(Popularidad_Aspirante, Popularidad_Aspirante.id_aspirante == Url_HojaDeVida.id_aspirante)
+            .where(Url_HojaDeVida.resumen_estructurado != None)
+            .order_by(func.coalesce(Popularidad_Aspirante.apariciones, 0).desc(), Url_HojaDeVida.id_url)
+            .options(selectinload(Url_HojaDeVida.aspirante).selectinload(Aspirante.informacion),
+                     selectinload(Url_HojaDeVida.aspirante).selectinload(Aspirante.sede))
+        )
         cvs = session.exec(statement).all()
-        
-        print(f"📊 Encontrados {len(cvs)} candidatos con resumen listo para indexar.")
-        
-        batch = []
-        pbar = tqdm(cvs, desc="Indexando", unit="docs")
-        
-        for cv in pbar:
-            # Validar integridad de datos (que tenga aspirante asociado)
-            if not cv.aspirante:
-                continue
-
-            # --- A. PREPARAR TEXTO PARA EMBEDDING ---
-            # Concatenamos el resumen estructurado. Este es el texto que la IA convertirá en números.
-            texto_para_vector = cv.resumen_estructurado
-            
-            # --- B. PREPARAR METADATOS (FILTROS) ---
-            # Extraemos la info de las tablas relacionadas (SQLModel hace el join automático al acceder)
-            info = cv.aspirante.informacion # Tabla Aspirante_Informacion
-            sede = cv.aspirante.sede        # Tabla Aspirante_Sede
-            
-            # Construimos el diccionario de metadatos
-            metadata = {
-                "id_aspirante": cv.id_aspirante,
-                "nombre": cv.aspirante.nombre_completo,
-                "municipios": obtener_sedes_activas(sede), # Lista de strings, ej: ['Manizales', 'Neira']
-                "titulo_profesional": info.titulo_profesional if info else "No registrado",
-                "titulo_posgrado": info.titulo_posgrado if info else "No registrado",
-                "tiene_experiencia": info.tiene_experiencia if info else "No",
-                "disponibilidad": info.disponibilidad if info else "No especificada"
-            }
-            
-            # --- C. AGREGAR AL BATCH ---
-            batch.append({
-                "id": str(cv.id_aspirante), # ID único en Pinecone
-                "text": texto_para_vector,  # Texto base
-                "metadata": metadata        # Info extra para filtrar
-            })
-            
-            # --- D. SUBIDA POR LOTES ---
-            if len(batch) >= BATCH_SIZE:
-                upsert_to_pinecone(batch)
-                batch = [] # Vaciar el lote
-                
-        # Subir los últimos restantes si quedaron en el batch
-        if batch:
-            upsert_to_pinecone(batch)
-
-    print("\n✅ Sincronización finalizada. Tu motor de búsqueda está listo.")
+
+        # 2. Clasificar: vector nuevo/obsoleto (re-embeber), solo metadata distinta, o al día
+        items = [preparar_item(cv) for cv in cvs if cv.aspirante and cv.id_aspirante not in duplicados]
+
+        # --adoptar: los vectores que ya están en el índice pero no tienen estado (previos al versionado)
+        # se asumen embebidos de este mismo texto; solo se reescribe su metadata (sin version_vector)
+        if args.adoptar:
+            legados = ids_indexados([item["id"] for item in items if item["metadata"]["id_aspirante"] not in estados])
+            adoptados = [
+                {"id_aspirante": item["metadata"]["id_aspirante"], "version": version,
+                 "texto_hash": hash_texto(item["text"]), "metadata_hash": ""}
+                for item in items if item["id"] in legados
+            ]
+            registrar_vectores(adoptados)
+            estados = estados_vectores()
+            print(f"📌 Vectores previos al versionado adoptados sin re-embeber: {len(adoptados)}")
+
+        embeber, solo_metadata = [], []
+        for item in items:
+            estado = estados.get(item["metadata"]["id_aspirante"])
+            if not estado or estado.version != version or estado.texto_hash != hash_texto(item["text"]):
+                embeber.append(item)
+            elif estado.metadata_hash != hash_json(item["metadata"]):
+                solo_metadata.append(item)
+
+        al_dia = len(items) - len(embeber) - len(solo_metadata)
+        print(f"📊 {len(cvs)} candidatos con resumen | 🧮 A re-embeber: {len(embeber)} | 🏷️ Solo metadata: {len(solo_metadata)} | ✅ Al día: {al_dia}")
+        if args.limite is not None:
+            embeber = embeber[:args.limite]
+
+        subidos = 0
+        for items, es_metadata, etiqueta in ((embeber, False, "Indexando"), (solo_metadata, True, "Metadata")):
+            for i in tqdm(range(0, len(items), BATCH_SIZE), desc=etiqueta, unit="lote"):
+                subidos += subir_lote(items[i:i + BATCH_SIZE], es_metadata)
+
+    print(f"\n✅ Sincronización finalizada ({subidos} vectores actualizados). Tu motor de búsqueda está listo.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,23 @@
+import os
+import sys
+import tempfile
+
+# La configuración y el engine se crean al importar app.*: la base de pruebas va antes
+_DB = os.path.join(tempfile.mkdtemp(prefix="hv_tests_"), "test.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB}"
+os.environ.setdefault("PROJECT_NAME", "tests")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from sqlmodel import SQLModel
+
+import app.models.models  # noqa: F401  (registra las tablas en la metadata)
+from app.core.database import engine
+
+
+@pytest.fixture
+def db():
+    SQLModel.metadata.drop_all(engine)
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    SQLModel.metadata.drop_all(engine)
@@ -0,0 +1,72 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.services.admission import plazo_seguidores
+from app.services.singleflight import SingleFlight, EsperaAgotada
+
+
+@pytest.fixture
+def plazos_cortos(monkeypatch):
+    monkeypatch.setattr(settings, "SEARCH_TIMEOUT_COLA", 0.2)
+    monkeypatch.setattr(settings, "SEARCH_PRESUPUESTO_UPSTREAM", 0.6)
+    monkeypatch.setattr(settings, "SEARCH_TIMEOUT_SEGUIDORES", 0.0)
+
+
+def _vuelo_con_lider_lento(vuelos: SingleFlight, demora: float, timeout: float, seguidores: int = 3):
+    arranco = threading.Event()
+
+    def lider():
+        arranco.set()
+        time.sleep(demora)
+        return "ok"
+
+    with ThreadPoolExecutor(seguidores + 1) as pool:
+        futuro_lider = pool.submit(vuelos.ejecutar, "clave", lider, timeout)
+        arranco.wait()
+        futuros = [pool.submit(vuelos.ejecutar, "clave", lider, timeout) for _ in range(seguidores)]
+        return futuro_lider.result(), futuros
+
+
+def test_plazo_seguidores_cubre_cola_y_servicios(plazos_cortos):
+    assert plazo_seguidores() == pytest.approx(0.8)
+
+
+def test_seguidores_esperan_a_un_lider_mas_lento_que_la_cola(plazos_cortos):
+    vuelos = SingleFlight()
+    demora = settings.SEARCH_TIMEOUT_COLA + 0.2  # Lo que tarda un líder que pasó por la cola
+
+    resultado, futuros = _vuelo_con_lider_lento(vuelos, demora, plazo_seguidores())
+    assert resultado == "ok"
+    assert [f.result() for f in futuros] == ["ok"] * len(futuros)
+    assert vuelos.metricas()["esperas_agotadas"] == 0
+
+    # Con el plazo de la cola (el comportamiento anterior) esos mismos seguidores recibían 503
+    _, futuros = _vuelo_con_lider_lento(vuelos, demora, settings.SEARCH_TIMEOUT_COLA)
+    with pytest.raises(EsperaAgotada):
+        futuros[0].result()
+
+
+def test_endpoint_coalesce_con_lider_lento(db, plazos_cortos, monkeypatch):
+    pytest.importorskip("pinecone")
+    pytest.importorskip("google.generativeai")
+    from app.api.v1.endpoints import search
+
+    llamadas = []
+
+    def pinecone_lento(query, filters=None, top_k=10, include_metadata=True):
+        llamadas.append(query)
+        time.sleep(settings.SEARCH_TIMEOUT_COLA + 0.2)
+        return SimpleNamespace(matches=[])
+
+    monkeypatch.setattr(search, "search_best_matches", pinecone_lento)
+    peticion = search.SearchRequest(query="ingeniero de sistemas")
+    with ThreadPoolExecutor(4) as pool:
+        respuestas = list(pool.map(lambda _: search.search_candidates(peticion), range(4)))
+
+    assert [r.status_code for r in respuestas] == [200] * 4
+    assert len(llamadas) == 1
@@ -0,0 +1,26 @@
+import pytest
+from fastapi import HTTPException
+
+pytest.importorskip("pinecone")
+pytest.importorskip("google.generativeai")
+
+from app.api.v1.endpoints import search
+from app.services import pinecone_service
+
+
+def _falla(*args, **kwargs):
+    raise RuntimeError("connection reset by peer")
+
+
+@pytest.mark.parametrize("componente", ["_embed", "pc"])
+def test_falla_upstream_responde_503_y_no_lista_vacia(db, monkeypatch, componente):
+    if componente == "_embed":
+        monkeypatch.setattr(pinecone_service, "_embed", _falla)
+    else:
+        monkeypatch.setattr(pinecone_service, "_embed", lambda texto: [0.1, 0.2])
+        monkeypatch.setattr(pinecone_service.pc, "Index", _falla, raising=False)
+
+    with pytest.raises(HTTPException) as error:
+        search.search_candidates(search.SearchRequest(query="docente de matemáticas"))
+    assert error.value.status_code == 503
+    assert error.value.headers["Retry-After"] == str(search.control_busqueda.retry_after)
@@ -0,0 +1,94 @@
+from datetime import timedelta
+
+from sqlmodel import Session, select
+
+from app.models.models import Aspirante, Url_HojaDeVida, Procesamiento_HojaDeVida
+from app.services.cv_processor import (
+    EN_PROCESO, FALLIDO, MAX_INTENTOS, encolar_pendientes, reclamar_trabajos,
+    adoptar_resumenes_sin_version, contar_por_version, encolar_reprocesamiento,
+    COMPLETADO, PENDIENTE, registrar_no_encontrados, no_encontrados_vigentes, guardar_metadatos_drive,
+    encolar_archivos_cambiados,
+)
+
+
+def _crear_trabajo(engine) -> int:
+    with Session(engine) as session:
+        aspirante = Aspirante(tipo_documento="CC", nombre_completo="Ana", email="ana@x.co", celular="300")
+        session.add(aspirante)
+        session.flush()
+        session.add(Url_HojaDeVida(id_aspirante=aspirante.id_aspirante, url_hoja_de_vida="https://drive.google.com/file/d/abc"))
+        session.commit()
+    assert encolar_pendientes() == 1
+    with Session(engine) as session:
+        return session.exec(select(Procesamiento_HojaDeVida.id_trabajo)).one()
+
+
+def test_lease_vencido_repetido_termina_fallido(db):
+    id_trabajo = _crear_trabajo(db)
+
+    # Cada reclamo "cuelga" al worker: el lease nace vencido y nadie llama a marcar_error
+    for intento in range(1, MAX_INTENTOS + 1):
+        reclamar_trabajos(f"w{intento}", lease_segundos=-1)
+        with Session(db) as session:
+            trabajo = session.get(Procesamiento_HojaDeVida, id_trabajo)
+            assert (trabajo.estado, trabajo.intentos) == (EN_PROCESO, intento)
+
+    # Agotados los intentos, el siguiente reclamo lo saca de la cola en vez de volver a tomarlo
+    assert reclamar_trabajos("w-final", lease_segundos=-1) == []
+    with Session(db) as session:
+        trabajo = session.get(Procesamiento_HojaDeVida, id_trabajo)
+        assert trabajo.estado == FALLIDO
+        assert trabajo.intentos == MAX_INTENTOS
+        assert trabajo.lease_hasta is None
+        assert "Lease vencido" in trabajo.ultimo_error
+
+    assert reclamar_trabajos("w-otro") == []
+
+
+def test_lease_vigente_no_se_reclama(db):
+    _crear_trabajo(db)
+    assert len(reclamar_trabajos("w1")) == 1
+    assert reclamar_trabajos("w2") == []
+
+
+def test_adoptar_resumenes_sin_version_evita_reprocesar(db):
+    with Session(db) as session:
+        aspirante = Aspirante(tipo_documento="CC", nombre_completo="Ana", email="ana@x.co", celular="300")
+        session.add(aspirante)
+        session.flush()
+        session.add(Url_HojaDeVida(id_aspirante=aspirante.id_aspirante, url_hoja_de_vida="u1", resumen_estructurado="PERFIL"))
+        session.add(Url_HojaDeVida(id_aspirante=aspirante.id_aspirante, url_hoja_de_vida="u2", resumen_estructurado="PERFIL",
+                                   resumen_version="vieja"))
+        session.commit()
+
+    assert adoptar_resumenes_sin_version("vigente") == 1
+    assert contar_por_version() == {"vigente": 1, "vieja": 1}
+    assert encolar_reprocesamiento("vigente") == 1  # Solo el de otra versión explícita
+
+
+def test_cache_negativa_de_drive_vence(db):
+    registrar_no_encontrados(["vigente"], timedelta(hours=1))
+    registrar_no_encontrados(["vencido"], timedelta(seconds=-1))
+    assert no_encontrados_vigentes(["vigente", "vencido", "otro"]) == {"vigente"}
+
+    # Si Drive vuelve a responder, el archivo sale de la caché negativa
+    guardar_metadatos_drive([{"id": "vigente", "mimeType": "application/pdf", "md5Checksum": "abc"}])
+    assert no_encontrados_vigentes(["vigente"]) == set()
+
+
+def test_archivo_cambiado_se_reencola_sin_perder_el_resumen(db):
+    id_trabajo = _crear_trabajo(db)
+    with Session(db) as session:
+        trabajo = session.get(Procesamiento_HojaDeVida, id_trabajo)
+        trabajo.estado = COMPLETADO
+        cv = session.get(Url_HojaDeVida, trabajo.id_url)
+        cv.resumen_estructurado, cv.resumen_version = "PERFIL", "vigente"
+        session.add_all([trabajo, cv])
+        session.commit()
+        id_url = cv.id_url
+
+    assert encolar_archivos_cambiados([id_url]) == 1
+    with Session(db) as session:
+        cv = session.get(Url_HojaDeVida, id_url)
+        assert (cv.resumen_estructurado, cv.resumen_version) == ("PERFIL", None)
+        assert session.get(Procesamiento_HojaDeVida, id_trabajo).estado == PENDIENTE
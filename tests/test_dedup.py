@@ -0,0 +1,34 @@
+from types import SimpleNamespace
+
+from sqlmodel import Session
+
+from app.models.models import Aspirante, Aspirante_Sede, Duplicado_Aspirante
+from app.services.dedup import MapaDuplicados
+
+
+def _aspirante(session: Session, **sedes) -> int:
+    aspirante = Aspirante(tipo_documento="CC", nombre_completo="Ana", email="ana@x.co", celular="300")
+    session.add(aspirante)
+    session.flush()
+    session.add(Aspirante_Sede(id_aspirante=aspirante.id_aspirante, **sedes))
+    return aspirante.id_aspirante
+
+
+def _match(aid: int, score: float):
+    return SimpleNamespace(id=str(aid), score=score)
+
+
+def test_colapsar_respeta_el_filtro_de_municipio(db):
+    with Session(db) as session:
+        canonico = _aspirante(session, Manizales=True)
+        miembro = _aspirante(session, Neira=True)
+        session.add(Duplicado_Aspirante(id_aspirante=miembro, id_canonico=canonico, motivo="email"))
+        session.commit()
+
+    mapa = MapaDuplicados()
+    matches = [_match(miembro, 0.9), _match(canonico, 0.8)]
+    # Sin filtro (o con una sede del canónico) la persona se muestra como su canónico, una sola vez
+    assert mapa.colapsar(matches) == [(canonico, 0.9)]
+    assert mapa.colapsar(matches, "Manizales") == [(canonico, 0.9)]
+    # El canónico no tiene sede en Neira: se conserva el miembro que sí coincidió con el filtro
+    assert mapa.colapsar([_match(miembro, 0.9)], "Neira") == [(miembro, 0.9)]
@@ -0,0 +1,23 @@
+from sqlmodel import Session, select
+
+from app.models.models import Aspirante
+from app.services.bulk_import import importar_aspirantes
+
+
+def test_match_por_email_ignora_mayusculas_y_espacios(db):
+    with Session(db) as session:
+        session.add(Aspirante(tipo_documento="CC", num_documento=111, nombre_completo="Ana Gómez",
+                              email="  Ana.Gomez@Ejemplo.CO ", celular="300"))
+        session.commit()
+
+    # Otro documento (corregido en el formulario), mismo correo: es la misma persona
+    resumen = importar_aspirantes([
+        {"Tipo de documento": "CC", "Número de documento": "222", "Nombre completo": "Ana Gómez",
+         "Correo electrónico": "ana.gomez@ejemplo.co", "Celular": "301"},
+    ])
+
+    assert (resumen["nuevos"], resumen["actualizados"]) == (0, 1)
+    with Session(db) as session:
+        aspirantes = session.exec(select(Aspirante)).all()
+        assert len(aspirantes) == 1
+        assert (aspirantes[0].num_documento, aspirantes[0].celular) == (222, "301")
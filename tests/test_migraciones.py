@@ -0,0 +1,30 @@
+import os
+import sqlite3
+import subprocess
+import sys
+
+from app.core.migrations import MIGRACIONES
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Como un worker de process_pdfs: init_db sin haber importado app.models antes
+ARRANQUE = "from app.core.database import init_db; init_db()"
+
+
+def _arrancar(ruta_db: str) -> subprocess.Popen:
+    entorno = {**os.environ, "DATABASE_URL": f"sqlite:///{ruta_db}", "PROJECT_NAME": "tests"}
+    return subprocess.Popen([sys.executable, "-c", ARRANQUE], cwd=RAIZ, env=entorno,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+
+
+def test_procesos_simultaneos_sobre_base_nueva(tmp_path):
+    ruta = str(tmp_path / "nueva.db")
+    procesos = [_arrancar(ruta) for _ in range(4)]
+    for proceso in procesos:
+        _, error = proceso.communicate(timeout=60)
+        assert proceso.returncode == 0, error
+
+    with sqlite3.connect(ruta) as conn:
+        versiones = [v for (v,) in conn.execute("SELECT version FROM schema_version ORDER BY version")]
+        tablas = {t for (t,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert versiones == sorted(m.version for m in MIGRACIONES)
+    assert "procesamiento_hojadevida" in tablas
@@ -0,0 +1,34 @@
+from sqlmodel import Session
+
+from app.models.models import Aspirante, Tarjeta_Candidato
+from app.services.candidate_cards import reconstruir_tarjetas
+
+
+def _aspirante(engine, **campos) -> int:
+    with Session(engine) as session:
+        aspirante = Aspirante(tipo_documento="CC", nombre_completo="Ana", email="ana@x.co", celular="300", **campos)
+        session.add(aspirante)
+        session.commit()
+        return aspirante.id_aspirante
+
+
+def test_edicion_orm_vuelve_a_guardar_la_tarjeta(db):
+    aid = _aspirante(db)
+    with Session(db) as session:
+        aspirante = session.get(Aspirante, aid)
+        aspirante.celular = "3999999999"
+        session.add(aspirante)
+        session.commit()
+    with Session(db) as session:
+        tarjeta = session.get(Tarjeta_Candidato, aid)
+        assert tarjeta is not None and "3999999999" in tarjeta.fragmento_json
+
+
+def test_reconstruir_llena_solo_las_faltantes(db):
+    ids = [_aspirante(db) for _ in range(3)]
+    with Session(db) as session:
+        for aid in ids:
+            session.delete(session.get(Tarjeta_Candidato, aid))
+        session.commit()
+    assert reconstruir_tarjetas(lote=2) == 3
+    assert reconstruir_tarjetas() == 0